@@ -1,6 +1,6 @@
 import asyncio
 import math
-import pandas as pd
+import numpy as np
 from typing import Optional, List
 
 from discord import Message
@@ -9,9 +9,14 @@ from discord.ext import commands
 from app.calculators.flipping_calculator import FlippingCalculator
 from app.config import settings
 from app.constants import constants
-from app.models.runescape import LatestItemsResponse, FlippingResult, DiscordFlippingResult, OsrsItem, ItemSets
+from app.database.models.osrs_trades import MAX_TRADE_VALUE
+from app.models.runescape import FlippingResult, OsrsItem, ItemSets
+from app.services.osrs_flip_ranker import FlipFilters, FlipRanker
+from app.utils.exceptions import InsufficientPositionError
 from app.utils.logger import logger
 
+NOT_PERSISTED_WARNING = "*No database is configured, this trade is only kept until the bot restarts* \n"
+
 
 class CommandHandler(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -78,11 +83,16 @@ class CommandHandler(commands.Cog):
         from app.dependencies import get_dota_service
         dota_service = get_dota_service()
         ids = constants.get_player_ids()
+        players = await dota_service.get_players(ids)
 
         result = ""
 
         for player_id in ids:
-            response = await dota_service.get_player(player_id)
+            response = players.players.get(player_id)
+            if response is None:
+                logger.warning(f"Could not fetch dota player {player_id}: {players.errors.get(player_id)}")
+                result += f"{player_id} could not be fetched \n"
+                continue
             personaname = response["profile"]["personaname"]
             rank = constants.get_dota_rank_by_tier(response["rank_tier"])
             result += f"{personaname} is {rank} \n"
@@ -125,12 +135,14 @@ class CommandHandler(commands.Cog):
         osrs_service = get_osrs_service()
         item = osrs_service.get_osrs_item_by_name(item_id)
 
-        if limit is not None:
-            item.limit = limit
-
         if item is None:
             await ctx.send(f"Item with name {item_id} not found.")
         else:
+            # Copy, the catalog item is shared and must keep its real name and limit
+            item = item.model_copy()
+            if limit is not None:
+                item.limit = limit
+
             volumes = await osrs_service.get_volumes()
             scaled_volumes = volumes.get_scaled_volumes()
             price = await osrs_service.get_latest_by_item_id(item.id)
@@ -166,7 +178,7 @@ class CommandHandler(commands.Cog):
             if item is None:
                 await ctx.send(f"Item with name {name} not found.")
             else:
-
+                item = item.model_copy()
                 price = await osrs_service.get_latest_by_item_id(item.id)
 
                 volume = volumes.get_volume(item.name)
@@ -222,86 +234,20 @@ class CommandHandler(commands.Cog):
 
         await ctx.send(string)
 
-    @commands.command(name='items')
-    async def get_items(self,ctx: commands.Context, max_roi = 70):
-
-        await ctx.send("This command is currently disabled")
-        return
-
-
-        from app.dependencies import get_osrs_service
-        osrs_service = get_osrs_service()
-
-        item_mappings = osrs_service.OSRS_ITEM_MAPPINGS
-        prices = await osrs_service.get_latest()  # This should ideally be a LatestItemsResponse
-        volumes = await osrs_service.get_volumes()
-        scaled_volumes = volumes.get_scaled_volumes()
-
-        # Check if prices is a LatestItemsResponse or dict, and extract data accordingly
-        latest_data = prices.data if isinstance(prices, LatestItemsResponse) else prices.get("data", {})
-
-        # Flatten volumes and add details from OsrsItem and LatestItemsResponse
-        data = []
-        for item_name, volume in scaled_volumes.items():
-            # Find the matching OsrsItem based on the name
-            osrs_item = next((item for item in item_mappings.values() if item.name == item_name), None)
-
-            if osrs_item:
-                # Find matching LatestItemEntry using the item id as a string
-                latest_entry = latest_data.get(str(osrs_item.id), None)
-
-                # Append all details to the data list
-                data.append({
-                    "item name": item_name,
-                    "volume": volume,
-                    "examine": osrs_item.examine,
-                    "id": osrs_item.id,
-                    "members": osrs_item.members,
-                    "lowalch": osrs_item.lowalch,
-                    "limit": osrs_item.limit,
-                    "value": osrs_item.value,
-                    "highalch": osrs_item.highalch,
-                    "icon": osrs_item.icon,
-                    "latest_high": latest_entry["high"] if latest_entry else None,
-                    "latest_highTime": latest_entry["highTime"] if latest_entry else None,
-                    "latest_low": latest_entry["low"] if latest_entry else None,
-                    "latest_lowTime": latest_entry["lowTime"] if latest_entry else None,
-                })
-
-        # Create the DataFrame
-        df = pd.DataFrame(data)
-        filtered_df = df[(df["volume"] >= 0)]
-
-        string = " Top 10 items sorted by ROI \n"
-
-        items: List[DiscordFlippingResult] = []
-        for index, row in filtered_df.iterrows():
-            calc = self.flipping_calculator.calculate_v2(row["limit"], row["latest_high"], row["latest_low"],row["item name"])
-            items.append(DiscordFlippingResult(
-                item_name=calc.item_name,
-                high_price=calc.high_price,
-                low_price=calc.low_price,
-                total_profit=calc.total_profit,
-                roi_percentage=calc.roi_percentage,
-                cash_needed=calc.cash_needed
-            ))
-
-        calc_data = [item.model_dump() for item in items]
-        calc_df = pd.DataFrame(calc_data).sort_values(by="roi_percentage", ascending=False)
-
-        filtered_df = calc_df[(calc_df["roi_percentage"] < max_roi) & (calc_df["total_profit"] > 200000)]
+    @commands.command(name='items', help='[max roi] - Top flips across the whole market sorted by ROI')
+    async def get_items(self,ctx: commands.Context, max_roi: int = 70):
+        ranking = await FlipRanker.rank(FlipFilters(min_profit=200000, max_roi=max_roi), limit=20)
 
         strings = []
         # Header with column names and a separator
         strings.append("Item Name       |  Buy Price  |  Sell Price | Profit      | Cash Needed  | ROI")
         strings.append("--------------------------------------------------------------------------------")
 
-        for i in range(len(filtered_df.head(20))):
-            row = filtered_df.iloc[i]
+        for flip in ranking.flips:
             # Format each row with consistent padding for each column
             strings.append(
-                f"{row.item_name[:15]:<15} | {row.low_price:>9,}gp | {row.high_price:>9,}gp | "
-                f"{row.total_profit:>9,}gp | {row.cash_needed:>10,}gp | {math.floor(row.roi_percentage):>5.2f}%"
+                f"{flip.item_name[:15]:<15} | {flip.low_price:>9,}gp | {flip.high_price:>9,}gp | "
+                f"{flip.total_profit:>9,}gp | {flip.cash_needed:>10,}gp | {math.floor(flip.roi_percentage):>5.2f}%"
             )
 
         # Join the lines into a single string with monospaced formatting
@@ -314,32 +260,166 @@ class CommandHandler(commands.Cog):
             await ctx.send("The output is too long to send in a single message.")
 
 
-    @commands.command(name='in', help='Register a buy transaction')
+    @commands.command(name='plan', help='<budget> - Items and quantities to buy with your budget for the most expected profit')
+    async def get_flip_plan(self, ctx: commands.Context, budget: int):
+        if budget <= 0:
+            await ctx.send("Budget must be positive")
+            return
+
+        plan = await FlipRanker.plan(budget, max_items=15)
+        if not plan.allocations:
+            await ctx.reply("Nothing worth flipping with that budget right now.")
+            return
+
+        strings = []
+        strings.append("Item Name       |  Quantity  |  Buy Price  | Cost         | Fill | Exp. Profit")
+        strings.append("--------------------------------------------------------------------------------")
+
+        for allocation in plan.allocations:
+            strings.append(
+                f"{allocation.item_name[:15]:<15} | {allocation.quantity:>10,} | {allocation.buy_price:>9,}gp | "
+                f"{allocation.cost:>10,}gp | {allocation.fill_probability:>4.0%} | {allocation.expected_profit:>9,}gp"
+            )
+
+        string = "```\n" + "\n".join(strings) + "\n```"
+        string += f"Cash used: **{plan.cash_used:,}gp** of {plan.budget:,}gp \n"
+        string += f"Expected profit: **{plan.expected_profit:,}gp** \n"
+
+        await ctx.reply(string)
+
+    @commands.command(name='in', help='"<item name>" <amount> <buy price> - Register a buy transaction')
     async def incoming_trade(self,ctx: commands.Context, item_name: str, amount: int, buy: int):
+        from app.dependencies import get_osrs_service
+        from app.services.trade_ledger import TradeLedger
+        item = get_osrs_service().get_osrs_item_by_name(item_name)
+
+        if item is None:
+            await ctx.send(f"Item with name {item_name} not found.")
+            return
+        if amount < 1 or buy < 1:
+            await ctx.send("Learn to buy items you idiot 🤡")
+            return
+        if amount > MAX_TRADE_VALUE or buy > MAX_TRADE_VALUE:
+            await ctx.send(f"Amount and price can be at most {MAX_TRADE_VALUE:,}")
+            return
+
+        position = await TradeLedger.record_buy(ctx.author.id, item.id, amount, buy)
         break_even = buy * 1.01
         total_invest = buy * amount
 
-        string = f"Locked in {amount:,} {item_name} at {buy:,}gp each \n"
+        string = f"Locked in {amount:,} {item.name} at {buy:,}gp each \n"
         string += f"Total investment: {total_invest:,}gp \n"
         string += f"Break even sell price: {math.ceil(break_even):,}gp \n"
+        string += f"Now holding {position.quantity:,} at an average of {position.cost // position.quantity:,}gp \n"
+        if not TradeLedger.is_persistent():
+            string += NOT_PERSISTED_WARNING
 
         await ctx.send(string)
 
-    @commands.command(name='out', help='Register a sell transaction')
+    @commands.command(name='out', help='"<item name>" <amount> <sell price> - Register a sell transaction')
     async def outgoing_trade(self,ctx: commands.Context, item_name: str, amount: int, sell: int):
+        from app.dependencies import get_osrs_service
+        from app.services.trade_ledger import TradeLedger
+        item = get_osrs_service().get_osrs_item_by_name(item_name)
+
+        if item is None:
+            await ctx.send(f"Item with name {item_name} not found.")
+            return
+        if amount < 1 or sell < 1:
+            await ctx.send("Learn to sell items you idiot 🤡")
+            return
+        if amount > MAX_TRADE_VALUE or sell > MAX_TRADE_VALUE:
+            await ctx.send(f"Amount and price can be at most {MAX_TRADE_VALUE:,}")
+            return
+
+        try:
+            pnl = await TradeLedger.record_sell(ctx.author.id, item.id, amount, sell)
+        except InsufficientPositionError as e:
+            await ctx.send(f"Can't sell {amount:,} {item.name}: {e.message}")
+            return
+
         total_sale = sell * amount
-        string = f"Sold {amount:,} {item_name} at {sell:,}gp each \n"
+        string = f"Sold {amount:,} {item.name} at {sell:,}gp each \n"
         string += f"Total sale: {total_sale:,}gp \n"
+        string += f"{'Profit' if pnl >= 0 else 'Loss'}: **{math.floor(pnl):,}gp** {self.get_emoji_by_roi(pnl)} \n"
+        if not TradeLedger.is_persistent():
+            string += NOT_PERSISTED_WARNING
 
         await ctx.send(string)
 
     @commands.command(name='pos' , help='Check your current position (Items held, cash, total value)')
     async def trader_position(self,ctx: commands.Context):
-        author = ctx.author
-        string = "hi"
+        from app.dependencies import get_osrs_service
+        from app.services.osrs_price_poller import OsrsPricePoller
+        from app.services.trade_ledger import TradeLedger
+        osrs_service = get_osrs_service()
+
+        snapshot = await OsrsPricePoller.get_or_refresh()
+        high_prices, _ = OsrsPricePoller.get_price_arrays(snapshot)
+        positions = await TradeLedger.mark_to_market(ctx.author.id, high_prices, osrs_service.OSRS_ITEM_MAPPINGS)
+
+        if positions.item_ids.size == 0:
+            await ctx.reply(f"No open positions. Realized P&L: **{math.floor(positions.realized):,}gp**")
+            return
+
+        strings = []
+        strings.append("Item Name       |  Quantity  |  Avg Cost  |  Price     | Value        | Unrealized")
+        strings.append("-----------------------------------------------------------------------------------")
+
+        for i in np.argsort(-positions.value, kind="stable")[:20]:
+            strings.append(
+                f"{positions.names[i][:15]:<15} | {int(positions.quantity[i]):>10,} | {int(positions.cost[i] // positions.quantity[i]):>8,}gp | "
+                f"{int(positions.mark_price[i]):>8,}gp | {int(positions.value[i]):>10,}gp | {math.floor(positions.unrealized[i]):>10,}gp"
+            )
+
+        total_value = float(positions.value.sum())
+        total_unrealized = float(positions.unrealized.sum())
+        string = "```\n" + "\n".join(strings) + "\n```"
+        string += f"Total value: **{math.floor(total_value):,}gp** \n"
+        string += f"Unrealized P&L: **{math.floor(total_unrealized):,}gp** {self.get_emoji_by_roi(total_unrealized)} \n"
+        string += f"Realized P&L: **{math.floor(positions.realized):,}gp** \n"
+
         await ctx.reply(string)
 
-        pass
+    @commands.command(name='alert', help='"<item name>" <below|above|roi> <price or roi %> [dm] - Get notified when a price crosses a threshold')
+    async def add_price_alert(self, ctx: commands.Context, item_name: str, kind: str, threshold: float, delivery: Optional[str] = None):
+        from app.dependencies import get_osrs_service
+        from app.services.osrs_alerts import ALERT_DIRECTIONS, PriceAlertEngine
+        item = get_osrs_service().get_osrs_item_by_name(item_name)
+
+        if item is None:
+            await ctx.send(f"Item with name {item_name} not found.")
+            return
+        if kind not in ALERT_DIRECTIONS or threshold <= 0:
+            await ctx.send(f"Usage: {settings.DISCORD_COMMAND_PREFIX}alert \"<item name>\" <below|above|roi> <price or roi %> [dm]")
+            return
+
+        channel_id = None if delivery == "dm" else constants.OSRS_TRADING_CHANNEL_ID
+        alert = PriceAlertEngine.add_alert(
+            ctx.author.id, item.id, kind, threshold,
+            guild_id=ctx.guild.id if ctx.guild else None, channel_id=channel_id
+        )
+
+        if alert is None:
+            await ctx.send(f"You already have this alert or {settings.OSRS_ALERTS_PER_USER} alerts, remove one with {settings.DISCORD_COMMAND_PREFIX}unalert <id>")
+            return
+        await ctx.send(f"Alert set: {PriceAlertEngine.format_alert(alert)}")
+
+    @commands.command(name='alerts', help='List your price alerts')
+    async def list_price_alerts(self, ctx: commands.Context):
+        from app.services.osrs_alerts import PriceAlertEngine
+        alerts = PriceAlertEngine.get_user_alerts(ctx.author.id)
 
+        if not alerts:
+            await ctx.reply("You have no price alerts.")
+            return
+        await ctx.reply("\n".join(PriceAlertEngine.format_alert(alert) for alert in alerts))
 
+    @commands.command(name='unalert', help='<alert id> - Remove one of your price alerts')
+    async def remove_price_alert(self, ctx: commands.Context, alert_id: str):
+        from app.services.osrs_alerts import PriceAlertEngine
 
+        if PriceAlertEngine.remove_alert(ctx.author.id, alert_id):
+            await ctx.send(f"Alert {alert_id} removed.")
+        else:
+            await ctx.send(f"You have no alert with id {alert_id}.")
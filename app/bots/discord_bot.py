@@ -1,3 +1,4 @@
+import time
 from datetime import datetime
 
 from discord.ext import commands
@@ -8,6 +9,7 @@ from app.config import settings
 from app.constants import constants
 from app.utils.exceptions import DiscordBotNotInitializedError
 from app.utils.logger import logger
+from app.utils.metrics import observe_command
 
 
 class DiscordBot:
@@ -30,6 +32,19 @@ class DiscordBot:
             setup_message_handler(cls._instance)
             await cls._instance.add_cog(CommandHandler(cls._instance))
 
+            ## Command metrics
+            @cls._instance.before_invoke
+            async def start_command_timer(ctx: commands.Context):
+                ctx.started_at = time.perf_counter()
+
+            @cls._instance.listen()
+            async def on_command_completion(ctx: commands.Context):
+                observe_command(ctx.command and ctx.command.qualified_name, "ok", getattr(ctx, "started_at", None))
+
+            @cls._instance.listen()
+            async def on_command_error(ctx: commands.Context, error: commands.CommandError):
+                observe_command(ctx.command and ctx.command.qualified_name, type(error).__name__, getattr(ctx, "started_at", None))
+
             ## Logger events
             @cls._instance.event
             async def on_connect():
@@ -52,3 +67,12 @@ class DiscordBot:
         channel = cls._instance.get_channel(channel_id)
         await channel.send(f"System Message: {message}")
         logger.info(f"Sent system message to channel {channel_id} in guild {channel.guild.name}")
+
+    @classmethod
+    async def send_direct_message(cls, message: str, user_id: int):
+        if cls._instance is None:
+            raise DiscordBotNotInitializedError
+
+        user = cls._instance.get_user(user_id) or await cls._instance.fetch_user(user_id)
+        await user.send(message)
+        logger.info(f"Sent direct message to user {user_id}")
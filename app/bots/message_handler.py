@@ -6,7 +6,8 @@ from discord.abc import PrivateChannel
 
 from app.config import settings
 from app.constants import constants
-from app.utils.logger import logger
+from app.utils.exceptions import LlmOverloadedError, LlmTimeoutError
+from app.utils.logger import discord_event_logger, logger
 
 
 class MessageHandler:
@@ -41,13 +42,10 @@ class MessageHandler:
     def _log_message(self, message: Message) -> None:
         """Log the incoming message."""
         if message.guild is None or message.channel is None:
-            logger.info(f"DM from {message.author}: {message.content}")
+            discord_event_logger.info("DM from %s: %s", message.author, message.content)
             return
 
-        logger.info(
-            f"{message.guild.name}/#{message.channel.name}: "
-            f"{message.author}: {message.content}"
-        )
+        discord_event_logger.info("%s/#%s: %s: %s", message.guild.name, message.channel.name, message.author, message.content)
 
     async def _handle_command(self, message: Message) -> bool:
         """Handle bot commands."""
@@ -58,7 +56,8 @@ class MessageHandler:
 
     async def _handle_predefined_response(self, message: Message) -> bool:
         """Handle predefined responses."""
-        if response := constants.get_predefined_response(message.content):
+        guild_id = message.guild.id if message.guild is not None else None
+        if response := constants.get_predefined_response(message.content, guild_id):
             await message.channel.send(response)
             return True
         return False
@@ -73,7 +72,7 @@ class MessageHandler:
             return
 
         prompt = self._get_llm_prompt(message.content)
-        response = await self._generate_llm_response(prompt, message.content)
+        response = await self._generate_llm_response(prompt, message)
 
         if response and self._is_valid_response(response):
             await message.channel.send(response)
@@ -96,10 +95,17 @@ class MessageHandler:
             else "Reply in 1-3 sentences to the following text:"
         )
 
-    async def _generate_llm_response(self, prompt: str, content: str) -> Optional[str]:
+    async def _generate_llm_response(self, prompt: str, message: Message) -> Optional[str]:
         """Generate response using LLM service."""
         try:
-            return await self.llm_service.generate(f"{prompt}: {content}")
+            return await self.llm_service.generate(
+                f"{prompt}: {message.content}",
+                channel_id=message.channel.id,
+                user_id=message.author.id
+            )
+        except (LlmOverloadedError, LlmTimeoutError) as e:
+            logger.info(f"Dropped LLM response for {message.author}: {e}")
+            return None
         except Exception as e:
             logger.error(f"Error generating LLM response: {e}")
             return None
@@ -125,9 +131,9 @@ def setup_message_handler(bot):
 
     @bot.event
     async def on_message_delete(message: Message):
-        logger.info(f"Message by {message.author} deleted: {message.content}")
+        discord_event_logger.info("Message by %s deleted: %s", message.author, message.content)
 
     @bot.event
     async def on_reaction_add(reaction, user):
-        logger.info(f"{user} reacted with {reaction.emoji}")
+        discord_event_logger.info("%s reacted with %s", user, reaction.emoji)
 
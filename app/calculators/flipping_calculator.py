@@ -4,7 +4,7 @@ from typing import Dict
 import numpy as np
 from pydantic import BaseModel
 
-from app.models.runescape import OsrsItem, LatestItemsResponse, FlippingResult, ItemVolumeResponse
+from app.models.runescape import OsrsItem, LatestItemsResponse, FlippingResult, ItemVolumeResponse, FlippingBatchResult
 from app.utils.logger import logger
 
 
@@ -12,6 +12,7 @@ class FlippingCalculator:
     TAX_RATE = 0.01
     ITEM_VOLUMES : ItemVolumeResponse = None
     VOLUME_PERCENTILES = [0, 0, 0, 0, 0]
+    VOLUME_SCORES = np.array([0.1, 0.25, 0.5, 0.75, 0.9, 1.0])
 
     def __init__(self):
         self.cache: Dict[int, FlippingResult] = {}
@@ -25,8 +26,7 @@ class FlippingCalculator:
 
     def set_item_volumes (self, item_volumes: ItemVolumeResponse):
         self.ITEM_VOLUMES = item_volumes
-        volume_values = [volume for _, volume in item_volumes.items.values()]
-        self.VOLUME_PERCENTILES = np.percentile(volume_values, [25, 50, 75, 90, 95])
+        self.VOLUME_PERCENTILES = item_volumes.get_percentiles()
 
     def score_volume(self, volume: int) -> float:
         """
@@ -118,5 +118,77 @@ class FlippingCalculator:
 
         return flipping_result
 
-    def calculate_v3(self,limit: int, high_price: int, low_price: int,item_name: str):
-        pass
+    def calculate_batch(self, high_price: np.ndarray, low_price: np.ndarray, limit: np.ndarray, volume: np.ndarray) -> FlippingBatchResult:
+        """
+        Same maths as calculate_v2, but for the whole market in one vectorized pass.
+        All inputs are aligned arrays with one entry per item.
+        """
+        high_price = np.asarray(high_price, dtype=np.int64)
+        low_price = np.asarray(low_price, dtype=np.int64)
+        limit = np.asarray(limit, dtype=np.int64)
+        volume = np.asarray(volume, dtype=np.int64)
+
+        diff = high_price - low_price
+        tax_rate = np.where(high_price > 100, self.TAX_RATE, 0.0)
+
+        profit_per_item = (high_price * (1 - tax_rate)) - low_price
+        total_cost = low_price * limit
+        profit = profit_per_item * limit
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roi = np.where(total_cost > 0, (profit / total_cost) * 100, 0.0)
+            roi_per_item = np.where(low_price > 0, (profit_per_item / low_price) * 100, 0.0)
+
+        # searchsorted counts how many percentile cut-offs the volume reaches, same buckets as score_volume
+        score_index = np.searchsorted(self.VOLUME_PERCENTILES, volume, side="right")
+
+        return FlippingBatchResult(
+            high_price=high_price,
+            low_price=low_price,
+            price_diff=diff,
+            cash_needed=total_cost,
+            total_profit=np.floor(profit).astype(np.int64),
+            profit_no_tax=diff * limit,
+            profit_per_item=np.floor(profit_per_item).astype(np.int64),
+            profit_per_item_no_tax=diff,
+            roi_percentage=roi,
+            roi_per_item=roi_per_item,
+            limit=limit,
+            volume=volume,
+            score_volume=self.VOLUME_SCORES[score_index]
+        )
+
+    def calculate_v3(self, budget: int, calc: FlippingBatchResult) -> np.ndarray:
+        """
+        Split a budget over the market to maximize expected profit, within each item's buy limit.
+        The expected profit of an item is its profit per item discounted by score_volume, the chance the offer fills.
+        Greedy on the LP relaxation of the bounded knapsack: items are taken by expected profit per gp spent,
+        each up to its limit or what is left of the budget. Returns the quantity to buy of each item in `calc`.
+        """
+        quantity = np.zeros(calc.low_price.size, dtype=np.int64)
+        expected_profit = calc.profit_per_item * calc.score_volume
+        candidates = np.flatnonzero((expected_profit > 0) & (calc.low_price > 0) & (calc.limit > 0))
+        if budget <= 0 or candidates.size == 0:
+            return quantity
+
+        density = expected_profit[candidates] / calc.low_price[candidates]
+        order = candidates[np.argsort(-density, kind="stable")]
+
+        # The best items are bought up to their whole limit until the budget no longer covers one
+        full_cost = np.cumsum(calc.low_price[order] * calc.limit[order])
+        full = int(np.searchsorted(full_cost, budget, side="right"))
+        quantity[order[:full]] = calc.limit[order[:full]]
+        remaining = budget - (int(full_cost[full - 1]) if full else 0)
+
+        # Then whatever still fits, in the same order
+        rest = order[full:]
+        cheapest = np.minimum.accumulate(calc.low_price[rest][::-1])[::-1]  # Cheapest price from each position on
+        for position, item in enumerate(rest.tolist()):
+            if remaining < cheapest[position]:
+                break
+            price = int(calc.low_price[item])
+            taken = min(int(calc.limit[item]), remaining // price)
+            quantity[item] = taken
+            remaining -= taken * price
+
+        return quantity
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import List
+from typing import Dict, List
 
 import discord
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,6 +16,10 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     LOG_LEVEL: str = "INFO"
 
+    ## Precompressed responses for the large endpoints
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 5
+
     ## FastAPI CORS Settings
     CORS_ORGINS: List[str] = ["*"]
     ALLOW_CREDENTIALS: bool = True
@@ -23,33 +27,132 @@ class Settings(BaseSettings):
     ALLOW_HEADERS: List[str] = ["*"]
 
     ## Base Urls:
-    SSB_BASE_URL: str = 'https://api.opendota.com/api'
-    OPENDOTA_BASE_URL: str = 'https://data.ssb.no/api/v0/no'
+    SSB_BASE_URL: str = 'https://data.ssb.no/api/v0/no'
+    OPENDOTA_BASE_URL: str = 'https://api.opendota.com/api'
     OSRS_BASE_URL: str = 'https://prices.runescape.wiki/api/v1/osrs'
 
     ## Other URLs
     OSRS_VOLUMES_URL: str = 'https://oldschool.runescape.wiki/?title=Module:GEVolumes/data.json&action=raw&ctype=application%2Fjson'
 
+    ## HTTP Client Settings (one shared pool per upstream host)
+    HTTP_USER_AGENT: str = "Discord Bot: @Thaffy on Discord"
+    HTTP2_ENABLED: bool = True
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+
+    ## Upstream rate limits, requests per minute per host
+    UPSTREAM_RATE_LIMITS: Dict[str, int] = {
+        "api.opendota.com": 60,
+        "prices.runescape.wiki": 60,
+        "oldschool.runescape.wiki": 30,
+        "data.ssb.no": 30,
+    }
+    UPSTREAM_DEFAULT_RATE_LIMIT: int = 60
+    UPSTREAM_BURST: int = 10
+    UPSTREAM_MAX_RETRIES: int = 3  # Retries after a 429 before giving the response to the caller
+
+    ## Dota
+    DOTA_PLAYER_CONCURRENCY: int = 8
+
+    ## OSRS Price Poller
+    OSRS_PRICE_POLL_INTERVAL: timedelta = timedelta(seconds=60)
+
+    ## OSRS Price History
+    OSRS_PRICE_HISTORY_SIZE: int = 360  # Ticks kept per item, 6 hours at the default poll interval
+    OSRS_PRICE_HISTORY_EWMA_ALPHA: float = 0.1
+
+    ## OSRS Live Price Feed
+    OSRS_FEED_QUEUE_SIZE: int = 16  # Messages buffered per client before it is evicted as a slow consumer
+    OSRS_FEED_MAX_SUBSCRIBERS: int = 500
+    OSRS_FEED_HEARTBEAT: timedelta = timedelta(seconds=15)
+
+    ## OSRS Price Alerts
+    OSRS_ALERT_HYSTERESIS: float = 0.02  # A fired alert re-arms once the price is 2% back past its threshold
+    OSRS_ALERT_COOLDOWN: timedelta = timedelta(minutes=15)  # Minimum time between two notifications of one alert
+    OSRS_ALERTS_PER_USER: int = 25
+
+    ## OSRS Price Backfill (python -m app.services.osrs_backfill)
+    OSRS_BACKFILL_CONCURRENCY: int = 8
+    OSRS_BACKFILL_RATE_LIMIT: int = 300  # Requests per minute, the backfill runs in its own process with its own scheduler
+    OSRS_BACKFILL_BATCH_REQUESTS: int = 32  # Upstream responses per COPY + upsert transaction
+
+    ## OSRS Volume Cache
+    OSRS_VOLUME_REFRESH_INTERVAL: timedelta = timedelta(minutes=15)
+
+    ## OSRS Item Search
+    OSRS_FUZZY_MATCH_THRESHOLD: float = 0.5
+    OSRS_SEARCH_LIMIT: int = 10
+
     ## Redis Settings
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 1.0
+
+    ## Cache Settings (in-process L1 in front of Redis L2)
+    CACHE_KEY_PREFIX: str = "cache"
+    CACHE_KEY_VERSION: int = 1  # Bump to invalidate every cached entry
+    CACHE_L1_MAXSIZE: int = 1024  # Entries per namespace
+    CACHE_L1_TTL_SECONDS: int = 60
+    CACHE_DEFAULT_TTL_SECONDS: int = 300
+    CACHE_TTLS: Dict[str, int] = {
+        "dota.pros": 3600,
+        "dota.player": 300,
+        "dota.match": 86400,  # Finished matches never change
+        "ssb.tables": 86400,
+        "ssb.table": 3600,
+    }
 
     ## Database Settings
+    DATABASE_URL: str = ""  # Takes precedence over the DB_* settings when set
     DB_HOST: str = "localhost"
     DB_PORT: int = 5432
     DB_USER: str = ""
     DB_PASSWORD: str = ""
     DB_NAME: str = ""
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT_SECONDS: float = 5.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 256  # Prepared statements cached per asyncpg connection
+    DB_CREATE_TABLES: bool = True  # Create missing tables at startup
+
+    ## Write-behind queue for small inserts from bot commands
+    DB_WRITE_BEHIND_INTERVAL: timedelta = timedelta(seconds=2)
+    DB_WRITE_BEHIND_BATCH_SIZE: int = 500
+    DB_WRITE_BEHIND_MAX_PENDING: int = 10000
 
     ## Discord Bot
     DISCORD_TOKEN: str = "" # Set in .env
     DISCORD_COMMAND_PREFIX: str = "$"
     DISCORD_INTENTS: discord.Intents = discord.Intents.default()
+    # How often app/json_files/predefined_responses.json is checked for changes, see predefined_responses.example.json.
+    # "global" replaces Constants.PREDEFINED_RESPONSES, "guilds" maps a guild id to entries matched before the global ones.
+    # Entries are {"triggers": [...], "response": "...", "whole_word": false}, the first matching entry answers
+    DISCORD_RESPONSES_RELOAD_INTERVAL: timedelta = timedelta(seconds=10)
+
+    ## Metrics
+    METRICS_LOOP_LAG_INTERVAL: timedelta = timedelta(milliseconds=500)  # How often the event loop lag is probed
+
+    ## Debug endpoints (/debug), all of them answer 404 unless an admin token is set
+    DEBUG_ADMIN_TOKEN: str = "" # Set in .env, sent as "Authorization: Bearer <token>"
+    DEBUG_PROFILE_MAX_DURATION: timedelta = timedelta(seconds=60)
+    DEBUG_SLOW_CALLBACK_THRESHOLD: timedelta = timedelta(milliseconds=100)
+    DEBUG_SLOW_CALLBACK_ON_STARTUP: bool = False  # Start the slow callback monitor with the app instead of on request
+    DEBUG_SLOW_CALLBACK_HISTORY: int = 100  # Stalls kept for GET /debug/slow-callbacks
 
     ## LLMS
     GEMINI_API_KEY: str = "" # Set in .env
     LLM_COOLDOWN_DURATION : timedelta = timedelta(seconds=1)  # set to your desired duration
+    LLM_WORKERS: int = 4
+    LLM_QUEUE_SIZE: int = 32
+    LLM_MAX_PENDING_PER_CHANNEL: int = 2
+    LLM_MAX_PENDING_PER_USER: int = 1
+    LLM_REQUEST_TIMEOUT: timedelta = timedelta(seconds=30)
 
     def __init__(self,**kwargs):
         super().__init__(**kwargs)
@@ -1,11 +1,16 @@
-import asyncio
 import json
 import os
-from datetime import datetime
-from typing import Optional, Dict
+import time
+from typing import Optional, Dict, List
+from app.config import settings
 from app.models.dota import Hero
 from app.models.runescape import OsrsItem
+from app.utils.catalog_snapshot import JSON_FILES_DIR, load_snapshot
 from app.utils.logger import logger
+from app.utils.timing import log_duration
+from app.utils.trigger_matcher import TriggerMatcher
+
+PREDEFINED_RESPONSES_FILE = os.path.join(JSON_FILES_DIR, "predefined_responses.json")
 
 class Constants:
 
@@ -31,6 +36,7 @@ class Constants:
     OSRS_TRADING_CHANNEL_ID: int = 1303857091643052124
 
     ## Discord Bot Predefined reponses
+    ## The global set unless predefined_responses.json overrides it, see load_predefined_responses
     PREDEFINED_RESPONSES = [
         {
             "triggers": ["we'll see", "we will see"],
@@ -66,15 +72,43 @@ class Constants:
         }
     ]
 
-    OSRSITEMLIST: Dict[int,OsrsItem] = {}
-    DOTAHEROESLIST: Dict[int,Hero] = {}
-
-    def __init__(self, **kwargs):
-        asyncio.gather(
-            asyncio.to_thread(self.load_osrs_item_map),
-            asyncio.to_thread(self.load_dota_heroes_map)
-        )
-        super().__init__(**kwargs)
+    ## Common OSRS item abbreviations, resolved by OsrsService's item search index
+    OSRS_ITEM_ALIASES = {
+        "ags": "Armadyl godsword",
+        "bgs": "Bandos godsword",
+        "sgs": "Saradomin godsword",
+        "zgs": "Zamorak godsword",
+        "dwh": "Dragon warhammer",
+        "tbow": "Twisted bow",
+        "bp": "Toxic blowpipe (empty)",
+        "whip": "Abyssal whip",
+        "bond": "Old school bond",
+        "sara brew": "Saradomin brew(4)",
+        "brew": "Saradomin brew(4)",
+        "ppot": "Prayer potion(4)",
+        "restore": "Super restore(4)",
+        "scb": "Super combat potion(4)",
+        "stam": "Stamina potion(4)",
+    }
+
+    _osrs_item_list: Optional[Dict[int,OsrsItem]] = None
+    _dota_heroes_list: Optional[Dict[int,Hero]] = None
+    _response_matchers: Optional[Dict[Optional[int],TriggerMatcher]] = None  # Per guild id, None for the global set
+    _responses_mtime: Optional[float] = None
+    _responses_checked_at: float = 0.0
+
+    ## Catalogs are loaded lazily on first access, from the prebuilt snapshot when it is up to date
+    @property
+    def OSRSITEMLIST(self) -> Dict[int,OsrsItem]:
+        if self._osrs_item_list is None:
+            self.load_osrs_item_map()
+        return self._osrs_item_list
+
+    @property
+    def DOTAHEROESLIST(self) -> Dict[int,Hero]:
+        if self._dota_heroes_list is None:
+            self.load_dota_heroes_map()
+        return self._dota_heroes_list
 
     def get_player_ids(self):
         return [self.THAFFY_DOTA_ID, self.LARIUS_DOTA_ID, self.KYO0X_DOTA_ID, self.ADAM_DOTA_ID]
@@ -89,47 +123,83 @@ class Constants:
             if start <= tier <= end:
                 return rank_name
 
-    def get_predefined_response(self, message_content: str) -> Optional[str]:
-        message_content_lower = message_content.lower()
-        for item in self.PREDEFINED_RESPONSES:
-            if any(trigger in message_content_lower for trigger in item["triggers"]):
-                return item["response"]
-        return None
+    def get_predefined_response(self, message_content: str, guild_id: Optional[int] = None) -> Optional[str]:
+        if time.monotonic() - self._responses_checked_at >= settings.DISCORD_RESPONSES_RELOAD_INTERVAL.total_seconds():
+            self.load_predefined_responses()
+        matcher = self._response_matchers.get(guild_id) or self._response_matchers[None]
+        return matcher.match(message_content)
+
+    def load_predefined_responses(self, force: bool = False) -> Dict[Optional[int],TriggerMatcher]:
+        """
+        Compile the predefined responses, reloading predefined_responses.json when it changed since the last load.
+        The file looks like {"global": [entries], "guilds": {"<guild id>": [entries]}}, both optional,
+        with entries as in PREDEFINED_RESPONSES plus an optional "whole_word" flag (see TriggerMatcher).
+        "global" replaces PREDEFINED_RESPONSES, a guild's own entries are matched before the global ones and
+        the first matching entry answers. app/json_files/predefined_responses.example.json is a starting point.
+        """
+        self._responses_checked_at = time.monotonic()
+        try:
+            mtime = os.stat(PREDEFINED_RESPONSES_FILE).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if not force and self._response_matchers is not None and mtime == self._responses_mtime:
+            return self._response_matchers
+        self._responses_mtime = mtime
+
+        global_responses: List[dict] = self.PREDEFINED_RESPONSES
+        guild_responses: Dict[int,List[dict]] = {}
+        try:
+            if mtime is not None:
+                with open(PREDEFINED_RESPONSES_FILE, "r") as file:
+                    config = json.load(file)
+                global_responses = config.get("global", global_responses)
+                guild_responses = {int(guild_id): entries for guild_id, entries in config.get("guilds", {}).items()}
+
+            matchers = {None: TriggerMatcher(global_responses)}
+            for guild_id, entries in guild_responses.items():
+                matchers[guild_id] = TriggerMatcher(entries + global_responses)
+        except (json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError) as e:
+            # Keep answering with the previous responses, the file is read again once it changes
+            logger.error(f"Invalid predefined_responses.json, keeping the previous responses: {e!r}")
+            if self._response_matchers is None:
+                self._response_matchers = {None: TriggerMatcher(self.PREDEFINED_RESPONSES)}
+            return self._response_matchers
+
+        self._response_matchers = matchers
+        logger.info(f"Predefined responses loaded: {len(global_responses)} global, {len(guild_responses)} guild sets")
+        return self._response_matchers
 
     def load_osrs_item_map(self):
+        file_path = os.path.join(JSON_FILES_DIR, "osrs_item_map.json")
+        self._osrs_item_list = {}
         try:
-            #logger.warn(f"Loading osrs item map: {datetime.now()}")
-            file_path = os.path.join(os.path.dirname(__file__), "json_files/osrs_item_map.json")
-            with open(file_path, "r") as file:
-                items = [OsrsItem(**item) for item in json.load(file)]
-            self.OSRSITEMLIST = {item.id: item for item in items}
+            with log_duration("Loading osrs item map"):
+                items = load_snapshot(file_path, OsrsItem)
+                if items is None:
+                    with open(file_path, "r") as file:
+                        items = [OsrsItem(**item) for item in json.load(file)]
+                self._osrs_item_list = {item.id: item for item in items}
         except FileNotFoundError:
             logger.error("The osrs_item_map.json file was not found.")
-            return []
         except json.JSONDecodeError:
             logger.error("Error decoding JSON in osrs_item_map.json.")
-            return []
-        finally:
-            #logger.warn(f"Finished loading osrs item map: {datetime.now()}")
-            pass
+        return self._osrs_item_list
 
     def load_dota_heroes_map(self):
+        file_path = os.path.join(JSON_FILES_DIR, "heroes.json")
+        self._dota_heroes_list = {}
         try:
-            #logger.warn(f"Loading dota heroes map: {datetime.now()}")
-            file_path = os.path.join(os.path.dirname(__file__), "json_files/heroes.json")
-            with open(file_path, "r") as file:
-                data = json.load(file)
-                items = [Hero(**hero_data) for hero_data in data.values()]
-            self.DOTAHEROESLIST = {item.id: item for item in items}
+            with log_duration("Loading dota heroes map"):
+                items = load_snapshot(file_path, Hero)
+                if items is None:
+                    with open(file_path, "r") as file:
+                        items = [Hero(**hero_data) for hero_data in json.load(file).values()]
+                self._dota_heroes_list = {item.id: item for item in items}
         except FileNotFoundError:
-            logger.error("The osrs_item_map.json file was not found.")
-            return []
+            logger.error("The heroes.json file was not found.")
         except json.JSONDecodeError:
-            logger.error("Error decoding JSON in osrs_item_map.json.")
-            return []
-        finally:
-            #logger.warn(f"Finished loading dota heroes map: {datetime.now()}")
-            pass
+            logger.error("Error decoding JSON in heroes.json.")
+        return self._dota_heroes_list
 
 
 
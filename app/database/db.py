@@ -1,9 +1,102 @@
-import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from app.config import settings
+from app.utils.exceptions import DatabaseUnavailableError
+from app.utils.logger import logger
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+
+def get_database_url(driver: Optional[str] = None) -> str:
+    """
+    DATABASE_URL if set, otherwise a postgres url built from the DB_* settings. Empty when neither is configured.
+    With `driver` the url is in SQLAlchemy's postgresql+<driver>:// form, without it a plain postgresql:// url
+    that asyncpg and libpq accept, whichever form DATABASE_URL was written in.
+    """
+    url = settings.DATABASE_URL
+    if not url and settings.DB_NAME:
+        url = f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    if url:
+        scheme, _, rest = url.partition("://")
+        if scheme.split("+", 1)[0] in ("postgresql", "postgres"):
+            url = f"postgresql+{driver}://{rest}" if driver else f"postgresql://{rest}"
+    return url
+
+
+class Database:
+    """
+    App-scoped async engine and session factory, opened and disposed in main.py's lifespan.
+    When no database is configured the app still starts, and sessions raise DatabaseUnavailableError.
+    """
+    _engine: Optional[AsyncEngine] = None
+    _session_factory: Optional[async_sessionmaker] = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return cls._session_factory is not None
+
+    @classmethod
+    async def startup(cls):
+        url = get_database_url(driver="asyncpg")
+        if not url:
+            logger.warning("No database configured, persistence features are unavailable")
+            return
+
+        connect_args = {}
+        if url.startswith("postgresql+asyncpg"):
+            # asyncpg prepares every statement, keep the hot ones cached per connection
+            connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+
+        cls._engine = create_async_engine(
+            url,
+            echo=settings.DB_ECHO,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=True,
+            connect_args=connect_args
+        )
+        cls._session_factory = async_sessionmaker(cls._engine, expire_on_commit=False)
+
+        try:
+            async with cls._engine.begin() as conn:
+                if settings.DB_CREATE_TABLES:
+                    # Importing the models registers their tables on Base
+                    import app.database.models.osrs_alerts  # noqa: F401
+                    import app.database.models.osrs_prices  # noqa: F401
+                    import app.database.models.osrs_trades  # noqa: F401
+                    await conn.run_sync(Base.metadata.create_all)
+        except Exception as e:
+            logger.error(f"Database unreachable, persistence features are unavailable: {e}")
+            await cls.shutdown()
+            return
+
+        logger.info(f"Database engine started with a pool of {settings.DB_POOL_SIZE}")
+
+    @classmethod
+    async def shutdown(cls):
+        if cls._engine is not None:
+            await cls._engine.dispose()
+            logger.info("Database engine disposed")
+        cls._engine = None
+        cls._session_factory = None
+
+    @classmethod
+    @asynccontextmanager
+    async def session(cls) -> AsyncIterator[AsyncSession]:
+        """A session that commits when the block exits cleanly and rolls back otherwise."""
+        if cls._session_factory is None:
+            raise DatabaseUnavailableError()
+
+        async with cls._session_factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
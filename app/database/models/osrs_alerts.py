@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, Index, Integer, String, func
+
+from app.database.db import Base
+
+
+class OsrsPriceAlert(Base):
+    """A user's price alert. Deleted alerts are kept with active = false."""
+    __tablename__ = "osrs_price_alerts"
+    __table_args__ = (
+        Index("ix_osrs_price_alerts_active", "active"),
+    )
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    user_id = Column(BigInteger, nullable=False)
+    guild_id = Column(BigInteger)
+    channel_id = Column(BigInteger)  # Null for alerts delivered by DM
+    item_id = Column(Integer, nullable=False)
+    kind = Column(String(8), nullable=False)  # "below", "above" or "roi"
+    threshold = Column(Float, nullable=False)
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,32 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, PrimaryKeyConstraint, String
+
+from app.database.db import Base
+
+
+class OsrsPrice(Base):
+    """
+    Average GE prices and volumes per item and timestep, from the prices wiki /5m, /1h and /timeseries endpoints.
+    Range partitioned by month on timestamp. The backfill creates partitions as it needs them.
+    """
+    __tablename__ = "osrs_prices"
+    __table_args__ = (
+        PrimaryKeyConstraint("item_id", "timestep", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+    item_id = Column(Integer, nullable=False)
+    timestep = Column(Integer, nullable=False)  # Seconds: 300, 3600, 21600 or 86400
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    avg_high_price = Column(Integer)
+    high_price_volume = Column(BigInteger)
+    avg_low_price = Column(Integer)
+    low_price_volume = Column(BigInteger)
+
+
+class OsrsBackfillCheckpoint(Base):
+    """Newest timestamp fully written per backfill source, so an interrupted backfill resumes where it stopped."""
+    __tablename__ = "osrs_backfill_checkpoints"
+
+    source = Column(String(32), primary_key=True)  # "5m", "1h" or "timeseries:<timestep>"
+    item_id = Column(Integer, primary_key=True)  # 0 for sources that cover the whole catalog per request
+    timestamp = Column(DateTime(timezone=True), nullable=False)
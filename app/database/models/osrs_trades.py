@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, func
+
+from app.database.db import Base
+
+# quantity and price are 32-bit integer columns, $in and $out refuse anything larger
+MAX_TRADE_VALUE = 2_147_483_647
+
+
+class OsrsTrade(Base):
+    """One $in or $out fill in a user's trade ledger. Buys have a positive quantity, sells a negative one."""
+    __tablename__ = "osrs_trades"
+    __table_args__ = (
+        Index("ix_osrs_trades_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, nullable=False)
+    item_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,186 @@
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from sqlalchemy import Table, bindparam, insert, update
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from app.config import settings
+from app.database.db import Database
+from app.utils.logger import logger
+from app.utils.metrics import WRITE_BEHIND_DROPPED, WRITE_BEHIND_PENDING
+
+# A queued write: the table, the key column for updates (None for inserts) and the row's values
+Write = Tuple[Table, Optional[str], dict]
+
+
+class WriteBehindQueue:
+    """
+    Buffers small inserts and updates (e.g. from Discord commands) and writes them in batches, so callers never wait
+    on the database. Started in main.py's lifespan. Flushes every DB_WRITE_BEHIND_INTERVAL, or as soon as
+    DB_WRITE_BEHIND_BATCH_SIZE rows are pending, with one transaction per run of queued writes sharing a table,
+    operation and column set.
+    Writes reach the database in the order they were queued, so an update queued after an insert finds its row.
+    Rows that fail for connection reasons are put back and retried on the next flush. When the database rejects a
+    group, it is split in halves until the bad rows are isolated, so only those are dropped (and logged).
+    Past DB_WRITE_BEHIND_MAX_PENDING rows (e.g. while the database is down) the oldest rows are dropped.
+    Both kinds of drops are counted in write_behind_dropped_rows_total.
+    """
+    _pending: Deque[Write] = deque()
+    _task: Optional[asyncio.Task] = None
+    _wake: Optional[asyncio.Event] = None
+    _flush_lock: Optional[asyncio.Lock] = None
+    _overflowed: int = 0
+    _rejected: int = 0
+
+    @classmethod
+    def add(cls, model, **values):
+        """Queue one row for `model`'s table. Never blocks; rows are dropped when no database is configured."""
+        cls._queue((model.__table__, None, values))
+
+    @classmethod
+    def update(cls, model, key: str, **values):
+        """Queue an update of the row of `model`'s table whose `key` column equals values[key], setting the other values."""
+        cls._queue((model.__table__, key, values))
+
+    @classmethod
+    def _queue(cls, write: Write):
+        if not Database.is_available():
+            return
+
+        cls._pending.append(write)
+        if len(cls._pending) > settings.DB_WRITE_BEHIND_MAX_PENDING:
+            table, _, _ = cls._pending.popleft()
+            cls._overflowed += 1
+            WRITE_BEHIND_DROPPED.labels(table.name, "overflow").inc()
+            if cls._overflowed % 1000 == 1:
+                logger.error(f"Write-behind queue is full, {cls._overflowed} of the oldest rows dropped so far")
+
+        if cls._wake is not None and len(cls._pending) >= settings.DB_WRITE_BEHIND_BATCH_SIZE:
+            cls._wake.set()
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {"pending": len(cls._pending), "overflowed": cls._overflowed, "rejected": cls._rejected}
+
+    @classmethod
+    def _reject(cls, table: Table, values: dict, error: Exception):
+        cls._rejected += 1
+        WRITE_BEHIND_DROPPED.labels(table.name, "rejected").inc()
+        logger.error(f"Write-behind row for {table.name} rejected by the database, dropping it: {values} ({getattr(error, 'orig', error)})")
+
+    @staticmethod
+    def _statement(table: Table, key: Optional[str], rows: List[dict]):
+        """The statement and executemany parameters for one group of writes."""
+        if key is None:
+            return insert(table), rows
+        # The key is bound under another name, a parameter named after a column would be taken as a value to set
+        statement = update(table).where(table.c[key] == bindparam(f"key_{key}"))
+        return statement, [{**{column: value for column, value in row.items() if column != key}, f"key_{key}": row[key]} for row in rows]
+
+    @classmethod
+    async def flush(cls) -> int:
+        """
+        Write up to one batch of pending rows. Returns the number of rows written or rejected,
+        which is less than the batch when rows had to be put back because the database could not be reached.
+        """
+        if cls._flush_lock is None:
+            cls._flush_lock = asyncio.Lock()
+
+        # Flushes run one at a time, so batches reach the database in the order they were queued
+        async with cls._flush_lock:
+            batch = [cls._pending.popleft() for _ in range(min(len(cls._pending), settings.DB_WRITE_BEHIND_BATCH_SIZE))]
+            if not batch:
+                return 0
+
+            # One executemany per run of consecutive writes with the same table, operation and column set.
+            # Only neighbours are merged, so every write still runs after everything queued before it
+            # (an update never overtakes the insert of its row)
+            chunks: Deque[Tuple[Table, Optional[str], List[dict]]] = deque()
+            last_group = None
+            for table, key, values in batch:
+                group = (table, key, tuple(sorted(values)))
+                if group == last_group:
+                    chunks[-1][2].append(values)
+                else:
+                    chunks.append((table, key, [values]))
+                    last_group = group
+            handled = 0
+            while chunks:
+                table, key, rows = chunks[0]
+                try:
+                    async with Database.session() as session:
+                        await session.execute(*cls._statement(table, key, rows))
+                except DBAPIError as e:
+                    if e.connection_invalidated or isinstance(e, (OperationalError, InterfaceError)):
+                        cls._requeue(chunks)
+                        logger.error(f"Write-behind flush failed, {len(batch) - handled} rows put back to retry later: {e}")
+                        return handled
+                    # The database refused the rows (constraints, out of range values, ...) and retrying will not
+                    # change that, bisect until the bad rows are alone and drop only those
+                    chunks.popleft()
+                    if len(rows) == 1:
+                        cls._reject(table, rows[0], e)
+                        handled += 1
+                    else:
+                        middle = len(rows) // 2
+                        chunks.extendleft(((table, key, rows[middle:]), (table, key, rows[:middle])))
+                    continue
+                except asyncio.CancelledError:
+                    cls._requeue(chunks)
+                    raise
+                except Exception as e:
+                    cls._requeue(chunks)
+                    logger.error(f"Write-behind flush failed, {len(batch) - handled} rows put back to retry later: {e}")
+                    return handled
+
+                chunks.popleft()
+                handled += len(rows)
+
+            return handled
+
+    @classmethod
+    def _requeue(cls, chunks: Deque[Tuple[Table, Optional[str], List[dict]]]):
+        cls._pending.extendleft(reversed([(table, key, values) for table, key, rows in chunks for values in rows]))
+
+    @classmethod
+    async def _run(cls):
+        interval = settings.DB_WRITE_BEHIND_INTERVAL.total_seconds()
+        while True:
+            try:
+                await asyncio.wait_for(cls._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            cls._wake.clear()
+
+            # Keep going while full batches are written, stop on an empty queue or a failed flush
+            while await cls.flush() == settings.DB_WRITE_BEHIND_BATCH_SIZE:
+                pass
+
+    @classmethod
+    async def start(cls):
+        if cls._task is None and Database.is_available():
+            WRITE_BEHIND_PENDING.set_function(lambda: len(cls._pending))
+            cls._wake = asyncio.Event()
+            cls._task = asyncio.create_task(cls._run())
+            logger.info("Write-behind queue started")
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is None:
+            return
+
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
+        cls._wake = None
+
+        # Drain what is left before the engine is disposed
+        while cls._pending and await cls.flush():
+            pass
+        if cls._pending:
+            logger.error(f"Write-behind queue stopped with {len(cls._pending)} rows unwritten")
+        logger.info("Write-behind queue stopped")
@@ -1,8 +1,13 @@
+from typing import AsyncIterator
+
 from discord.ext import commands
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.database.db import Database
 from app.services.dota_service import DotaService
 from app.services.gemini_service import GeminiService
+from app.services.http_client import HttpClientPool
 from app.services.osrs_service import OsrsService
 from app.services.ssb_service import SsbService
 from app.bots.discord_bot import DiscordBot
@@ -14,13 +19,17 @@ from app.bots.discord_bot import DiscordBot
 ###
 
 def get_ssb_service() -> SsbService:
-    return SsbService(base_url=settings.SSB_BASE_URL)
+    return SsbService(base_url=settings.SSB_BASE_URL, scheduler=HttpClientPool.get_scheduler(settings.SSB_BASE_URL))
 
 def get_dota_service() -> DotaService:
-    return DotaService(base_url=settings.OPENDOTA_BASE_URL)
+    return DotaService(base_url=settings.OPENDOTA_BASE_URL, scheduler=HttpClientPool.get_scheduler(settings.OPENDOTA_BASE_URL))
 
 def get_osrs_service() -> OsrsService:
-    return OsrsService(base_url=settings.OSRS_BASE_URL)
+    return OsrsService(
+        base_url=settings.OSRS_BASE_URL,
+        scheduler=HttpClientPool.get_scheduler(settings.OSRS_BASE_URL),
+        volumes_scheduler=HttpClientPool.get_scheduler(settings.OSRS_VOLUMES_URL)
+    )
 
 async def get_discord_bot() -> commands.Bot:
     return await DiscordBot.get_bot()
@@ -29,4 +38,8 @@ async def get_discord_service() -> DiscordBot:
     return DiscordBot()
 
 def get_gemini_service() -> GeminiService:
-    return GeminiService()
\ No newline at end of file
+    return GeminiService()
+
+async def get_db_session() -> AsyncIterator[AsyncSession]:
+    async with Database.session() as session:
+        yield session
@@ -1,24 +1,68 @@
+import time
+_import_start = time.perf_counter()
+
 import asyncio
 from contextlib import asynccontextmanager
 from datetime import datetime
+from http import HTTPStatus
 
+import httpx
 from discord.errors import HTTPException, LoginFailure
 
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.config import settings
+from app.database.db import Database
+from app.database.write_behind import WriteBehindQueue
 from app.dependencies import get_discord_bot, get_gemini_service
+from app.routes.debug.router import debug_router
 from app.routes.discord.router import discord_router
 from app.routes.dota.router import dota_router
 from app.routes.osrs.router import osrs_router
 from app.routes.ssb.router import ssb_router
+from app.services.cache_service import CacheService
 from app.services.gemini_service import GeminiService
+from app.services.http_client import HttpClientPool
+from app.services.llm_pipeline import LlmPipeline
+from app.services.osrs_alerts import PriceAlertEngine
+from app.services.osrs_price_feed import OsrsPriceFeed
+from app.services.osrs_price_history import PriceHistoryStore
+from app.services.osrs_price_poller import OsrsPricePoller
+from app.services.osrs_volume_cache import OsrsVolumeCache
+from app.utils.exceptions import DatabaseUnavailableError, LlmOverloadedError, LlmTimeoutError
 from app.utils.logger import logger
+from app.utils.metrics import EventLoopMonitor, MetricsMiddleware
+from app.utils.profiling import SlowCallbackMonitor, TaskTracker
+from app.utils.timing import log_duration
+
+logger.info(f"Module imports took {(time.perf_counter() - _import_start) * 1000:.1f}ms")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     start_time = datetime.now()
-    discord_bot = await get_discord_bot()
+    if settings.DEBUG_ADMIN_TOKEN:
+        TaskTracker.install(asyncio.get_running_loop())
+    with log_duration("HTTP client pools startup"):
+        await HttpClientPool.startup()
+    with log_duration("Cache startup"):
+        await CacheService.startup()
+    with log_duration("Database startup"):
+        await Database.startup()
+    with log_duration("Background tasks startup"):
+        await WriteBehindQueue.start()
+        await LlmPipeline.start()
+        OsrsPricePoller.add_listener(PriceHistoryStore.on_snapshot)
+        await PriceAlertEngine.start()
+        OsrsPriceFeed.start()
+        await OsrsPricePoller.start()
+        await OsrsVolumeCache.start()
+        await EventLoopMonitor.start()
+        if settings.DEBUG_ADMIN_TOKEN and settings.DEBUG_SLOW_CALLBACK_ON_STARTUP:
+            await SlowCallbackMonitor.start(settings.DEBUG_SLOW_CALLBACK_THRESHOLD.total_seconds())
+    with log_duration("Discord bot setup"):
+        discord_bot = await get_discord_bot()
     bot_task = None
 
     try:
@@ -32,7 +76,7 @@ async def lifespan(app: FastAPI):
             logger.info("Application & Discord bot started")
             end_time = datetime.now()
             logger.warn(f"Startup time: {end_time - start_time}")
-        except (HTTPException, LoginFailure) as e:
+        except (HTTPException, LoginFailure, OSError) as e:  # OSError: Discord unreachable, e.g. offline load tests
             logger.warning("Discord bot failed to start: Bot features are unavailable")
             logger.warning(f"Error: {e}")
             bot_task = None
@@ -48,6 +92,17 @@ async def lifespan(app: FastAPI):
         if bot_task and not discord_bot.is_closed():
             await discord_bot.close()
 
+        await SlowCallbackMonitor.stop()
+        await EventLoopMonitor.stop()
+        await OsrsVolumeCache.stop()
+        await OsrsPricePoller.stop()
+        await PriceAlertEngine.stop()
+        await LlmPipeline.stop()
+        await WriteBehindQueue.stop()
+        await Database.shutdown()
+        await CacheService.shutdown()
+        await HttpClientPool.shutdown()
+
         logger.warn("Application & Discord bot shut down complete")
 
 
@@ -68,11 +123,23 @@ app.add_middleware(
     allow_methods=settings.ALLOW_METHODS,
     allow_headers=settings.ALLOW_HEADERS,
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(dota_router)
 app.include_router(ssb_router)
 app.include_router(osrs_router)
 app.include_router(discord_router)
+app.include_router(debug_router)
+
+@app.exception_handler(httpx.HTTPStatusError)
+async def upstream_error_handler(request: Request, exc: httpx.HTTPStatusError):
+    # Pass upstream client errors (e.g. unknown player) through, anything else is a bad gateway
+    status_code = exc.response.status_code if 400 <= exc.response.status_code < 500 else 502
+    return JSONResponse(status_code=status_code, content={"detail": f"Upstream {exc.request.url.host} returned {exc.response.status_code}"})
+
+@app.exception_handler(DatabaseUnavailableError)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailableError):
+    return JSONResponse(status_code=HTTPStatus.SERVICE_UNAVAILABLE, content={"detail": exc.message})
 
 @app.get("/")
 async def root():
@@ -82,9 +149,22 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/health/upstreams")
+async def upstream_health():
+    return HttpClientPool.get_stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/llm")
 async def llm(llm: GeminiService = Depends(get_gemini_service)):
-    return {"response": await llm.generate("Write a short story in 2 sentences")}
+    try:
+        return {"response": await llm.generate("Write a short story in 2 sentences")}
+    except LlmOverloadedError as e:
+        return JSONResponse(status_code=HTTPStatus.SERVICE_UNAVAILABLE, content={"detail": str(e)})
+    except LlmTimeoutError as e:
+        return JSONResponse(status_code=HTTPStatus.GATEWAY_TIMEOUT, content={"detail": str(e)})
 
 
 
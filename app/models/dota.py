@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 
 class Hero(BaseModel):
     id: int
@@ -35,3 +35,13 @@ class Hero(BaseModel):
     day_vision: int
     night_vision: int
     localized_name: str
+
+
+class PlayersRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=100)
+
+
+class PlayersResponse(BaseModel):
+    """Players that were fetched, keyed by account id, and the reason for every id that failed."""
+    players: Dict[int, dict] = {}
+    errors: Dict[int, str] = {}
@@ -1,6 +1,6 @@
 from typing import Optional,Dict, List, Tuple
 import numpy as np
-from pydantic import Field, BaseModel, RootModel
+from pydantic import Field, BaseModel, RootModel, PrivateAttr
 
 class ItemSets:
     DIVINES = [
@@ -29,6 +29,25 @@ class FlippingResult(BaseModel):
     limit: int
     score: int
 
+class FlippingBatchResult(BaseModel):
+    """Flipping metrics for many items at once, one array entry per item."""
+    high_price: np.ndarray
+    low_price: np.ndarray
+    price_diff: np.ndarray
+    cash_needed: np.ndarray
+    total_profit: np.ndarray
+    profit_no_tax: np.ndarray
+    profit_per_item: np.ndarray
+    profit_per_item_no_tax: np.ndarray
+    roi_percentage: np.ndarray
+    roi_per_item: np.ndarray
+    limit: np.ndarray
+    volume: np.ndarray
+    score_volume: np.ndarray
+
+    class Config:
+        arbitrary_types_allowed = True
+
 class DiscordFlippingResult(BaseModel):
     item_name: Optional[str]
     high_price: int
@@ -53,11 +72,34 @@ class OsrsItem(BaseModel):
 
 
 
+class OsrsItemSearchResult(BaseModel):
+    item: OsrsItem
+    score: float
+
+class OsrsMarket(BaseModel):
+    """Column-wise view of every catalog item that currently has a high and a low price."""
+    ids: np.ndarray
+    names: List[str]
+    members: np.ndarray
+    limit: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    volume: np.ndarray
+
+    class Config:
+        arbitrary_types_allowed = True
+
 class ItemVolumeResponse(BaseModel):
     timestamp: int = Field(alias="%LAST_UPDATE%")
     timestamp_formatted: str = Field(alias="%LAST_UPDATE_F%")
     volumes: Dict[str, int] = {}
 
+    # Derived views, computed once per instance (see precompute) since the volumes never change after parsing
+    _scaled_volumes: Optional[Dict[str, int]] = PrivateAttr(default=None)
+    _log_scaled_volumes: Optional[Dict[str, int]] = PrivateAttr(default=None)
+    _percentile_ranks: Optional[Dict[str, float]] = PrivateAttr(default=None)
+    _percentiles: Optional[np.ndarray] = PrivateAttr(default=None)
+
     class Config:
         populate_by_name = True
 
@@ -65,33 +107,68 @@ class ItemVolumeResponse(BaseModel):
         # Extract timestamp fields
         timestamp = data.pop("%LAST_UPDATE%", 0)
         timestamp_formatted = data.pop("%LAST_UPDATE_F%", "")
-        # Remaining data becomes volumes
+        # Remaining data becomes volumes, skipping non-volume entries such as the empty 'items' dict
         super().__init__(
             timestamp=timestamp,
             timestamp_formatted=timestamp_formatted,
-            volumes=data
+            volumes={item: vol for item, vol in data.items() if isinstance(vol, int)}
         )
 
+    def precompute(self) -> "ItemVolumeResponse":
+        """Build every derived view up front, so later readers never recompute them."""
+        self.get_scaled_volumes()
+        self.get_log_scaled_volumes()
+        self.get_percentile_ranks()
+        self.get_percentiles()
+        return self
+
+    def _values(self) -> np.ndarray:
+        return np.fromiter(self.volumes.values(), dtype=np.float64, count=len(self.volumes))
+
     def get_volume(self, item_name: str) -> int:
         """Get volume for a specific item."""
         return self.volumes.get(item_name, 0)
 
     def get_scaled_volumes(self) -> Dict[str, int]:
         """Scale volumes to 1-100 range."""
-        volumes = list(self.volumes.values())
-        if not volumes:
-            return {}
-
-        max_vol = max(volumes)
-        min_vol = min(volumes)
+        if self._scaled_volumes is None:
+            volumes = self._values()
+            if not volumes.size:
+                self._scaled_volumes = {}
+            elif volumes.max() == volumes.min():
+                self._scaled_volumes = {item: 100 for item in self.volumes}
+            else:
+                scaled = ((volumes - volumes.min()) / (volumes.max() - volumes.min()) * 100).astype(np.int64)
+                self._scaled_volumes = dict(zip(self.volumes, scaled.tolist()))
+        return self._scaled_volumes
 
-        if max_vol == min_vol:
-            return {item: 100 for item in self.volumes}
+    def get_log_scaled_volumes(self) -> Dict[str, int]:
+        """Logarithmically scale non-zero volumes to 1-100, zero volumes stay 0."""
+        if self._log_scaled_volumes is None:
+            volumes = self._values()
+            non_zero = volumes > 0
+            if not non_zero.any():
+                self._log_scaled_volumes = dict(self.volumes)
+            else:
+                # Add 1 to handle volumes less than 1
+                log_volumes = np.log(volumes + 1)
+                min_log = log_volumes[non_zero].min()
+                max_log = log_volumes[non_zero].max()
+                scale_factor = 99 / (max_log - min_log) if max_log != min_log else 1
+                scaled = np.where(non_zero, np.ceil((log_volumes - min_log) * scale_factor + 1), 0).astype(np.int64)
+                self._log_scaled_volumes = dict(zip(self.volumes, scaled.tolist()))
+        return self._log_scaled_volumes
 
-        return {
-            item: int(((vol - min_vol) / (max_vol - min_vol)) * 100)
-            for item, vol in self.volumes.items()
-        }
+    def get_percentile_ranks(self) -> Dict[str, float]:
+        """Percentage of items (0-100) trading at or below each item's volume."""
+        if self._percentile_ranks is None:
+            volumes = self._values()
+            if not volumes.size:
+                self._percentile_ranks = {}
+            else:
+                ranks = np.searchsorted(np.sort(volumes), volumes, side="right") / volumes.size * 100
+                self._percentile_ranks = dict(zip(self.volumes, ranks.tolist()))
+        return self._percentile_ranks
 
     def get_sorted_volumes(self, scaled: bool = False) -> List[Tuple[str, int]]:
         """Get volumes sorted by value, optionally scaled."""
@@ -100,8 +177,10 @@ class ItemVolumeResponse(BaseModel):
 
     def get_percentiles(self) -> np.ndarray:
         """Calculate volume percentiles."""
-        volumes = list(self.volumes.values())
-        return np.percentile(volumes, [25, 50, 75, 90, 95])
+        if self._percentiles is None:
+            volumes = self._values()
+            self._percentiles = np.percentile(volumes, [25, 50, 75, 90, 95]) if volumes.size else np.zeros(5)
+        return self._percentiles
 
 class LatestItemEntry(BaseModel):
     high: int
@@ -110,4 +189,80 @@ class LatestItemEntry(BaseModel):
     lowTime: int
 
 class LatestItemsResponse(BaseModel):
-    data: Dict[str, LatestItemEntry]
\ No newline at end of file
+    data: Dict[str, LatestItemEntry]
+
+
+class PriceHistoryPoint(BaseModel):
+    timestamp: int
+    high: int
+    low: int
+    highTime: int
+    lowTime: int
+
+class PriceHistoryStats(BaseModel):
+    samples: int
+    mean: float
+    ewma: float
+    min: float
+    max: float
+    stddev: float
+    volatility: float
+
+class PriceHistoryResponse(BaseModel):
+    item_id: int
+    step: int
+    stats: PriceHistoryStats
+    points: List[PriceHistoryPoint]
+
+class TraderPositions(BaseModel):
+    """A user's open positions marked to the latest prices, one array entry per item."""
+    item_ids: np.ndarray
+    names: List[str]
+    quantity: np.ndarray
+    cost: np.ndarray  # FIFO cost basis of the open quantity
+    mark_price: np.ndarray  # Latest high price, 0 when unknown
+    value: np.ndarray  # After tax, at cost when there is no price
+    unrealized: np.ndarray
+    realized: float
+
+    class Config:
+        arbitrary_types_allowed = True
+
+class RankedFlip(BaseModel):
+    item_id: int
+    item_name: str
+    members: bool
+    limit: int
+    high_price: int
+    low_price: int
+    profit_per_item: int
+    total_profit: int
+    cash_needed: int
+    roi_percentage: float
+    volume: int
+    volume_percentile: float
+
+class FlipRanking(BaseModel):
+    version: int  # Price snapshot the ranking was computed from
+    total: int  # Items passing the filters
+    offset: int
+    limit: int
+    sort: str
+    flips: List[RankedFlip]
+
+class FlipAllocation(BaseModel):
+    item_id: int
+    item_name: str
+    quantity: int
+    buy_price: int
+    sell_price: int
+    cost: int
+    fill_probability: float
+    expected_profit: int
+
+class FlipPlan(BaseModel):
+    version: int  # Price snapshot the plan was computed from
+    budget: int
+    cash_used: int
+    expected_profit: int
+    allocations: List[FlipAllocation]  # Largest expected profit first
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.security import require_admin
+from app.utils.exceptions import ProfilerBusyError
+from app.utils.profiling import SamplingProfiler, SlowCallbackMonitor, TaskTracker
+
+debug_router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_admin)], include_in_schema=False)
+
+
+@debug_router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    all_threads: bool = False
+):
+    """
+    Sample the event loop thread (or every thread) for `seconds` and return collapsed stacks,
+    e.g. `curl -H "Authorization: Bearer $TOKEN" .../debug/profile?seconds=30 > loop.folded` for flamegraph.pl or speedscope.
+    """
+    if seconds > settings.DEBUG_PROFILE_MAX_DURATION.total_seconds():
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=f"seconds must be at most {settings.DEBUG_PROFILE_MAX_DURATION.total_seconds():g}")
+
+    # Handlers run on the loop thread, so this is the thread to sample
+    loop_thread_id = None if all_threads else threading.get_ident()
+    try:
+        stacks = await asyncio.to_thread(SamplingProfiler.profile, loop_thread_id, seconds, interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=e.message)
+    return PlainTextResponse(SamplingProfiler.collapsed(stacks))
+
+
+@debug_router.get("/tasks")
+async def tasks():
+    return TaskTracker.snapshot()
+
+
+@debug_router.get("/slow-callbacks")
+async def slow_callbacks():
+    threshold = SlowCallbackMonitor.get_threshold()
+    return {
+        "running": SlowCallbackMonitor.is_running(),
+        "threshold_ms": threshold * 1000 if threshold is not None else None,
+        "events": [event._asdict() for event in reversed(SlowCallbackMonitor.events)],
+    }
+
+
+@debug_router.post("/slow-callbacks")
+async def start_slow_callbacks(threshold_ms: Optional[float] = Query(None, ge=1)):
+    threshold = threshold_ms / 1000 if threshold_ms is not None else settings.DEBUG_SLOW_CALLBACK_THRESHOLD.total_seconds()
+    await SlowCallbackMonitor.start(threshold)
+    return {"running": True, "threshold_ms": threshold * 1000}
+
+
+@debug_router.delete("/slow-callbacks")
+async def stop_slow_callbacks():
+    await SlowCallbackMonitor.stop()
+    return {"running": False}
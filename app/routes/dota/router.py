@@ -3,6 +3,7 @@ from fastapi import APIRouter
 from fastapi.params import Depends
 
 from app.dependencies import get_dota_service
+from app.models.dota import PlayersRequest, PlayersResponse
 from app.routes.dota.model import ProPlayerProfile
 from app.services.dota_service import DotaService
 
@@ -16,4 +17,8 @@ async def get_pros(dota_service: DotaService = Depends(get_dota_service)):
 async def get_player(player_id: int, dota_service: DotaService = Depends(get_dota_service)):
     return await dota_service.get_player(player_id)
 
+@dota_router.post("/players", response_model=PlayersResponse)
+async def get_players(request: PlayersRequest, dota_service: DotaService = Depends(get_dota_service)):
+    return await dota_service.get_players(request.ids)
+
 
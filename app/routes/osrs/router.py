@@ -1,23 +1,172 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from http import HTTPStatus
+from typing import Dict, List, Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+from app.config import settings
 from app.dependencies import get_osrs_service
-from app.models.runescape import ItemVolumeResponse
+from app.models.runescape import FlipPlan, FlipRanking, ItemVolumeResponse, OsrsItemSearchResult, PriceHistoryResponse
+from app.services.osrs_flip_ranker import FLIP_SORT_METRICS, FlipFilters, FlipRanker
+from app.services.osrs_price_feed import OsrsPriceFeed
+from app.services.osrs_price_history import PriceHistoryStore
 from app.services.osrs_service import OsrsService
+from app.utils.responses import EncodedResponseCache, json_response, parse_fields, parse_ids
 
 osrs_router = APIRouter(prefix="/osrs", tags=["osrs"])
 
+# Full payloads of the large endpoints, serialized and compressed once per data version
+encoded_responses = EncodedResponseCache()
+LATEST_FIELDS = {"high", "highTime", "low", "lowTime"}
+
+IDS_QUERY = Query(None, description="Comma separated item ids to return, e.g. 2,4,6")
+
+# Routes that return pre-encoded bodies skip response_model validation, the model is only documented
+VOLUMES_RESPONSES = {HTTPStatus.OK.value: {"model": ItemVolumeResponse}}
+
 @osrs_router.get("/items")
-async def get_items(osrs_service: OsrsService = Depends(get_osrs_service)):
-    return await osrs_service.get_latest()
+async def get_items(
+        request: Request,
+        ids: Optional[str] = IDS_QUERY,
+        fields: Optional[str] = Query(None, description="Comma separated fields to return: high, highTime, low, lowTime"),
+        osrs_service: OsrsService = Depends(get_osrs_service)
+):
+    snapshot = await osrs_service.get_latest_snapshot()
+    item_ids, projection = parse_ids(ids), parse_fields(fields)
+
+    if item_ids is None and projection is None:
+        return await encoded_responses.respond(request, "items", snapshot.version, lambda: {"data": snapshot.data})
+
+    if projection is not None and not LATEST_FIELDS.issuperset(projection):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=f"fields must be among {sorted(LATEST_FIELDS)}")
+
+    data = snapshot.data if item_ids is None else {item_id: snapshot.data[item_id] for item_id in item_ids if item_id in snapshot.data}
+    if projection is not None:
+        data = {item_id: {field: entry.get(field) for field in projection} for item_id, entry in data.items()}
+    return json_response({"data": data})
+
+async def _volumes_response(request: Request, key: str, volumes: ItemVolumeResponse, ids: Optional[str],
+                            osrs_service: OsrsService):
+    item_ids = parse_ids(ids)
+    if item_ids is None:
+        return await encoded_responses.respond(request, key, volumes.timestamp, lambda: volumes.model_dump(by_alias=True))
+
+    # Volumes are keyed by item name
+    items = (osrs_service.get_osrs_item_by_id(int(item_id)) for item_id in item_ids)
+    names = [item.name for item in items if item is not None and item.name in volumes.volumes]
+    return json_response({
+        "%LAST_UPDATE%": volumes.timestamp,
+        "%LAST_UPDATE_F%": volumes.timestamp_formatted,
+        "volumes": {name: volumes.volumes[name] for name in names}
+    })
+
+@osrs_router.get("/items/volumes", response_class=ORJSONResponse, responses=VOLUMES_RESPONSES)
+async def get_item_volumes(request: Request, ids: Optional[str] = IDS_QUERY,
+                           osrs_service: OsrsService = Depends(get_osrs_service)):
+    return await _volumes_response(request, "volumes", await osrs_service.get_volumes(), ids, osrs_service)
+
+@osrs_router.get("/items/volumes/scaled", response_class=ORJSONResponse, responses=VOLUMES_RESPONSES)
+async def get_scaled_items(request: Request, ids: Optional[str] = IDS_QUERY,
+                           osrs_service: OsrsService = Depends(get_osrs_service)):
+    return await _volumes_response(request, "volumes-scaled", await osrs_service.get_volumes_scaled(), ids, osrs_service)
 
-@osrs_router.get("/items/volumes", response_model=ItemVolumeResponse)
-async def get_item_volumes(osrs_service: OsrsService = Depends(get_osrs_service)):
-    return await osrs_service.get_volumes()
+@osrs_router.get("/items/volumes/percentiles", response_model=Dict[str, float])
+async def get_item_volume_percentiles(osrs_service: OsrsService = Depends(get_osrs_service)):
+    volumes = await osrs_service.get_volumes()
+    return volumes.get_percentile_ranks()
 
-@osrs_router.get("/items/volumes?=scaled", response_model=ItemVolumeResponse)
-async def get_scaled_items(osrs_service: OsrsService = Depends(get_osrs_service)):
-    return await osrs_service.get_volumes_scaled()
+@osrs_router.get("/items/search", response_model=List[OsrsItemSearchResult])
+async def search_items(
+        q: str = Query(min_length=1),
+        limit: int = Query(settings.OSRS_SEARCH_LIMIT, ge=1, le=50),
+        osrs_service: OsrsService = Depends(get_osrs_service)
+):
+    return [OsrsItemSearchResult(item=item, score=score) for item, score in osrs_service.search_osrs_items(q, limit)]
+
+@osrs_router.get("/items/stream")
+async def stream_items(ids: Optional[str] = IDS_QUERY):
+    """Server-sent events: one `snapshot` event, then a `delta` event with the changed items on every price poll."""
+    subscriber = await OsrsPriceFeed.subscribe(parse_ids(ids))
+    if subscriber is None:
+        raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Price feed is at capacity")
+
+    async def events():
+        heartbeat = settings.OSRS_FEED_HEARTBEAT.total_seconds()
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message.sse
+        finally:
+            OsrsPriceFeed.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@osrs_router.websocket("/items/ws")
+async def items_websocket(websocket: WebSocket, ids: Optional[str] = None):
+    """Same feed as /items/stream, as one JSON text message per snapshot or delta."""
+    subscriber = await OsrsPriceFeed.subscribe(parse_ids(ids))
+    if subscriber is None:
+        await websocket.close(code=1013)  # Try again later
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            message = await subscriber.queue.get()
+            if message is None:
+                await websocket.close(code=1013)
+                break
+            await websocket.send_text(message.text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        OsrsPriceFeed.unsubscribe(subscriber)
+
+@osrs_router.get("/items/{item_id}/history", response_model=PriceHistoryResponse)
+async def get_item_history(
+        item_id: int,
+        window: int = Query(60, ge=1, le=settings.OSRS_PRICE_HISTORY_SIZE),
+        step: int = Query(1, ge=1, le=settings.OSRS_PRICE_HISTORY_SIZE)
+):
+    history = PriceHistoryStore.get_instance().get_history(item_id, window, step)
+    if history is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Unknown item {item_id}")
+    return history
 
 @osrs_router.get("/items/{item_id}")
 async def get_item(item_id: int, osrs_service: OsrsService = Depends(get_osrs_service)):
-    return await osrs_service.get_latest_by_item_id(item_id)
\ No newline at end of file
+    return await osrs_service.get_latest_by_item_id(item_id)
+
+
+@osrs_router.get("/flips", response_model=FlipRanking)
+async def get_flips(
+        sort: str = Query("roi_percentage", description=f"One of {', '.join(FLIP_SORT_METRICS)}"),
+        order: str = Query("desc", pattern="^(asc|desc)$"),
+        limit: int = Query(20, ge=1, le=500),
+        offset: int = Query(0, ge=0),
+        min_profit: Optional[int] = Query(None, description="Minimum profit per buy limit, after tax"),
+        min_roi: Optional[float] = None,
+        max_roi: Optional[float] = None,
+        max_cash: Optional[int] = Query(None, description="Maximum cash needed to buy the whole limit"),
+        members: Optional[bool] = None,
+        min_volume_percentile: Optional[float] = Query(None, ge=0, le=100)
+):
+    if sort not in FLIP_SORT_METRICS:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=f"sort must be one of {', '.join(FLIP_SORT_METRICS)}")
+
+    filters = FlipFilters(min_profit, min_roi, max_roi, max_cash, members, min_volume_percentile)
+    return await FlipRanker.rank(filters, sort, order == "desc", limit, offset)
+
+@osrs_router.get("/plan", response_model=FlipPlan)
+async def get_flip_plan(
+        budget: int = Query(ge=1, description="Cash to spend, in gp"),
+        max_items: Optional[int] = Query(None, ge=1, description="Only return the allocations with the largest expected profit")
+):
+    return await FlipRanker.plan(budget, max_items)
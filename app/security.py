@@ -1,7 +1,21 @@
-from fastapi import Depends
-from fastapi.security import OAuth2PasswordBearer
+import secrets
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, OAuth2PasswordBearer
+
+from app.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+admin_scheme = HTTPBearer(auto_error=False)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     return { "yaya": "ya"}
+
+async def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_scheme)):
+    """Guards the /debug routes, which look like they don't exist while DEBUG_ADMIN_TOKEN is unset."""
+    if not settings.DEBUG_ADMIN_TOKEN:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND)
+    if credentials is None or not secrets.compare_digest(credentials.credentials.encode(), settings.DEBUG_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
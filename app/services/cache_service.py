@@ -0,0 +1,190 @@
+import functools
+import zlib
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import orjson
+from cachetools import TTLCache
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.services.redis_service import RedisService
+from app.utils.logger import logger
+from app.utils.metrics import CACHE_LOOKUPS
+
+MISSING = object()
+
+
+class CacheService:
+    """
+    Two-tier cache for upstream responses.
+    L1 is a bounded in-process TTL cache per namespace, L2 is Redis shared between replicas
+    and restarts. Both tiers hold the JSON encoded value and every read decodes its own copy,
+    so callers can't alter what other callers get, and L1 hits look exactly like L2 hits.
+    Keys are namespaced and versioned (CACHE_KEY_VERSION), so bumping the version orphans
+    every old entry at once. Without Redis the cache runs on L1 only.
+    """
+    _instance: Optional["CacheService"] = None
+
+    COMPRESS_MIN_BYTES = 1024
+
+    def __init__(self, redis_service: Optional[RedisService] = None):
+        self.redis_service = redis_service
+        self.l1: Dict[str, TTLCache] = {}
+
+    @classmethod
+    def get_instance(cls) -> Optional["CacheService"]:
+        return cls._instance
+
+    @classmethod
+    async def startup(cls):
+        redis_service = RedisService(Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS
+        ))
+        try:
+            await redis_service.ping()
+            logger.info(f"Cache connected to Redis at {settings.REDIS_HOST}:{settings.REDIS_PORT}")
+        except (RedisError, OSError) as e:
+            logger.warning(f"Redis unavailable, caching in-process only: {e}")
+            await redis_service.close()
+            redis_service = None
+
+        cls._instance = CacheService(redis_service)
+
+    @classmethod
+    async def shutdown(cls):
+        if cls._instance is not None and cls._instance.redis_service is not None:
+            await cls._instance.redis_service.close()
+        cls._instance = None
+
+    ## Keys, TTLs & serialization
+    @staticmethod
+    def _key(namespace: str, key: str) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}:v{settings.CACHE_KEY_VERSION}:{namespace}:{key}"
+
+    @staticmethod
+    def _ttl(namespace: str) -> int:
+        return settings.CACHE_TTLS.get(namespace, settings.CACHE_DEFAULT_TTL_SECONDS)
+
+    def _l1(self, namespace: str) -> TTLCache:
+        if namespace not in self.l1:
+            ttl = min(self._ttl(namespace), settings.CACHE_L1_TTL_SECONDS)
+            self.l1[namespace] = TTLCache(maxsize=settings.CACHE_L1_MAXSIZE, ttl=ttl)
+        return self.l1[namespace]
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+    @classmethod
+    def _pack(cls, data: bytes) -> bytes:
+        """Encoded value as stored in Redis, zlib compressed when large. The first byte says which."""
+        if len(data) >= cls.COMPRESS_MIN_BYTES:
+            return b"z" + zlib.compress(data)
+        return b"j" + data
+
+    @staticmethod
+    def _unpack(raw: bytes) -> bytes:
+        return zlib.decompress(raw[1:]) if raw[:1] == b"z" else raw[1:]
+
+    ## Reads & writes
+    async def get(self, namespace: str, key: str) -> Any:
+        """Cached value, or MISSING."""
+        return (await self.get_many(namespace, [key])).get(key, MISSING)
+
+    async def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """All cached values for the given keys, L2 misses fetched in a single MGET."""
+        l1 = self._l1(namespace)
+        found: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            data = l1.get(key)
+            if data is None:
+                missing.append(key)
+            else:
+                found[key] = orjson.loads(data)
+        l1_hits = len(found)
+
+        if missing and self.redis_service is not None:
+            try:
+                raw_values = await self.redis_service.read_many([self._key(namespace, key) for key in missing])
+            except RedisError as e:
+                logger.warning(f"Redis read failed for {namespace}: {e}")
+                raw_values = []
+
+            for key, raw in zip(missing, raw_values):
+                if raw is not None:
+                    data = l1[key] = self._unpack(raw)
+                    found[key] = orjson.loads(data)
+
+        l2_hits = len(found) - l1_hits
+        CACHE_LOOKUPS.labels(namespace, "l1_hit").inc(l1_hits)
+        CACHE_LOOKUPS.labels(namespace, "l2_hit").inc(l2_hits)
+        CACHE_LOOKUPS.labels(namespace, "miss").inc(len(missing) - l2_hits)
+        return found
+
+    async def set(self, namespace: str, key: str, value: Any):
+        await self.set_many(namespace, {key: value})
+
+    async def set_many(self, namespace: str, values: Dict[str, Any]):
+        """Store values in L1 and write them to L2 in one pipelined round trip."""
+        l1 = self._l1(namespace)
+        encoded = {key: self._encode(value) for key, value in values.items()}
+        l1.update(encoded)
+
+        if self.redis_service is not None:
+            try:
+                await self.redis_service.write_many(
+                    {self._key(namespace, key): self._pack(data) for key, data in encoded.items()},
+                    ttl=self._ttl(namespace)
+                )
+            except RedisError as e:
+                logger.warning(f"Redis write failed for {namespace}: {e}")
+
+    async def invalidate(self, namespace: str):
+        self.l1.pop(namespace, None)
+        if self.redis_service is not None:
+            await self.redis_service.invalidate(self._key(namespace, "*"))
+
+
+def _default_key(args: Tuple, kwargs: Dict) -> str:
+    return ":".join([str(arg) for arg in args] + [f"{k}={v}" for k, v in sorted(kwargs.items())])
+
+
+def is_success(value: Any) -> bool:
+    """Default check of `cached`: anything but None and upstream error bodies like {"error": "Not Found"}."""
+    return value is not None and not (isinstance(value, dict) and "error" in value)
+
+
+def cached(namespace: str, key: Optional[Callable[..., str]] = None, validate: Callable[[Any], bool] = is_success):
+    """
+    Cache an async service method's result under the given namespace.
+    The key is built from the call arguments (excluding self) unless a key function is given.
+    Results must be JSON serializable, and only results passing `validate` are cached, so a failed or
+    empty upstream response is asked for again on the next call instead of being served for the whole TTL.
+    Every call gets its own copy of the result.
+    Calls pass straight through when the cache has not been started.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            cache = CacheService.get_instance()
+            if cache is None:
+                return await func(self, *args, **kwargs)
+
+            cache_key = key(*args, **kwargs) if key else _default_key(args, kwargs)
+            value = await cache.get(namespace, cache_key)
+            if value is not MISSING:
+                return value
+
+            value = await func(self, *args, **kwargs)
+            if validate(value):
+                await cache.set(namespace, cache_key, value)
+            return value
+
+        return wrapper
+
+    return decorator
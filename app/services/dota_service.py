@@ -1,28 +1,62 @@
-import httpx
+import asyncio
+from typing import List, Optional
+
+from app.config import settings
+from app.models.dota import PlayersResponse
+from app.services.cache_service import cached
+from app.services.upstream_scheduler import UpstreamScheduler
 
 
 class DotaService:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, scheduler: UpstreamScheduler):
         self.base_url = base_url
-        self.client = httpx.Client()
+        self.scheduler = scheduler
 
         if self.base_url is None or self.base_url == "":
            raise Exception("base_url is required to use DotaService")
 
     async def _get(self, endpoint: str):
-        response = self.client.get(f"{self.base_url}{endpoint}")
+        response = await self.scheduler.get(f"{self.base_url}{endpoint}")
+        response.raise_for_status()
         return response.json()
 
     async def health(self):
         return await self._get("/health")
 
 
+    @cached("dota.pros")
     async def get_pro_players(self):
         return await self._get(f"/proPlayers")
 
+    @cached("dota.player", validate=lambda player: isinstance(player, dict) and bool(player.get("profile")))
     async def get_player(self, id: int):
         return await self._get(f"/players/{id}")
 
+    @cached("dota.match", validate=lambda match: isinstance(match, dict) and "match_id" in match)
     async def get_match(self, match_id: int):
         return await self._get(f"/matches/{match_id}")
 
+    async def get_players(self, ids: List[int], concurrency: Optional[int] = None) -> PlayersResponse:
+        """
+        Fetch several players concurrently, at most `concurrency` requests in flight.
+        Players that fail are reported in errors instead of failing the whole batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.DOTA_PLAYER_CONCURRENCY)
+        ids = list(dict.fromkeys(ids))
+
+        async def fetch(player_id: int):
+            async with semaphore:
+                return await self.get_player(player_id)
+
+        results = await asyncio.gather(*(fetch(player_id) for player_id in ids), return_exceptions=True)
+
+        response = PlayersResponse()
+        for player_id, result in zip(ids, results):
+            if isinstance(result, Exception):
+                response.errors[player_id] = str(result) or type(result).__name__
+            elif not isinstance(result, dict) or not result.get("profile"):
+                response.errors[player_id] = result.get("error", "Player not found") if isinstance(result, dict) else "Invalid response"
+            else:
+                response.players[player_id] = result
+
+        return response
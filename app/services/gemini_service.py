@@ -1,7 +1,10 @@
+from typing import Optional
+
 import google.generativeai as genai
 from google.generativeai import GenerativeModel
 
 from app.config import settings
+from app.services.llm_pipeline import LlmPipeline
 
 
 class GeminiService:
@@ -33,8 +36,12 @@ class GeminiService:
             system_instruction="You are Lich, the dota2 hero. Your favorite activity is ganking Slark in the jungle, in which you almost always succeed. NEVER incapsulate your entire reponse in quotation marks. NEVER exceed 2000 characters when generating a response."
         )
 
-    async def generate(self, prompt: str):
-        response = self.client.generate_content(
+    async def generate(self, prompt: str, channel_id: Optional[int] = None, user_id: Optional[int] = None) -> str:
+        """Generate through the shared LLM pipeline, see LlmPipeline for queueing and load shedding."""
+        return await LlmPipeline.submit(self._generate, prompt, channel_id=channel_id, user_id=user_id)
+
+    async def _generate(self, prompt: str) -> str:
+        response = await self.client.generate_content_async(
             prompt,
             generation_config=genai.types.GenerationConfig(
                 max_output_tokens=1000,
@@ -0,0 +1,92 @@
+from typing import Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import settings
+from app.services.upstream_scheduler import UpstreamScheduler
+from app.utils.logger import logger
+
+
+class HttpClientPool:
+    """
+    App-scoped httpx.AsyncClient pools, one per upstream host.
+    Opened and closed in main.py's lifespan and shared by every service instance,
+    so keep-alive connections survive across requests and Discord commands.
+    Services talk to a host through its UpstreamScheduler, which enforces the host's rate limit.
+    """
+    _clients: Dict[str, httpx.AsyncClient] = {}
+    _schedulers: Dict[str, UpstreamScheduler] = {}
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc
+
+    @staticmethod
+    def _create_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=settings.HTTP2_ENABLED,
+            timeout=httpx.Timeout(
+                settings.HTTP_TIMEOUT_SECONDS,
+                connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            headers={"User-Agent": settings.HTTP_USER_AGENT},
+            follow_redirects=True
+        )
+
+    @classmethod
+    def get_client(cls, url: str) -> httpx.AsyncClient:
+        """Get the shared client for the host of the given url, creating it on first use."""
+        host = cls._host(url)
+        client = cls._clients.get(host)
+
+        if client is None or client.is_closed:
+            client = cls._create_client()
+            cls._clients[host] = client
+            logger.info(f"Opened HTTP client pool for {host}")
+
+        return client
+
+    @classmethod
+    def get_scheduler(cls, url: str) -> UpstreamScheduler:
+        """Get the shared request scheduler for the host of the given url, creating it on first use."""
+        host = cls._host(url)
+        scheduler = cls._schedulers.get(host)
+
+        if scheduler is None or scheduler.client.is_closed:
+            scheduler = UpstreamScheduler(
+                host=host,
+                client=cls.get_client(url),
+                rate_per_minute=settings.UPSTREAM_RATE_LIMITS.get(host, settings.UPSTREAM_DEFAULT_RATE_LIMIT),
+                burst=settings.UPSTREAM_BURST,
+                max_retries=settings.UPSTREAM_MAX_RETRIES
+            )
+            cls._schedulers[host] = scheduler
+
+        return scheduler
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, dict]:
+        return {host: scheduler.get_stats() for host, scheduler in cls._schedulers.items()}
+
+    @classmethod
+    async def startup(cls):
+        for url in (settings.OPENDOTA_BASE_URL, settings.SSB_BASE_URL, settings.OSRS_BASE_URL, settings.OSRS_VOLUMES_URL):
+            if url:
+                cls.get_scheduler(url)
+
+    @classmethod
+    async def shutdown(cls):
+        for scheduler in cls._schedulers.values():
+            await scheduler.close()
+        cls._schedulers = {}
+
+        for host, client in cls._clients.items():
+            await client.aclose()
+            logger.info(f"Closed HTTP client pool for {host}")
+        cls._clients = {}
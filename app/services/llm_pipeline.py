@@ -0,0 +1,105 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from app.config import settings
+from app.utils.exceptions import LlmOverloadedError, LlmTimeoutError
+from app.utils.logger import logger
+
+Generate = Callable[[str], Awaitable[str]]
+
+
+class LlmJob(NamedTuple):
+    generate: Generate
+    prompt: str
+    keys: List[str]
+    deadline: float
+    future: asyncio.Future
+
+
+class LlmPipeline:
+    """
+    Bounded worker pool for LLM generation, started in main.py's lifespan.
+    Requests wait in a bounded queue and are shed with LlmOverloadedError when the queue is full
+    or when their channel or user already has too many requests pending. Every request has a
+    deadline, after which it fails with LlmTimeoutError whether it was queued or running.
+    """
+    _queue: Optional[asyncio.Queue] = None
+    _workers: List[asyncio.Task] = []
+    _pending: Dict[str, int] = {}
+
+    @classmethod
+    async def start(cls):
+        if cls._workers:
+            return
+        cls._queue = asyncio.Queue(maxsize=settings.LLM_QUEUE_SIZE)
+        cls._workers = [asyncio.create_task(cls._work()) for _ in range(settings.LLM_WORKERS)]
+        logger.info(f"LLM pipeline started with {settings.LLM_WORKERS} workers")
+
+    @classmethod
+    async def stop(cls):
+        for worker in cls._workers:
+            worker.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers = []
+        cls._queue = None
+        cls._pending = {}
+
+    @classmethod
+    async def submit(cls, generate: Generate, prompt: str, channel_id: Optional[int] = None,
+                     user_id: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        timeout = timeout or settings.LLM_REQUEST_TIMEOUT.total_seconds()
+
+        if cls._queue is None:
+            # Pipeline not running (e.g. outside the app), still never wait forever
+            try:
+                return await asyncio.wait_for(generate(prompt), timeout)
+            except asyncio.TimeoutError:
+                raise LlmTimeoutError()
+
+        limits = {}
+        if channel_id is not None:
+            limits[f"channel:{channel_id}"] = settings.LLM_MAX_PENDING_PER_CHANNEL
+        if user_id is not None:
+            limits[f"user:{user_id}"] = settings.LLM_MAX_PENDING_PER_USER
+
+        if any(cls._pending.get(key, 0) >= limit for key, limit in limits.items()):
+            raise LlmOverloadedError("Too many LLM requests pending for this channel or user")
+        if cls._queue.full():
+            raise LlmOverloadedError()
+
+        future = asyncio.get_running_loop().create_future()
+        job = LlmJob(generate, prompt, list(limits), time.monotonic() + timeout, future)
+        cls._queue.put_nowait(job)
+        for key in job.keys:
+            cls._pending[key] = cls._pending.get(key, 0) + 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise LlmTimeoutError()
+        finally:
+            for key in job.keys:
+                cls._pending[key] -= 1
+                if cls._pending[key] <= 0:
+                    del cls._pending[key]
+
+    @classmethod
+    async def _work(cls):
+        while True:
+            job: LlmJob = await cls._queue.get()
+            remaining = job.deadline - time.monotonic()
+            if job.future.done() or remaining <= 0:
+                continue
+
+            try:
+                result = await asyncio.wait_for(job.generate(job.prompt), remaining)
+                if not job.future.done():
+                    job.future.set_result(result)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                logger.warning("LLM generation hit its deadline")
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
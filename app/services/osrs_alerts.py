@@ -0,0 +1,285 @@
+import asyncio
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.calculators.flipping_calculator import FlippingCalculator
+from app.config import settings
+from app.constants import constants
+from app.database.db import Database
+from app.database.models.osrs_alerts import OsrsPriceAlert
+from app.database.write_behind import WriteBehindQueue
+from app.services.osrs_price_poller import OsrsPricePoller, PriceSnapshot
+from app.utils.logger import logger
+
+# Which way each kind of alert fires: +1 when the value rises to the threshold, -1 when it drops below it
+ALERT_DIRECTIONS: Dict[str, int] = {"below": -1, "above": 1, "roi": 1}
+DISCORD_MESSAGE_LIMIT = 2000
+ALERT_ID_DISPLAY_LENGTH = 8  # Alert ids are full uuids, users see and type their start
+
+
+class PriceAlert:
+    __slots__ = ("id", "user_id", "guild_id", "channel_id", "item_id", "kind", "threshold", "armed", "last_fired")
+
+    def __init__(self, id: str, user_id: int, guild_id: Optional[int], channel_id: Optional[int],
+                 item_id: int, kind: str, threshold: float):
+        self.id = id
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.item_id = item_id
+        self.kind = kind
+        self.threshold = threshold
+        self.armed = True
+        self.last_fired = 0.0
+
+
+class AlertIndex:
+    """One kind's alerts, per item in lists sorted by threshold."""
+    __slots__ = ("items", "_item_ids")
+
+    def __init__(self):
+        self.items: Dict[int, Tuple[List[float], List[PriceAlert]]] = {}
+        self._item_ids: Optional[np.ndarray] = None
+
+    @property
+    def item_ids(self) -> np.ndarray:
+        """Ids of the items with at least one alert, rebuilt only after an item gains its first or loses its last alert."""
+        if self._item_ids is None:
+            self._item_ids = np.fromiter(self.items, dtype=np.int64, count=len(self.items))
+        return self._item_ids
+
+    def add(self, alert: PriceAlert):
+        if alert.item_id not in self.items:
+            self.items[alert.item_id] = ([], [])
+            self._item_ids = None
+        thresholds, alerts = self.items[alert.item_id]
+        position = bisect_right(thresholds, alert.threshold)
+        thresholds.insert(position, alert.threshold)
+        alerts.insert(position, alert)
+
+    def remove(self, alert: PriceAlert):
+        thresholds, alerts = self.items[alert.item_id]
+        position = bisect_left(thresholds, alert.threshold)
+        while alerts[position] is not alert:
+            position += 1
+        del thresholds[position], alerts[position]
+        if not alerts:
+            del self.items[alert.item_id]
+            self._item_ids = None
+
+
+def alert_values(kind: str, high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """The value each kind of alert watches, per item id. 0 where the price is unknown."""
+    if kind == "below":
+        return low.astype(np.float64)
+    if kind == "above":
+        return high.astype(np.float64)
+
+    tax = np.where(high > 100, FlippingCalculator.TAX_RATE, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = (high * (1 - tax) - low) / low * 100
+    return np.where((high > 0) & (low > 0), roi, 0.0)
+
+
+class PriceAlertEngine:
+    """
+    Price alerts, evaluated on every snapshot from the price poller.
+    Alerts are indexed per kind and item in sorted threshold lists, so a tick only bisects the items
+    whose value changed and only touches the alerts whose threshold lies between the old and the new value.
+    A fired alert is disarmed until the value moves OSRS_ALERT_HYSTERESIS back past its threshold,
+    and notifications are grouped into one message per channel or DM per tick.
+    """
+    _alerts: Dict[str, PriceAlert] = {}
+    _user_alerts: Dict[int, Dict[str, PriceAlert]] = {}
+    _indexes: Dict[str, AlertIndex] = {kind: AlertIndex() for kind in ALERT_DIRECTIONS}
+    _previous: Optional[Dict[str, np.ndarray]] = None
+    _deliveries: Set[asyncio.Task] = set()
+
+    @classmethod
+    async def start(cls):
+        if Database.is_available():
+            async with Database.session() as session:
+                result = await session.execute(select(OsrsPriceAlert).where(OsrsPriceAlert.active.is_(True)))
+                for row in result.scalars():
+                    cls._register(PriceAlert(
+                        row.id, row.user_id, row.guild_id, row.channel_id, row.item_id, row.kind, row.threshold
+                    ))
+
+        OsrsPricePoller.add_listener(cls.on_snapshot)
+        logger.info(f"Price alert engine started with {len(cls._alerts)} alerts")
+
+    @classmethod
+    async def stop(cls):
+        await asyncio.gather(*cls._deliveries, return_exceptions=True)
+
+    @classmethod
+    def get_user_alerts(cls, user_id: int) -> List[PriceAlert]:
+        return list(cls._user_alerts.get(user_id, {}).values())
+
+    @classmethod
+    def add_alert(cls, user_id: int, item_id: int, kind: str, threshold: float,
+                  guild_id: Optional[int] = None, channel_id: Optional[int] = None) -> Optional[PriceAlert]:
+        """Register an alert. Returns None when the user already has the same alert or too many alerts."""
+        user_alerts = cls.get_user_alerts(user_id)
+        if len(user_alerts) >= settings.OSRS_ALERTS_PER_USER:
+            return None
+        if any(a.item_id == item_id and a.kind == kind and a.threshold == threshold for a in user_alerts):
+            return None
+
+        alert_id = uuid.uuid4().hex
+        while alert_id in cls._alerts:
+            alert_id = uuid.uuid4().hex
+        alert = PriceAlert(alert_id, user_id, guild_id, channel_id, item_id, kind, threshold)
+
+        # Don't fire right away for a condition that already holds, wait until it is crossed
+        if cls._previous is not None:
+            value = cls._previous[kind]
+            if item_id < value.size and value[item_id] and cls._is_met(alert, value[item_id]):
+                alert.armed = False
+
+        cls._register(alert)
+        WriteBehindQueue.add(
+            OsrsPriceAlert, id=alert.id, user_id=user_id, guild_id=guild_id, channel_id=channel_id,
+            item_id=item_id, kind=kind, threshold=threshold, active=True
+        )
+        return alert
+
+    @classmethod
+    def remove_alert(cls, user_id: int, alert_id: str) -> bool:
+        """Remove one of the user's alerts by its id or the unique start of it, as shown by format_alert."""
+        matches = [alert for id_, alert in cls._user_alerts.get(user_id, {}).items() if id_.startswith(alert_id.lower())]
+        if not alert_id or len(matches) != 1:
+            return False
+
+        alert = matches[0]
+        del cls._alerts[alert.id]
+        del cls._user_alerts[user_id][alert.id]
+        cls._indexes[alert.kind].remove(alert)
+        # The queue writes in order, so this runs after the alert's insert even when both are still pending
+        WriteBehindQueue.update(OsrsPriceAlert, "id", id=alert.id, active=False)
+        return True
+
+    @staticmethod
+    def _is_met(alert: PriceAlert, value: float) -> bool:
+        return value >= alert.threshold if ALERT_DIRECTIONS[alert.kind] > 0 else value < alert.threshold
+
+    @classmethod
+    def _register(cls, alert: PriceAlert):
+        cls._alerts[alert.id] = alert
+        cls._user_alerts.setdefault(alert.user_id, {})[alert.id] = alert
+        cls._indexes[alert.kind].add(alert)
+
+    @classmethod
+    async def on_snapshot(cls, snapshot: PriceSnapshot):
+        """Price poller listener."""
+        high, low = OsrsPricePoller.get_price_arrays(snapshot)
+        current = {kind: alert_values(kind, high, low) for kind in ALERT_DIRECTIONS}
+        # _previous holds the latest values until the next tick, add_alert checks new alerts against it
+        previous, cls._previous = cls._previous, current
+        if previous is None:
+            # No previous values to detect crossings against, e.g. right after startup
+            return
+
+        now = time.monotonic()
+        fired: List[Tuple[PriceAlert, float]] = []
+        for kind, index in cls._indexes.items():
+            if not index.items:
+                continue
+            fired.extend(cls._evaluate(index, ALERT_DIRECTIONS[kind], previous[kind], current[kind], now))
+
+        if fired:
+            cls._spawn(cls._deliver(fired))
+
+    @classmethod
+    def _evaluate(cls, index: AlertIndex, direction: int, previous: np.ndarray, current: np.ndarray,
+                  now: float) -> List[Tuple[PriceAlert, float]]:
+        # Only items that have alerts, a price in both snapshots and a value that moved
+        ids = index.item_ids[index.item_ids < min(previous.size, current.size)]
+        old, new = previous[ids], current[ids]
+        moved = ids[(old != new) & (old != 0) & (new != 0)]
+
+        hysteresis = settings.OSRS_ALERT_HYSTERESIS
+        cooldown = settings.OSRS_ALERT_COOLDOWN.total_seconds()
+        fired = []
+
+        for item_id in moved.tolist():
+            thresholds, alerts = index.items[item_id]
+            start, end = 0, len(thresholds)
+            old_value, new_value = float(previous[item_id]), float(current[item_id])
+
+            if direction > 0:
+                # Fires when value >= threshold: thresholds in (old, new]. Re-arms when value < threshold * (1 - h)
+                crossed = range(bisect_right(thresholds, old_value, start, end), bisect_right(thresholds, new_value, start, end))
+                rearmed = range(bisect_right(thresholds, new_value / (1 - hysteresis), start, end),
+                                bisect_right(thresholds, old_value / (1 - hysteresis), start, end))
+            else:
+                # Fires when value < threshold: thresholds in (new, old]. Re-arms when value > threshold * (1 + h)
+                crossed = range(bisect_right(thresholds, new_value, start, end), bisect_right(thresholds, old_value, start, end))
+                rearmed = range(bisect_left(thresholds, old_value / (1 + hysteresis), start, end),
+                                bisect_left(thresholds, new_value / (1 + hysteresis), start, end))
+
+            for position in rearmed:
+                alerts[position].armed = True
+            for position in crossed:
+                alert = alerts[position]
+                if alert.armed and now - alert.last_fired >= cooldown:
+                    alert.armed = False
+                    alert.last_fired = now
+                    fired.append((alert, new_value))
+
+        return fired
+
+    @staticmethod
+    def format_alert(alert: PriceAlert, value: Optional[float] = None) -> str:
+        item = constants.OSRSITEMLIST.get(alert.item_id)
+        name = item.name if item else str(alert.item_id)
+        if alert.kind == "roi":
+            condition = f"ROI above {alert.threshold:.2f}%"
+            current = f" (now {value:.2f}%)" if value is not None else ""
+        else:
+            condition = f"{alert.kind} {alert.threshold:,.0f}gp"
+            current = f" (now {value:,.0f}gp)" if value is not None else ""
+        return f"`{alert.id[:ALERT_ID_DISPLAY_LENGTH]}` {name} {condition}{current}"
+
+    @classmethod
+    async def _deliver(cls, fired: List[Tuple[PriceAlert, float]]):
+        from app.bots.discord_bot import DiscordBot
+
+        # One message per destination, split at Discord's message size limit
+        messages: Dict[Tuple[str, int], List[str]] = {}
+        for alert, value in fired:
+            if alert.channel_id is None:
+                messages.setdefault(("dm", alert.user_id), []).append(cls.format_alert(alert, value))
+            else:
+                messages.setdefault(("channel", alert.channel_id), []).append(f"<@{alert.user_id}> {cls.format_alert(alert, value)}")
+
+        for (target, target_id), lines in messages.items():
+            chunk = ""
+            for line in lines:
+                if len(chunk) + len(line) + 1 > DISCORD_MESSAGE_LIMIT - 100:
+                    await cls._send(DiscordBot, target, target_id, chunk)
+                    chunk = ""
+                chunk += line + "\n"
+            if chunk:
+                await cls._send(DiscordBot, target, target_id, chunk)
+
+    @staticmethod
+    async def _send(bot, target: str, target_id: int, message: str):
+        try:
+            if target == "dm":
+                await bot.send_direct_message(f"Price alert:\n{message}", target_id)
+            else:
+                await bot.send_system_message(f"Price alerts:\n{message}", target_id)
+        except Exception as e:
+            logger.error(f"Could not deliver price alerts to {target} {target_id}: {e}")
+
+    @classmethod
+    def _spawn(cls, coroutine):
+        task = asyncio.create_task(coroutine)
+        cls._deliveries.add(task)
+        task.add_done_callback(cls._deliveries.discard)
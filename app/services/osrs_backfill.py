@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit
+
+import asyncpg
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.config import settings
+from app.database.db import get_database_url
+from app.database.models.osrs_prices import OsrsBackfillCheckpoint, OsrsPrice
+from app.services.http_client import HttpClientPool
+from app.services.osrs_service import OsrsService
+from app.services.upstream_scheduler import UpstreamScheduler, background_priority
+from app.utils.logger import logger
+
+###
+# Bulk backfill of historical prices wiki data into the osrs_prices table.
+#   python -m app.services.osrs_backfill 1h --days 90
+#   python -m app.services.osrs_backfill 5m --days 7
+#   python -m app.services.osrs_backfill timeseries --timestep 6h
+# Rows are written with COPY into a temporary staging table followed by one INSERT ... ON CONFLICT
+# per batch, so re-running over the same range is safe. Every batch also advances the source's
+# checkpoint in the same transaction, and a restarted backfill continues from the checkpoint.
+###
+
+TIMESTEPS: Dict[str, int] = {"5m": 300, "1h": 3600, "6h": 21600, "24h": 86400}
+PRICE_COLUMNS = ("item_id", "timestep", "timestamp", "avg_high_price", "high_price_volume", "avg_low_price", "low_price_volume")
+STAGING_TABLE = "osrs_prices_staging"
+
+PriceRow = Tuple[int, int, datetime, Optional[int], Optional[int], Optional[int], Optional[int]]
+Checkpoint = Tuple[str, int, datetime]
+
+CREATE_STAGING = f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (LIKE {OsrsPrice.__tablename__}) ON COMMIT DELETE ROWS"
+UPSERT_PRICES = f"""
+    INSERT INTO {OsrsPrice.__tablename__} ({", ".join(PRICE_COLUMNS)})
+    SELECT DISTINCT ON (item_id, timestep, timestamp) {", ".join(PRICE_COLUMNS)} FROM {STAGING_TABLE}
+    ON CONFLICT (item_id, timestep, timestamp) DO UPDATE SET
+        {", ".join(f"{column} = EXCLUDED.{column}" for column in PRICE_COLUMNS[3:])}
+"""
+UPSERT_CHECKPOINT = f"""
+    INSERT INTO {OsrsBackfillCheckpoint.__tablename__} (source, item_id, timestamp) VALUES ($1, $2, $3)
+    ON CONFLICT (source, item_id) DO UPDATE SET timestamp = GREATEST({OsrsBackfillCheckpoint.__tablename__}.timestamp, EXCLUDED.timestamp)
+"""
+
+
+def _utc(timestamp: int) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def _price_row(item_id: int, step: int, timestamp: int, entry: dict) -> PriceRow:
+    return (
+        item_id, step, _utc(timestamp),
+        entry.get("avgHighPrice"), entry.get("highPriceVolume"),
+        entry.get("avgLowPrice"), entry.get("lowPriceVolume")
+    )
+
+
+def _batches(values: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class OsrsBackfill:
+    def __init__(self, pool: asyncpg.Pool, osrs_service: OsrsService,
+                 concurrency: int = settings.OSRS_BACKFILL_CONCURRENCY,
+                 batch_requests: int = settings.OSRS_BACKFILL_BATCH_REQUESTS):
+        self.pool = pool
+        self.osrs_service = osrs_service
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.batch_requests = batch_requests
+        self._partitions: Set[str] = set()
+
+    async def ensure_schema(self):
+        dialect = postgresql.dialect()
+        async with self.pool.acquire() as conn:
+            for model in (OsrsPrice, OsrsBackfillCheckpoint):
+                await conn.execute(str(CreateTable(model.__table__, if_not_exists=True).compile(dialect=dialect)))
+
+    async def _ensure_partitions(self, conn: asyncpg.Connection, rows: List[PriceRow]):
+        months = {(row[2].year, row[2].month) for row in rows}
+        for year, month in sorted(months):
+            name = f"{OsrsPrice.__tablename__}_{year}_{month:02d}"
+            if name in self._partitions:
+                continue
+            start = datetime(year, month, 1, tzinfo=timezone.utc)
+            end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+            await conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {OsrsPrice.__tablename__} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            self._partitions.add(name)
+
+    async def _write(self, rows: List[PriceRow], checkpoints: List[Checkpoint]):
+        async with self.pool.acquire() as conn:
+            await self._ensure_partitions(conn, rows)
+            async with conn.transaction():
+                if rows:
+                    await conn.execute(CREATE_STAGING)
+                    await conn.copy_records_to_table(STAGING_TABLE, records=rows, columns=PRICE_COLUMNS)
+                    await conn.execute(UPSERT_PRICES)
+                if checkpoints:
+                    await conn.executemany(UPSERT_CHECKPOINT, checkpoints)
+
+    async def get_checkpoints(self, source: str) -> Dict[int, datetime]:
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch(
+                f"SELECT item_id, timestamp FROM {OsrsBackfillCheckpoint.__tablename__} WHERE source = $1", source
+            )
+        return {record["item_id"]: record["timestamp"] for record in records}
+
+    async def clear_checkpoints(self, source: str):
+        async with self.pool.acquire() as conn:
+            await conn.execute(f"DELETE FROM {OsrsBackfillCheckpoint.__tablename__} WHERE source = $1", source)
+
+    async def _fetch(self, request, *args) -> Optional[dict]:
+        async with self.semaphore:
+            try:
+                return await request(*args)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Backfill request {request.__name__}{args} failed: {e}")
+                return None
+
+    async def _run_batches(self, jobs: Sequence, fetch, to_rows, to_checkpoints):
+        """
+        Fetch jobs in batches with bounded concurrency and write each batch in one transaction.
+        The write of a batch overlaps the fetch of the next one. Writes stay in order, so checkpoints only move forward.
+        Returns the number of rows written.
+        """
+        write: Optional[asyncio.Task] = None
+        written = 0
+
+        for batch in _batches(jobs, self.batch_requests):
+            results = await asyncio.gather(*(fetch(job) for job in batch))
+            done = [(job, result) for job, result in zip(batch, results) if result is not None]
+            rows = [row for job, result in done for row in to_rows(job, result)]
+
+            if write is not None:
+                await write
+            write = asyncio.create_task(self._write(rows, to_checkpoints(batch, done)))
+            written += len(rows)
+            logger.info(f"Backfill fetched {len(done)}/{len(batch)} requests, {len(rows)} rows")
+
+        if write is not None:
+            await write
+        return written
+
+    async def backfill_buckets(self, timestep: str, start: datetime, end: datetime) -> int:
+        """Backfill /5m or /1h buckets between start and end. Each request covers the whole catalog for one bucket."""
+        step = TIMESTEPS[timestep]
+        checkpoint = (await self.get_checkpoints(timestep)).get(0)
+
+        first = int(start.timestamp()) // step * step
+        if checkpoint is not None:
+            first = max(first, int(checkpoint.timestamp()) + step)
+        timestamps = list(range(first, int(end.timestamp()) // step * step, step))
+        logger.info(f"Backfilling {len(timestamps)} {timestep} buckets from {_utc(first)}")
+
+        def to_rows(timestamp: int, payload: dict) -> List[PriceRow]:
+            return [_price_row(int(item_id), step, timestamp, entry) for item_id, entry in payload.get("data", {}).items()]
+
+        complete = True
+
+        def to_checkpoints(batch: Sequence[int], done: List) -> List[Checkpoint]:
+            # Stop advancing at the first batch with a failed bucket, so it is retried on resume
+            nonlocal complete
+            complete = complete and len(done) == len(batch)
+            return [(timestep, 0, _utc(batch[-1]))] if complete else []
+
+        async def fetch(timestamp: int) -> Optional[dict]:
+            return await self._fetch(self.osrs_service.fetch_average_prices, timestep, timestamp)
+
+        return await self._run_batches(timestamps, fetch, to_rows, to_checkpoints)
+
+    async def backfill_timeseries(self, timestep: str, item_ids: Iterable[int]) -> int:
+        """Backfill /timeseries for every item, skipping items whose newest point is already stored."""
+        step = TIMESTEPS[timestep]
+        source = f"timeseries:{timestep}"
+        checkpoints = await self.get_checkpoints(source)
+        up_to_date = datetime.now(timezone.utc) - timedelta(seconds=2 * step)
+        jobs = [item_id for item_id in item_ids if item_id not in checkpoints or checkpoints[item_id] < up_to_date]
+        logger.info(f"Backfilling {timestep} timeseries for {len(jobs)} items ({len(checkpoints)} with checkpoints)")
+
+        def to_rows(item_id: int, payload: dict) -> List[PriceRow]:
+            return [_price_row(item_id, step, point["timestamp"], point) for point in payload.get("data", [])]
+
+        def to_checkpoints(batch: Sequence[int], done: List) -> List[Checkpoint]:
+            return [
+                (source, item_id, _utc(max(point["timestamp"] for point in payload["data"])))
+                for item_id, payload in done if payload.get("data")
+            ]
+
+        async def fetch(item_id: int) -> Optional[dict]:
+            return await self._fetch(self.osrs_service.fetch_timeseries, item_id, timestep)
+
+        return await self._run_batches(jobs, fetch, to_rows, to_checkpoints)
+
+
+async def run(args: argparse.Namespace):
+    from app.constants import constants
+
+    database_url = get_database_url()
+    if not database_url:
+        raise SystemExit("Set DATABASE_URL (or the DB_* settings) to run the backfill")
+
+    # A dedicated scheduler, so the backfill gets its own rate limit instead of the API's
+    scheduler = UpstreamScheduler(
+        host=urlsplit(settings.OSRS_BASE_URL).netloc,
+        client=HttpClientPool.get_client(settings.OSRS_BASE_URL),
+        rate_per_minute=args.rate,
+        burst=args.concurrency,
+        max_retries=settings.UPSTREAM_MAX_RETRIES
+    )
+    osrs_service = OsrsService(base_url=settings.OSRS_BASE_URL, scheduler=scheduler, volumes_scheduler=scheduler)
+    pool = await asyncpg.create_pool(database_url, min_size=1, max_size=2)
+
+    try:
+        backfill = OsrsBackfill(pool, osrs_service, concurrency=args.concurrency)
+        await backfill.ensure_schema()
+
+        source = f"timeseries:{args.timestep}" if args.mode == "timeseries" else args.mode
+        if args.restart:
+            await backfill.clear_checkpoints(source)
+
+        started = datetime.now()
+        with background_priority():
+            if args.mode == "timeseries":
+                rows = await backfill.backfill_timeseries(args.timestep, constants.OSRSITEMLIST.keys())
+            else:
+                end = datetime.now(timezone.utc)
+                rows = await backfill.backfill_buckets(args.mode, end - timedelta(days=args.days), end)
+        logger.info(f"Backfill of {source} wrote {rows} rows in {datetime.now() - started}")
+    finally:
+        await pool.close()
+        await scheduler.close()
+        await HttpClientPool.shutdown()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill prices wiki history into Postgres")
+    parser.add_argument("mode", choices=["5m", "1h", "timeseries"])
+    parser.add_argument("--days", type=float, default=30, help="How far back to backfill 5m/1h buckets")
+    parser.add_argument("--timestep", choices=list(TIMESTEPS), default="6h", help="Timestep for timeseries mode")
+    parser.add_argument("--concurrency", type=int, default=settings.OSRS_BACKFILL_CONCURRENCY)
+    parser.add_argument("--rate", type=int, default=settings.OSRS_BACKFILL_RATE_LIMIT, help="Requests per minute")
+    parser.add_argument("--restart", action="store_true", help="Ignore and clear the checkpoint for this source")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.calculators.flipping_calculator import FlippingCalculator
+from app.models.runescape import FlipAllocation, FlippingBatchResult, FlipPlan, FlipRanking, OsrsMarket, RankedFlip
+from app.services.osrs_price_poller import OsrsPricePoller
+from app.services.osrs_volume_cache import OsrsVolumeCache
+
+# Metrics a ranking can be sorted by, all columns of FlippingBatchResult apart from volume_percentile
+FLIP_SORT_METRICS = (
+    "roi_percentage", "roi_per_item", "total_profit", "profit_per_item", "price_diff",
+    "cash_needed", "volume", "score_volume", "volume_percentile"
+)
+RANKED_QUERY_CACHE_SIZE = 64
+
+
+class FlipFilters(NamedTuple):
+    """Filters of one ranking query. Hashable, so it doubles as the ranked index cache key."""
+    min_profit: Optional[int] = None
+    min_roi: Optional[float] = None
+    max_roi: Optional[float] = None
+    max_cash: Optional[int] = None
+    members: Optional[bool] = None
+    min_volume_percentile: Optional[float] = None
+
+
+class MarketMetrics(NamedTuple):
+    """Flipping metrics for the whole market at one price snapshot and volume dataset."""
+    key: Tuple[int, int]
+    market: OsrsMarket
+    calc: FlippingBatchResult
+    volume_percentile: np.ndarray
+
+
+class FlipRanker:
+    """
+    Ranks flips across the whole market.
+    Metrics are computed once per price snapshot and volumes dataset, and each query's ranked index is cached
+    until the next snapshot, so repeated queries between two polls only slice a cached array.
+    Only the top `offset + limit` candidates are ordered, selected with argpartition.
+    Budget plans (FlippingCalculator.calculate_v3) run on the same cached metrics.
+    """
+    _metrics: Optional[MarketMetrics] = None
+    _ranked: "OrderedDict[Tuple, Tuple[np.ndarray, int]]" = OrderedDict()
+    _calculator = FlippingCalculator()
+
+    @classmethod
+    async def get_metrics(cls) -> MarketMetrics:
+        from app.dependencies import get_osrs_service
+
+        snapshot = await OsrsPricePoller.get_or_refresh()
+        volumes = await OsrsVolumeCache.get_or_refresh()
+        key = (snapshot.version, volumes.timestamp)
+        if cls._metrics is not None and cls._metrics.key == key:
+            return cls._metrics
+
+        market = await get_osrs_service().get_market(volumes.volumes)
+        cls._calculator.set_item_volumes(volumes.volumes)
+        calc = cls._calculator.calculate_batch(market.high, market.low, market.limit, market.volume)
+
+        # Share of the market trading at most this item's volume
+        sorted_volume = np.sort(market.volume)
+        volume_percentile = np.searchsorted(sorted_volume, market.volume, side="right") / max(sorted_volume.size, 1) * 100
+
+        cls._metrics = MarketMetrics(key, market, calc, volume_percentile)
+        cls._ranked.clear()
+        return cls._metrics
+
+    @staticmethod
+    def _metric(metrics: MarketMetrics, sort: str) -> np.ndarray:
+        if sort == "volume_percentile":
+            return metrics.volume_percentile
+        return getattr(metrics.calc, sort)
+
+    @staticmethod
+    def _candidates(metrics: MarketMetrics, filters: FlipFilters) -> np.ndarray:
+        calc = metrics.calc
+        mask = (calc.high_price > 0) & (calc.low_price > 0)
+        if filters.min_profit is not None:
+            mask &= calc.total_profit >= filters.min_profit
+        if filters.min_roi is not None:
+            mask &= calc.roi_percentage >= filters.min_roi
+        if filters.max_roi is not None:
+            mask &= calc.roi_percentage < filters.max_roi
+        if filters.max_cash is not None:
+            mask &= calc.cash_needed <= filters.max_cash
+        if filters.members is not None:
+            mask &= metrics.market.members == filters.members
+        if filters.min_volume_percentile is not None:
+            mask &= metrics.volume_percentile >= filters.min_volume_percentile
+        return np.flatnonzero(mask)
+
+    @classmethod
+    def _rank(cls, metrics: MarketMetrics, filters: FlipFilters, sort: str, descending: bool, count: int) -> Tuple[np.ndarray, int]:
+        """The first `count` market indices in ranked order, and how many items pass the filters."""
+        cache_key = (filters, sort, descending)
+        cached = cls._ranked.get(cache_key)
+        if cached is not None and (cached[0].size >= count or cached[0].size == cached[1]):
+            cls._ranked.move_to_end(cache_key)
+            return cached
+
+        candidates = cls._candidates(metrics, filters)
+        values = cls._metric(metrics, sort)[candidates]
+        if descending:
+            values = -values
+
+        if count < candidates.size:
+            top = np.argpartition(values, count - 1)[:count]
+            ranked = candidates[top[np.argsort(values[top], kind="stable")]]
+        else:
+            ranked = candidates[np.argsort(values, kind="stable")]
+
+        cls._ranked[cache_key] = (ranked, candidates.size)
+        if len(cls._ranked) > RANKED_QUERY_CACHE_SIZE:
+            cls._ranked.popitem(last=False)
+        return ranked, candidates.size
+
+    @classmethod
+    async def rank(cls, filters: FlipFilters = FlipFilters(), sort: str = "roi_percentage", descending: bool = True,
+                   limit: int = 20, offset: int = 0) -> FlipRanking:
+        if sort not in FLIP_SORT_METRICS:
+            raise ValueError(f"sort must be one of {', '.join(FLIP_SORT_METRICS)}")
+
+        metrics = await cls.get_metrics()
+        ranked, total = cls._rank(metrics, filters, sort, descending, offset + limit)
+        page = ranked[offset:offset + limit]
+
+        market, calc = metrics.market, metrics.calc
+        flips = [
+            RankedFlip(
+                item_id=int(market.ids[i]),
+                item_name=market.names[i],
+                members=bool(market.members[i]),
+                limit=int(calc.limit[i]),
+                high_price=int(calc.high_price[i]),
+                low_price=int(calc.low_price[i]),
+                profit_per_item=int(calc.profit_per_item[i]),
+                total_profit=int(calc.total_profit[i]),
+                cash_needed=int(calc.cash_needed[i]),
+                roi_percentage=float(calc.roi_percentage[i]),
+                volume=int(calc.volume[i]),
+                volume_percentile=float(metrics.volume_percentile[i])
+            )
+            for i in page.tolist()
+        ]
+        return FlipRanking(version=metrics.key[0], total=total, offset=offset, limit=limit, sort=sort, flips=flips)
+
+    @classmethod
+    async def plan(cls, budget: int, max_items: Optional[int] = None) -> FlipPlan:
+        """Which items and quantities to buy with `budget` gp, see FlippingCalculator.calculate_v3."""
+        metrics = await cls.get_metrics()
+        market, calc = metrics.market, metrics.calc
+        quantity = cls._calculator.calculate_v3(budget, calc)
+
+        chosen = np.flatnonzero(quantity)
+        cost = quantity[chosen] * calc.low_price[chosen]
+        expected_profit = np.floor(quantity[chosen] * calc.profit_per_item[chosen] * calc.score_volume[chosen]).astype(np.int64)
+        order = np.argsort(-expected_profit, kind="stable")[:max_items]
+
+        allocations = [
+            FlipAllocation(
+                item_id=int(market.ids[chosen[i]]),
+                item_name=market.names[chosen[i]],
+                quantity=int(quantity[chosen[i]]),
+                buy_price=int(calc.low_price[chosen[i]]),
+                sell_price=int(calc.high_price[chosen[i]]),
+                cost=int(cost[i]),
+                fill_probability=float(calc.score_volume[chosen[i]]),
+                expected_profit=int(expected_profit[i])
+            )
+            for i in order.tolist()
+        ]
+        return FlipPlan(
+            version=metrics.key[0],
+            budget=budget,
+            cash_used=int(cost.sum()),
+            expected_profit=int(expected_profit.sum()),
+            allocations=allocations
+        )
@@ -0,0 +1,104 @@
+import heapq
+import math
+import re
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.runescape import OsrsItem
+
+
+class OsrsItemSearchIndex:
+    """
+    Prebuilt name index over the OSRS item catalog.
+    Exact lookups go through a normalized name map, fuzzy lookups through a trigram index
+    ranked by Dice similarity and nudged by trade volume.
+    """
+    VOLUME_WEIGHT = 0.1
+    PREFIX_BONUS = 0.25
+
+    _NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+    def __init__(self, items: Iterable[OsrsItem], aliases: Optional[Dict[str, str]] = None):
+        self.items: List[OsrsItem] = [item for item in items if item.name]
+        self.names: List[str] = [self.normalize(item.name) for item in self.items]
+        self.exact: Dict[str, int] = {}
+        self.trigrams: Dict[str, List[int]] = {}
+        self.trigram_counts: List[int] = []
+        self.volumes: Dict[str, int] = {}
+        self.max_log_volume = 0.0
+
+        for index, name in enumerate(self.names):
+            self.exact.setdefault(name, index)
+            grams = self._trigrams(name)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigrams.setdefault(gram, []).append(index)
+
+        for alias, target in (aliases or {}).items():
+            index = self.exact.get(self.normalize(target))
+            if index is not None:
+                self.exact.setdefault(self.normalize(alias), index)
+
+    @classmethod
+    def normalize(cls, name: str) -> str:
+        """Lowercase, drop apostrophes and collapse punctuation, so "Saradomin brew(4)" == "saradomin brew 4"."""
+        return cls._NON_ALNUM.sub(" ", name.lower().replace("'", "")).strip()
+
+    @staticmethod
+    def _trigrams(name: str) -> set:
+        padded = f"  {name} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def set_volumes(self, volumes: Dict[str, int]):
+        """Use these trade volumes (keyed by item name) to rank equally similar matches."""
+        self.volumes = volumes
+        self.max_log_volume = math.log1p(max(volumes.values(), default=0))
+
+    def find(self, name: str) -> Optional[OsrsItem]:
+        index = self.exact.get(self.normalize(name))
+        return self.items[index] if index is not None else None
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[OsrsItem, float]]:
+        """Top `limit` fuzzy matches for the query as (item, score), best first."""
+        normalized = self.normalize(query)
+        if not normalized:
+            return []
+
+        query_grams = self._trigrams(normalized)
+        shared = Counter(chain.from_iterable(self.trigrams.get(gram, ()) for gram in query_grams))
+
+        exact_index = self.exact.get(normalized)
+        if exact_index is not None:
+            shared.setdefault(exact_index, len(query_grams))
+
+        # Names sharing under a third of the query's trigrams can never rank, skip scoring them
+        min_shared = max(1, len(query_grams) // 3)
+
+        scored = []
+        for index, count in shared.items():
+            if count < min_shared:
+                continue
+            score = 2 * count / (len(query_grams) + self.trigram_counts[index])
+            if index == exact_index:
+                score = 2.0
+            elif self.names[index].startswith(normalized):
+                score += self.PREFIX_BONUS
+            scored.append((score * (1 + self.VOLUME_WEIGHT * self._volume_score(index)), index))
+
+        return [(self.items[index], score) for score, index in heapq.nlargest(limit, scored)]
+
+    def best_match(self, query: str, threshold: float) -> Optional[OsrsItem]:
+        """Exact match if there is one, otherwise the top fuzzy match scoring at least `threshold`."""
+        if item := self.find(query):
+            return item
+
+        matches = self.search(query, limit=1)
+        if matches and matches[0][1] >= threshold:
+            return matches[0][0]
+        return None
+
+    def _volume_score(self, index: int) -> float:
+        if self.max_log_volume <= 0:
+            return 0.0
+        return math.log1p(self.volumes.get(self.items[index].name, 0)) / self.max_log_volume
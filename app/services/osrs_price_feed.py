@@ -0,0 +1,111 @@
+import asyncio
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+import numpy as np
+import orjson
+
+from app.config import settings
+from app.services.osrs_price_poller import OsrsPricePoller, PriceSnapshot
+from app.utils.logger import logger
+
+
+class FeedMessage:
+    """One feed payload, encoded once for WebSockets and once as an SSE frame, shared by every subscriber it goes to."""
+    __slots__ = ("json", "text", "sse")
+
+    def __init__(self, event: str, version: int, payload: dict):
+        self.json = orjson.dumps(payload)
+        self.text = self.json.decode()
+        self.sse = b"event: " + event.encode() + b"\nid: " + str(version).encode() + b"\ndata: " + self.json + b"\n\n"
+
+
+class FeedSubscriber:
+    """A client's bounded message queue. A None message means the subscriber was evicted and should disconnect."""
+    __slots__ = ("queue", "item_ids")
+
+    def __init__(self, item_ids: Optional[FrozenSet[str]]):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.OSRS_FEED_QUEUE_SIZE)
+        self.item_ids = item_ids
+
+
+class OsrsPriceFeed:
+    """
+    Live price feed behind the /osrs/items/stream (SSE) and /osrs/items/ws (WebSocket) endpoints.
+    Subscribers get the full snapshot on connect and then, on every poll, only the items whose high or low changed.
+    Each delta is encoded once per distinct item filter and shared by every matching subscriber.
+    A subscriber whose queue is full (a slow consumer) is evicted instead of holding back the others.
+    """
+    _subscribers: Set[FeedSubscriber] = set()
+    _previous: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    _full: Optional[Tuple[int, FeedMessage]] = None
+
+    @classmethod
+    def start(cls):
+        OsrsPricePoller.add_listener(cls.on_snapshot)
+
+    @classmethod
+    def subscriber_count(cls) -> int:
+        return len(cls._subscribers)
+
+    @classmethod
+    async def subscribe(cls, item_ids: Optional[Set[str]] = None) -> Optional[FeedSubscriber]:
+        """Register a subscriber with the full snapshot already queued. None when the feed is at capacity."""
+        if len(cls._subscribers) >= settings.OSRS_FEED_MAX_SUBSCRIBERS:
+            return None
+
+        snapshot = await OsrsPricePoller.get_or_refresh()
+        subscriber = FeedSubscriber(frozenset(item_ids) if item_ids else None)
+        subscriber.queue.put_nowait(cls._snapshot_message(snapshot, subscriber.item_ids))
+        cls._subscribers.add(subscriber)
+        return subscriber
+
+    @classmethod
+    def unsubscribe(cls, subscriber: FeedSubscriber):
+        cls._subscribers.discard(subscriber)
+
+    @classmethod
+    def _snapshot_message(cls, snapshot: PriceSnapshot, item_ids: Optional[FrozenSet[str]]) -> FeedMessage:
+        if item_ids is not None:
+            data = {item_id: snapshot.data[item_id] for item_id in item_ids if item_id in snapshot.data}
+            return FeedMessage("snapshot", snapshot.version, {"version": snapshot.version, "data": data})
+
+        # The unfiltered snapshot is the same for everyone connecting during one version
+        if cls._full is None or cls._full[0] != snapshot.version:
+            cls._full = (snapshot.version, FeedMessage("snapshot", snapshot.version, {"version": snapshot.version, "data": snapshot.data}))
+        return cls._full[1]
+
+    @classmethod
+    async def on_snapshot(cls, snapshot: PriceSnapshot):
+        """Price poller listener."""
+        high, low = OsrsPricePoller.get_price_arrays(snapshot)
+        previous, cls._previous = cls._previous, (high, low)
+        if previous is None or not cls._subscribers:
+            return
+
+        previous_high, previous_low = previous
+        size = max(high.size, previous_high.size)
+        changed = (np.pad(high, (0, size - high.size)) != np.pad(previous_high, (0, size - previous_high.size))) | \
+                  (np.pad(low, (0, size - low.size)) != np.pad(previous_low, (0, size - previous_low.size)))
+        delta = {str(item_id): snapshot.data[str(item_id)] for item_id in np.flatnonzero(changed).tolist() if str(item_id) in snapshot.data}
+
+        messages: Dict[Optional[FrozenSet[str]], Optional[FeedMessage]] = {}
+        for subscriber in list(cls._subscribers):
+            if subscriber.item_ids not in messages:
+                data = delta if subscriber.item_ids is None else {k: v for k, v in delta.items() if k in subscriber.item_ids}
+                messages[subscriber.item_ids] = FeedMessage("delta", snapshot.version, {"version": snapshot.version, "data": data}) if data else None
+
+            message = messages[subscriber.item_ids]
+            if message is None:
+                continue
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                cls._evict(subscriber)
+
+    @classmethod
+    def _evict(cls, subscriber: FeedSubscriber):
+        cls._subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+        logger.warning("Evicted a slow price feed subscriber")
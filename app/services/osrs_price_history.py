@@ -0,0 +1,230 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.models.runescape import PriceHistoryPoint, PriceHistoryResponse, PriceHistoryStats
+from app.services.osrs_price_poller import PriceSnapshot
+
+
+class PriceHistoryStore:
+    """
+    Fixed-size in-memory price history for every catalog item, fed by the price poller.
+    All items share one ring of `capacity` ticks: each tick writes one row of high, low,
+    highTime and lowTime for every item, so memory is exactly capacity * items * 16 bytes
+    (about 24MB for 360 ticks of ~4,000 items). Items missing from a tick keep their last price.
+
+    Rolling statistics of the mid price over the window (mean, EWMA, min/max, volatility) are
+    kept incrementally per tick: the evicted tick is subtracted and the new one added, so a tick
+    costs O(1) per item regardless of the window size.
+    """
+    _instance: Optional["PriceHistoryStore"] = None
+
+    def __init__(self, item_ids: Iterable[int], capacity: int, ewma_alpha: float):
+        self.rows: Dict[int, int] = {item_id: row for row, item_id in enumerate(item_ids)}
+        self.capacity = capacity
+        self.ewma_alpha = ewma_alpha
+        items = len(self.rows)
+
+        self.tick_times = np.zeros(capacity, dtype=np.int64)
+        self.high = np.zeros((capacity, items), dtype=np.int32)
+        self.low = np.zeros((capacity, items), dtype=np.int32)
+        self.high_time = np.zeros((capacity, items), dtype=np.uint32)
+        self.low_time = np.zeros((capacity, items), dtype=np.uint32)
+        self.cursor = 0
+        self.ticks = 0
+
+        # Latest known values, used to forward-fill items missing from a tick
+        self.last = np.zeros((4, items), dtype=np.int64)
+
+        self.count = np.zeros(items, dtype=np.int64)
+        self.sum = np.zeros(items, dtype=np.float64)
+        self.sum_sq = np.zeros(items, dtype=np.float64)
+        self.ewma = np.zeros(items, dtype=np.float64)
+        self.min = np.full(items, np.inf)
+        self.max = np.full(items, -np.inf)
+
+    @classmethod
+    def get_instance(cls) -> "PriceHistoryStore":
+        if cls._instance is None:
+            from app.constants import constants
+            cls._instance = PriceHistoryStore(
+                constants.OSRSITEMLIST.keys(),
+                capacity=settings.OSRS_PRICE_HISTORY_SIZE,
+                ewma_alpha=settings.OSRS_PRICE_HISTORY_EWMA_ALPHA
+            )
+        return cls._instance
+
+    @classmethod
+    async def on_snapshot(cls, snapshot: PriceSnapshot):
+        """Price poller listener."""
+        cls.get_instance().add_snapshot(snapshot)
+
+    def _mid(self, slot: int) -> np.ndarray:
+        """Mid price of every item at a slot, 0 where either side is unknown."""
+        high = self.high[slot].astype(np.float64)
+        low = self.low[slot].astype(np.float64)
+        return np.where((high > 0) & (low > 0), (high + low) / 2, 0.0)
+
+    def add_snapshot(self, snapshot: PriceSnapshot):
+        for item_id, entry in snapshot.data.items():
+            row = self.rows.get(int(item_id))
+            if row is None:
+                continue
+            # Only overwrite the sides the wiki has seen a trade for
+            if entry.get("high"):
+                self.last[0, row] = entry["high"]
+                self.last[2, row] = entry["highTime"]
+            if entry.get("low"):
+                self.last[1, row] = entry["low"]
+                self.last[3, row] = entry["lowTime"]
+
+        self.add_tick(int(snapshot.fetched_at.timestamp()), self.last[0], self.last[1], self.last[2], self.last[3])
+
+    def add_tick(self, timestamp: int, high: np.ndarray, low: np.ndarray, high_time: np.ndarray, low_time: np.ndarray):
+        slot = self.cursor
+
+        if self.ticks >= self.capacity:
+            evicted = self._mid(slot)
+            evicted_valid = evicted > 0
+            self.count -= evicted_valid
+            self.sum -= evicted
+            self.sum_sq -= evicted * evicted
+        else:
+            evicted = None
+
+        self.tick_times[slot] = timestamp
+        self.high[slot] = high
+        self.low[slot] = low
+        self.high_time[slot] = high_time
+        self.low_time[slot] = low_time
+
+        mid = self._mid(slot)
+        valid = mid > 0
+        self.count += valid
+        self.sum += mid
+        self.sum_sq += mid * mid
+        self.ewma = np.where(valid, np.where(self.ewma > 0, self.ewma_alpha * mid + (1 - self.ewma_alpha) * self.ewma, mid), self.ewma)
+        self.min = np.where(valid, np.minimum(self.min, mid), self.min)
+        self.max = np.where(valid, np.maximum(self.max, mid), self.max)
+
+        self.cursor = (slot + 1) % self.capacity
+        self.ticks += 1
+
+        if evicted is not None:
+            # Only items whose evicted value was the window's min or max need a rescan
+            stale = evicted_valid & ((evicted <= self.min) | (evicted >= self.max))
+            if stale.any():
+                self._rescan_extremes(np.flatnonzero(stale))
+
+        if self.cursor == 0:
+            # Re-sum once per full lap, so floating point drift in the running sums never builds up
+            self._resum()
+
+    def _window_mids(self, columns=slice(None)) -> np.ndarray:
+        filled = min(self.ticks, self.capacity)
+        high = self.high[:filled, columns].astype(np.float64)
+        low = self.low[:filled, columns].astype(np.float64)
+        return np.where((high > 0) & (low > 0), (high + low) / 2, np.nan)
+
+    def _rescan_extremes(self, columns: np.ndarray):
+        mids = self._window_mids(columns)
+        has_data = ~np.isnan(mids).all(axis=0)
+        self.min[columns] = np.where(has_data, np.nanmin(np.where(has_data, mids, 0), axis=0), np.inf)
+        self.max[columns] = np.where(has_data, np.nanmax(np.where(has_data, mids, 0), axis=0), -np.inf)
+
+    def _resum(self):
+        mids = np.nan_to_num(self._window_mids())
+        self.sum = mids.sum(axis=0)
+        self.sum_sq = (mids * mids).sum(axis=0)
+        self.count = (mids > 0).sum(axis=0)
+
+    def _window_slots(self, window: int) -> np.ndarray:
+        """Ring slots of the last `window` ticks, oldest first. Never more than the ticks written so far."""
+        window = min(window, self.ticks, self.capacity)
+        return (self.cursor - window + np.arange(window)) % self.capacity
+
+    def get_stats(self, item_id: int, window: Optional[int] = None) -> Optional[PriceHistoryStats]:
+        """
+        Statistics of the item's mid price over the last `window` ticks (every tick held when None).
+        Ticks where either side of the price is unknown are left out. The whole ring is served from the running sums,
+        shorter windows are computed from their ticks.
+        """
+        row = self.rows.get(item_id)
+        if row is None:
+            return None
+
+        if window is not None and window < min(self.ticks, self.capacity):
+            return self._window_stats(row, self._window_slots(window))
+
+        count = int(self.count[row])
+        mean = self.sum[row] / count if count else 0.0
+        std = float(np.sqrt(max(self.sum_sq[row] / count - mean * mean, 0.0))) if count else 0.0
+
+        return PriceHistoryStats(
+            samples=count,
+            mean=mean,
+            ewma=float(self.ewma[row]),
+            min=float(self.min[row]) if count else 0.0,
+            max=float(self.max[row]) if count else 0.0,
+            stddev=std,
+            volatility=std / mean if mean else 0.0
+        )
+
+    def _window_stats(self, row: int, slots: np.ndarray) -> PriceHistoryStats:
+        high = self.high[slots, row].astype(np.float64)
+        low = self.low[slots, row].astype(np.float64)
+        mids = ((high + low) / 2)[(high > 0) & (low > 0)]
+        if not len(mids):
+            return PriceHistoryStats(samples=0, mean=0.0, ewma=0.0, min=0.0, max=0.0, stddev=0.0, volatility=0.0)
+
+        # Same recurrence as add_tick, seeded with the window's first price: the k-th newest price weighs alpha * (1 - alpha)^k
+        weights = self.ewma_alpha * (1 - self.ewma_alpha) ** np.arange(len(mids) - 1, -1, -1)
+        weights[0] = (1 - self.ewma_alpha) ** (len(mids) - 1)
+        mean = float(mids.mean())
+        std = float(mids.std())
+
+        return PriceHistoryStats(
+            samples=len(mids),
+            mean=mean,
+            ewma=float(weights @ mids),
+            min=float(mids.min()),
+            max=float(mids.max()),
+            stddev=std,
+            volatility=std / mean if mean else 0.0
+        )
+
+    def get_history(self, item_id: int, window: int, step: int = 1) -> Optional[PriceHistoryResponse]:
+        """
+        The last `window` ticks for an item, oldest first, downsampled into buckets of `step` ticks, with stats over the same window.
+        Bucket prices are averaged over the ticks that have one (0 when none does), times are the latest in the bucket.
+        """
+        row = self.rows.get(item_id)
+        if row is None:
+            return None
+
+        slots = self._window_slots(window)
+        window = len(slots)
+
+        # Drop the oldest ticks that do not fill a whole bucket
+        usable = window - window % step
+        buckets = slots[window - usable:].reshape(-1, step) if usable else slots[:0].reshape(0, step)
+
+        high = self._bucket_mean(self.high[buckets, row])
+        low = self._bucket_mean(self.low[buckets, row])
+        points = [
+            PriceHistoryPoint(timestamp=int(t), high=int(h), low=int(l), highTime=int(ht), lowTime=int(lt))
+            for t, h, l, ht, lt in zip(
+                self.tick_times[buckets[:, -1]], high.round(), low.round(),
+                self.high_time[buckets, row].max(axis=1), self.low_time[buckets, row].max(axis=1)
+            )
+        ]
+
+        return PriceHistoryResponse(item_id=item_id, step=step, stats=self.get_stats(item_id, window), points=points)
+
+    @staticmethod
+    def _bucket_mean(prices: np.ndarray) -> np.ndarray:
+        """Mean of each bucket's known (non-zero) prices, 0 for a bucket without any."""
+        known = prices > 0
+        counts = known.sum(axis=1)
+        return np.where(counts > 0, prices.sum(axis=1, dtype=np.float64) / np.maximum(counts, 1), 0.0)
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.upstream_scheduler import background_priority
+from app.utils.logger import logger
+
+
+class PriceSnapshot(NamedTuple):
+    """
+    One full /latest payload from the prices wiki.
+    Snapshots are replaced wholesale on every poll and must never be mutated by readers.
+    """
+    version: int
+    fetched_at: datetime
+    data: Dict[str, dict]
+
+
+PriceListener = Callable[[PriceSnapshot], Awaitable[None]]
+
+
+class OsrsPricePoller:
+    """
+    Background task that polls the prices wiki /latest endpoint on a fixed interval
+    and keeps the newest PriceSnapshot in memory for OsrsService to read from.
+    """
+    _snapshot: Optional[PriceSnapshot] = None
+    _task: Optional[asyncio.Task] = None
+    _lock: Optional[asyncio.Lock] = None
+    _listeners: List[PriceListener] = []
+    _price_arrays: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def get_snapshot(cls) -> Optional[PriceSnapshot]:
+        return cls._snapshot
+
+    @classmethod
+    def get_price_arrays(cls, snapshot: PriceSnapshot) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The snapshot's high and low prices as dense arrays indexed by item id, 0 where unknown.
+        Built once per snapshot version, for vectorized lookups of many items at once.
+        """
+        cached = cls._price_arrays
+        if cached is not None and cached[0] == snapshot.version:
+            return cached[1], cached[2]
+
+        ids = np.fromiter((int(item_id) for item_id in snapshot.data), dtype=np.int64, count=len(snapshot.data))
+        size = int(ids.max()) + 1 if ids.size else 0
+        high = np.zeros(size, dtype=np.int64)
+        low = np.zeros(size, dtype=np.int64)
+        high[ids] = [entry.get("high") or 0 for entry in snapshot.data.values()]
+        low[ids] = [entry.get("low") or 0 for entry in snapshot.data.values()]
+
+        cls._price_arrays = (snapshot.version, high, low)
+        return high, low
+
+    @classmethod
+    def add_listener(cls, listener: PriceListener):
+        """Register a coroutine that is awaited with every new snapshot."""
+        cls._listeners.append(listener)
+
+    @classmethod
+    async def get_or_refresh(cls) -> PriceSnapshot:
+        """Return the current snapshot, fetching one first if the poller has not produced any yet."""
+        if cls._snapshot is not None:
+            return cls._snapshot
+
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+
+        async with cls._lock:
+            if cls._snapshot is None:
+                await cls.refresh()
+
+        return cls._snapshot
+
+    @classmethod
+    async def refresh(cls) -> PriceSnapshot:
+        from app.dependencies import get_osrs_service
+        payload = await get_osrs_service().fetch_latest()
+
+        version = cls._snapshot.version + 1 if cls._snapshot else 1
+        snapshot = PriceSnapshot(version=version, fetched_at=datetime.now(), data=payload.get("data", {}))
+        cls._snapshot = snapshot
+
+        for listener in cls._listeners:
+            try:
+                await listener(snapshot)
+            except Exception as e:
+                logger.error(f"Error in price snapshot listener {listener}: {e}")
+
+        return snapshot
+
+    @classmethod
+    async def _run(cls):
+        interval = settings.OSRS_PRICE_POLL_INTERVAL.total_seconds()
+        while True:
+            try:
+                with background_priority():
+                    await cls.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error polling OSRS latest prices: {e}")
+            await asyncio.sleep(interval)
+
+    @classmethod
+    async def start(cls):
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._run())
+            logger.info("OSRS price poller started")
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+            logger.info("OSRS price poller stopped")
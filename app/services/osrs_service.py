@@ -1,118 +1,133 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-import httpx
+import numpy as np
 from app.config import settings
 from app.constants import constants
-from app.models.runescape import ItemVolumeResponse, LatestItemsResponse, OsrsItem
+from app.models.runescape import ItemVolumeResponse, LatestItemsResponse, OsrsItem, OsrsMarket
+from app.services.osrs_item_search import OsrsItemSearchIndex
+from app.services.osrs_price_poller import OsrsPricePoller, PriceSnapshot
+from app.services.osrs_volume_cache import OsrsVolumeCache
+from app.services.upstream_scheduler import UpstreamScheduler
 from app.utils.logger import logger
 
 class OsrsService:
 
-    OSRS_ITEM_MAPPINGS = constants.OSRSITEMLIST
+    _search_index: Optional[OsrsItemSearchIndex] = None
 
-    def __init__(self,base_url: str):
-        self.client = httpx.Client()
-        self.client.headers.update({"User-Agent": "Discord Bot: @Thaffy on Discord"})
+    def __init__(self,base_url: str, scheduler: UpstreamScheduler, volumes_scheduler: UpstreamScheduler):
+        self.scheduler = scheduler
+        self.volumes_scheduler = volumes_scheduler
         self.base_url = base_url
 
         if self.base_url is None:
             raise Exception("base_url is required to use OsrsService")
 
-        if constants.OSRSITEMLIST.items() is None:
-            try:
-                self.OSRS_ITEM_MAPPINGS = constants.load_osrs_item_map()
-            except Exception as e:
-                logger.error(f"Error loading osrs item map: {e}")
+    @property
+    def OSRS_ITEM_MAPPINGS(self) -> Dict[int, OsrsItem]:
+        return constants.OSRSITEMLIST
 
-    async def _get(self, endpoint: str):
-        result = self.client.get(f"{self.base_url}{endpoint}")
+    async def _get(self, endpoint: str, params: Optional[dict] = None):
+        result = await self.scheduler.get(f"{self.base_url}{endpoint}", params=params)
+        result.raise_for_status()
         return result.json()
 
-    async def get_volumes(self) -> ItemVolumeResponse:
+    async def fetch_volumes(self, etag: Optional[str] = None) -> Tuple[Optional[dict], Optional[str]]:
         """
-        Get trading volumes for items from the OSRS volumes API endpoint.
-        Returns an ItemVolumeResponse with logarithmically scaled volumes.
+        Fetch the raw GE volumes dataset. Only the volume cache should call this.
+        Returns (None, etag) when the wiki answers 304 Not Modified for the given etag.
         """
-        response = self.client.get(settings.OSRS_VOLUMES_URL)
-        data = response.json()
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await self.volumes_scheduler.get(settings.OSRS_VOLUMES_URL, headers=headers)
+        if response.status_code == 304:
+            return None, etag
+
+        response.raise_for_status()
+        return response.json(), response.headers.get("ETag")
 
-        return ItemVolumeResponse(**data)
+    async def get_volumes(self) -> ItemVolumeResponse:
+        """
+        Get trading volumes for items from the OSRS volumes cache.
+        Scaled and percentile views on the result are already precomputed.
+        """
+        snapshot = await OsrsVolumeCache.get_or_refresh()
+        return snapshot.volumes
 
     async def get_volumes_scaled(self) -> ItemVolumeResponse:
         """
-        Get trading volumes for items from the OSRS volumes API endpoint.
+        Get trading volumes for items from the OSRS volumes cache.
         Returns an ItemVolumeResponse with logarithmically scaled volumes.
         """
-        response = self.client.get(settings.OSRS_VOLUMES_URL)
-        data = response.json()
-
-        # Extract the metadata fields
-        last_update = data.pop("%LAST_UPDATE%")
-        last_update_formatted = data.pop("%LAST_UPDATE_F%")
-
-        # Remove the empty 'items' dictionary if it exists
-        data.pop('items', None)
-
-        # Filter out items with 0 volume and sort remaining items
-        non_zero_items = {k: v for k, v in data.items() if v > 0}
-        sorted_items = sorted(non_zero_items.items(), key=lambda x: x[1], reverse=True)
-        zero_items = {k: 0 for k, v in data.items() if v == 0}
-
-        if sorted_items:
-            # Use logarithmic scaling for better distribution
-            import math
+        snapshot = await OsrsVolumeCache.get_or_refresh()
+        return snapshot.log_scaled
 
-            # Get volume values
-            volumes = [v for _, v in sorted_items]
+    async def fetch_latest(self) -> LatestItemsResponse:
+        """Fetch /latest from the prices wiki. Only the price poller should call this."""
+        return await self._get("/latest")
 
-            # Calculate log values (add 1 to handle volumes less than 1)
-            log_volumes = [math.log(v + 1) for v in volumes]
+    async def fetch_average_prices(self, timestep: str, timestamp: int) -> dict:
+        """Average prices of every item for one /5m or /1h bucket, starting at the given unix timestamp."""
+        return await self._get(f"/{timestep}", params={"timestamp": timestamp})
 
-            # Get min and max of log values
-            min_log = min(log_volumes)
-            max_log = max(log_volumes)
-
-            # Calculate scaling factor
-            scale_factor = 99 / (max_log - min_log) if max_log != min_log else 1
-
-            # Create scaled dictionary
-            scaled_items = {}
-
-            # Scale non-zero items
-            for (item_name, volume), log_vol in zip(sorted_items, log_volumes):
-                # Scale to 1-100 range
-                scaled_value = math.ceil((log_vol - min_log) * scale_factor + 1)
-                scaled_items[item_name] = scaled_value
-
-            # Add zero items back
-            scaled_items.update(zero_items)
-        else:
-            scaled_items = data  # If no non-zero items, return original data
-
-        # Create structured data
-        structured_data = {
-            "%LAST_UPDATE%": last_update,
-            "%LAST_UPDATE_F%": last_update_formatted,
-            "items": scaled_items
-        }
-
-        return ItemVolumeResponse(**structured_data)
+    async def fetch_timeseries(self, item_id: int, timestep: str) -> dict:
+        """The last 365 average price points of one item at the given timestep (5m, 1h, 6h or 24h)."""
+        return await self._get("/timeseries", params={"id": item_id, "timestep": timestep})
 
+    async def get_latest_snapshot(self) -> PriceSnapshot:
+        return await OsrsPricePoller.get_or_refresh()
 
     async def get_latest(self) -> LatestItemsResponse:
-         return await self._get("/latest")
+        snapshot = await OsrsPricePoller.get_or_refresh()
+        return {"data": snapshot.data}
 
     async def get_latest_by_item_id(self, item_id: int) -> LatestItemsResponse :
-        return await self._get(f"/latest?id={item_id}")
+        snapshot = await OsrsPricePoller.get_or_refresh()
+        entry = snapshot.data.get(str(item_id))
+        return {"data": {str(item_id): entry} if entry is not None else {}}
+
+    async def get_market(self, volumes: ItemVolumeResponse) -> OsrsMarket:
+        """
+        Join the latest prices, the item catalog and the trade volumes into aligned arrays,
+        ready for FlippingCalculator.calculate_batch. Items missing a high or low price are left out.
+        """
+        snapshot = await OsrsPricePoller.get_or_refresh()
+
+        ids, names, members, limits, highs, lows, item_volumes = [], [], [], [], [], [], []
+        for item_id, entry in snapshot.data.items():
+            item = self.OSRS_ITEM_MAPPINGS.get(int(item_id))
+            if item is None or not entry.get("high") or not entry.get("low"):
+                continue
+
+            ids.append(item.id)
+            names.append(item.name)
+            members.append(bool(item.members))
+            limits.append(item.limit or 0)
+            highs.append(entry["high"])
+            lows.append(entry["low"])
+            item_volumes.append(volumes.get_volume(item.name))
+
+        return OsrsMarket(
+            ids=np.array(ids, dtype=np.int64),
+            names=names,
+            members=np.array(members, dtype=bool),
+            limit=np.array(limits, dtype=np.int64),
+            high=np.array(highs, dtype=np.int64),
+            low=np.array(lows, dtype=np.int64),
+            volume=np.array(item_volumes, dtype=np.int64)
+        )
 
     def get_osrs_item_by_id(self, item_id: int) -> Optional[OsrsItem]:
         return self.OSRS_ITEM_MAPPINGS.get(item_id)
 
+    @classmethod
+    def get_search_index(cls) -> OsrsItemSearchIndex:
+        """Name index over the item catalog, built once on first use."""
+        if cls._search_index is None:
+            cls._search_index = OsrsItemSearchIndex(constants.OSRSITEMLIST.values(), constants.OSRS_ITEM_ALIASES)
+        return cls._search_index
+
     def get_osrs_item_by_name(self, name: str) -> Optional[OsrsItem]:
-        for item in self.OSRS_ITEM_MAPPINGS.values():
-            if item.name.lower() == name.lower():
-                return item
-        return None
+        """Exact (normalized or alias) match, falling back to the closest fuzzy match for typos."""
+        return self.get_search_index().best_match(name, settings.OSRS_FUZZY_MATCH_THRESHOLD)
 
-    async def close(self):
-        self.client.close()
\ No newline at end of file
+    def search_osrs_items(self, query: str, limit: int = settings.OSRS_SEARCH_LIMIT) -> List[Tuple[OsrsItem, float]]:
+        return self.get_search_index().search(query, limit)
\ No newline at end of file
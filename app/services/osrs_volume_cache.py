@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from app.config import settings
+from app.models.runescape import ItemVolumeResponse
+from app.services.upstream_scheduler import background_priority
+from app.utils.logger import logger
+
+
+class VolumeSnapshot(NamedTuple):
+    """
+    One GEVolumes dataset with all derived views already computed.
+    Replaced wholesale when %LAST_UPDATE% advances and never mutated by readers.
+    """
+    timestamp: int
+    fetched_at: datetime
+    etag: Optional[str]
+    volumes: ItemVolumeResponse
+    log_scaled: ItemVolumeResponse
+
+
+class OsrsVolumeCache:
+    """
+    Background cache for the wiki's GE volumes dataset, which only changes about once a day.
+    Checks for a new dataset every OSRS_VOLUME_REFRESH_INTERVAL and only rebuilds the
+    snapshot when %LAST_UPDATE% has moved forward.
+    """
+    _snapshot: Optional[VolumeSnapshot] = None
+    _task: Optional[asyncio.Task] = None
+    _lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def get_snapshot(cls) -> Optional[VolumeSnapshot]:
+        return cls._snapshot
+
+    @classmethod
+    async def get_or_refresh(cls) -> VolumeSnapshot:
+        """Return the current snapshot, fetching one first if the cache is still empty."""
+        if cls._snapshot is not None:
+            return cls._snapshot
+
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+
+        async with cls._lock:
+            if cls._snapshot is None:
+                await cls.refresh()
+
+        return cls._snapshot
+
+    @classmethod
+    async def refresh(cls) -> VolumeSnapshot:
+        from app.dependencies import get_osrs_service
+        osrs_service = get_osrs_service()
+
+        current = cls._snapshot
+        data, etag = await osrs_service.fetch_volumes(etag=current.etag if current else None)
+
+        if data is None or (current is not None and data.get("%LAST_UPDATE%", 0) <= current.timestamp):
+            return current
+
+        volumes = ItemVolumeResponse(**data).precompute()
+        log_scaled = ItemVolumeResponse(**{
+            "%LAST_UPDATE%": volumes.timestamp,
+            "%LAST_UPDATE_F%": volumes.timestamp_formatted,
+            **volumes.get_log_scaled_volumes()
+        })
+
+        cls._snapshot = VolumeSnapshot(
+            timestamp=volumes.timestamp,
+            fetched_at=datetime.now(),
+            etag=etag,
+            volumes=volumes,
+            log_scaled=log_scaled
+        )
+        osrs_service.get_search_index().set_volumes(volumes.volumes)
+        logger.info(f"OSRS volumes updated to {volumes.timestamp_formatted} ({len(volumes.volumes)} items)")
+
+        return cls._snapshot
+
+    @classmethod
+    async def _run(cls):
+        interval = settings.OSRS_VOLUME_REFRESH_INTERVAL.total_seconds()
+        while True:
+            try:
+                with background_priority():
+                    await cls.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing OSRS volumes: {e}")
+            await asyncio.sleep(interval)
+
+    @classmethod
+    async def start(cls):
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._run())
+            logger.info("OSRS volume cache started")
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+            logger.info("OSRS volume cache stopped")
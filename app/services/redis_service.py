@@ -1,18 +1,44 @@
-from redis import Redis
+from typing import Dict, List, Optional
+
+from redis.asyncio import Redis
 
 
 class RedisService:
-    def __init__(self, redis: Redis = None):
-        self.redis = redis.client()
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def ping(self) -> bool:
+        return await self.redis.ping()
+
+    async def write(self, key: str, value: bytes, ttl: Optional[int] = None):
+        return await self.redis.set(key, value, ex=ttl)
+
+    async def read(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(key)
+
+    async def read_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self.redis.mget(keys)
 
-    async def write(self, key, value):
-        return self.redis.set(key, value)
+    async def write_many(self, values: Dict[str, bytes], ttl: Optional[int] = None):
+        """Write all values in one round trip."""
+        if not values:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(key, value, ex=ttl)
+            await pipe.execute()
 
-    async def read(self, key):
-        return self.redis.get(key)
+    async def delete(self, key: str):
+        return await self.redis.delete(key)
 
-    async def delete(self, key):
-        return self.redis.delete(key)
+    async def invalidate(self, pattern: str) -> int:
+        """Delete every key matching the pattern, e.g. 'cache:v1:dota.player:*'."""
+        deleted = 0
+        async for key in self.redis.scan_iter(match=pattern, count=500):
+            deleted += await self.redis.unlink(key)
+        return deleted
 
-    async def invalidate(self):
-        return self.redis
\ No newline at end of file
+    async def close(self):
+        await self.redis.aclose()
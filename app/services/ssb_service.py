@@ -1,24 +1,32 @@
-import httpx
 import pandas as pd
 
+from app.services.cache_service import cached
+from app.services.upstream_scheduler import UpstreamScheduler
+
 
 class SsbService:
-    def __init__(self,base_url: str):
+    def __init__(self,base_url: str, scheduler: UpstreamScheduler):
         self.base_url = base_url
-        self.client = httpx.Client()
+        self.scheduler = scheduler
 
         if self.base_url is None:
            raise Exception("base_url is required to use SsbService")
 
     async def _get(self, endpoint: str):
-            response = self.client.get(f"{self.base_url}{endpoint}")
+            response = await self.scheduler.get(f"{self.base_url}{endpoint}")
+            response.raise_for_status()
             return response.json()
 
+    @cached("ssb.tables")
     async def get_tables(self):
         return await self._get(f"/table")
 
+    @cached("ssb.table")
+    async def get_table(self, table_id: int):
+        return await self._get(f"/table/{table_id}")
+
     async def get_unemployment(self):
-        data = await self._get(f"/table/13760")
+        data = await self.get_table(13760)
         dataframe = pd.DataFrame(data)
         head = dataframe.head()
         print(head)
@@ -0,0 +1,169 @@
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List
+
+import numpy as np
+from sqlalchemy import select
+
+from app.calculators.flipping_calculator import FlippingCalculator
+from app.database.db import Database
+from app.database.models.osrs_trades import OsrsTrade
+from app.database.write_behind import WriteBehindQueue
+from app.models.runescape import OsrsItem, TraderPositions
+from app.utils.exceptions import InsufficientPositionError
+from app.utils.logger import logger
+
+
+def after_tax(price: int) -> float:
+    """What a sale at `price` actually pays out per item, following FlippingCalculator's tax rule."""
+    return price * (1 - FlippingCalculator.TAX_RATE) if price > 100 else price
+
+
+class Position:
+    """
+    Open FIFO lots and running totals for one user and item.
+    A buy appends a lot and a sell consumes lots from the front, so each fill is O(1) amortized.
+    """
+    __slots__ = ("lots", "quantity", "cost", "realized")
+
+    def __init__(self):
+        self.lots: Deque[List[int]] = deque()  # [quantity, price], oldest first
+        self.quantity = 0
+        self.cost = 0  # FIFO cost basis of the open quantity
+        self.realized = 0.0
+
+    def buy(self, quantity: int, price: int):
+        self.lots.append([quantity, price])
+        self.quantity += quantity
+        self.cost += quantity * price
+
+    def sell(self, quantity: int, price: int) -> float:
+        """Close `quantity` against the oldest lots and return the realized P&L of this sale."""
+        if quantity > self.quantity:
+            raise InsufficientPositionError(f"Only {self.quantity:,} held")
+
+        remaining = quantity
+        cost = 0
+        while remaining:
+            lot = self.lots[0]
+            taken = min(lot[0], remaining)
+            cost += taken * lot[1]
+            lot[0] -= taken
+            remaining -= taken
+            if lot[0] == 0:
+                self.lots.popleft()
+
+        pnl = after_tax(price) * quantity - cost
+        self.quantity -= quantity
+        self.cost -= cost
+        self.realized += pnl
+        return pnl
+
+
+class TradeLedger:
+    """
+    Per-user trade ledger behind the $in, $out and $pos commands.
+    Fills are persisted through the WriteBehindQueue, so recording one never waits on the database.
+    A user's positions are rebuilt from their stored fills once, on first use, and are then kept up to date in memory.
+    """
+    _books: Dict[int, Dict[int, Position]] = {}
+    _locks: Dict[int, asyncio.Lock] = {}
+
+    @staticmethod
+    def is_persistent() -> bool:
+        """Whether fills are stored, without a database the ledger only lives until the next restart."""
+        return Database.is_available()
+
+    @classmethod
+    async def get_positions(cls, user_id: int) -> Dict[int, Position]:
+        book = cls._books.get(user_id)
+        if book is not None:
+            return book
+
+        lock = cls._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            if user_id not in cls._books:
+                cls._books[user_id] = await cls._load(user_id)
+        return cls._books[user_id]
+
+    @classmethod
+    async def _load(cls, user_id: int) -> Dict[int, Position]:
+        book: Dict[int, Position] = {}
+        if not Database.is_available():
+            return book
+
+        async with Database.session() as session:
+            result = await session.execute(
+                select(OsrsTrade.item_id, OsrsTrade.quantity, OsrsTrade.price)
+                .where(OsrsTrade.user_id == user_id)
+                .order_by(OsrsTrade.id)
+            )
+            rows = result.all()
+
+        for item_id, quantity, price in rows:
+            position = book.setdefault(item_id, Position())
+            if quantity > 0:
+                position.buy(quantity, price)
+                continue
+            try:
+                position.sell(-quantity, price)
+            except InsufficientPositionError:
+                # Only possible when a buy was lost on the way to the database, close what is held and say so
+                logger.error(
+                    f"Stored trades of user {user_id} sell {-quantity:,} of item {item_id} while only {position.quantity:,} "
+                    f"were bought, the ledger is missing fills"
+                )
+                position.sell(position.quantity, price)
+
+        logger.info(f"Loaded {len(rows)} trades for user {user_id}")
+        return book
+
+    @classmethod
+    async def record_buy(cls, user_id: int, item_id: int, quantity: int, price: int) -> Position:
+        position = (await cls.get_positions(user_id)).setdefault(item_id, Position())
+        position.buy(quantity, price)
+        WriteBehindQueue.add(OsrsTrade, user_id=user_id, item_id=item_id, quantity=quantity, price=price)
+        return position
+
+    @classmethod
+    async def record_sell(cls, user_id: int, item_id: int, quantity: int, price: int) -> float:
+        """Record a sale and return its realized P&L. Raises InsufficientPositionError when selling more than is held."""
+        position = (await cls.get_positions(user_id)).get(item_id)
+        if position is None:
+            raise InsufficientPositionError("Nothing held")
+
+        pnl = position.sell(quantity, price)
+        WriteBehindQueue.add(OsrsTrade, user_id=user_id, item_id=item_id, quantity=-quantity, price=price)
+        return pnl
+
+    @classmethod
+    async def mark_to_market(cls, user_id: int, high_prices: np.ndarray, items: Dict[int, OsrsItem]) -> TraderPositions:
+        """
+        Value every open position at the latest high price in one vectorized pass.
+        `high_prices` is indexed by item id, see OsrsPricePoller.get_price_arrays.
+        """
+        book = await cls.get_positions(user_id)
+        open_positions = [(item_id, position) for item_id, position in book.items() if position.quantity > 0]
+
+        item_ids = np.fromiter((item_id for item_id, _ in open_positions), dtype=np.int64, count=len(open_positions))
+        quantity = np.fromiter((p.quantity for _, p in open_positions), dtype=np.int64, count=len(open_positions))
+        cost = np.fromiter((p.cost for _, p in open_positions), dtype=np.int64, count=len(open_positions))
+
+        known = item_ids < high_prices.size
+        mark_price = np.zeros(item_ids.size, dtype=np.int64)
+        mark_price[known] = high_prices[item_ids[known]]
+        tax = np.where(mark_price > 100, FlippingCalculator.TAX_RATE, 0.0)
+        value = mark_price * (1 - tax) * quantity
+        # Items without a price are valued at cost rather than at 0
+        value = np.where(mark_price > 0, value, cost)
+
+        return TraderPositions(
+            item_ids=item_ids,
+            names=[items[item_id].name if item_id in items else str(item_id) for item_id, _ in open_positions],
+            quantity=quantity,
+            cost=cost,
+            mark_price=mark_price,
+            value=value,
+            unrealized=value - cost,
+            realized=sum(position.realized for position in book.values())
+        )
@@ -0,0 +1,192 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Deque, Dict, Optional, Set
+
+import httpx
+
+from app.utils.logger import logger
+from app.utils.metrics import (
+    UPSTREAM_COALESCED, UPSTREAM_ERRORS, UPSTREAM_QUEUE_DEPTH, UPSTREAM_QUEUE_WAIT, UPSTREAM_REQUEST_DURATION, UPSTREAM_REQUESTS
+)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+_request_priority: ContextVar[Priority] = ContextVar("upstream_request_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Mark every upstream request made inside this block as background work (pollers, refreshes, backfills)."""
+    token = _request_priority.set(Priority.BACKGROUND)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while, used when the upstream answers 429."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class SchedulerStats:
+    def __init__(self, samples: int = 1000):
+        self.requests = 0
+        self.coalesced = 0
+        self.throttled = 0
+        self.errors = 0
+        self.waits: Deque[float] = deque(maxlen=samples)
+
+    def wait_percentile(self, percentile: float) -> float:
+        if not self.waits:
+            return 0.0
+        ordered = sorted(self.waits)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+class UpstreamScheduler:
+    """
+    Per-host request scheduler in front of a shared httpx.AsyncClient.
+    Requests wait in a priority queue (interactive before background) and are only sent when the
+    host's token bucket allows it. Identical concurrent GETs are coalesced into a single request,
+    and 429 responses pause the bucket and requeue the request instead of failing it.
+    """
+
+    def __init__(self, host: str, client: httpx.AsyncClient, rate_per_minute: float, burst: int, max_retries: int = 3):
+        self.host = host
+        self.client = client
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.max_retries = max_retries
+        self.stats = SchedulerStats()
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        self._sending: Set[asyncio.Task] = set()
+        self._sequence = itertools.count()
+        UPSTREAM_QUEUE_DEPTH.labels(host).set_function(lambda: self.queue_depth)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._queue = self._queue or asyncio.PriorityQueue()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+                  priority: Optional[Priority] = None) -> httpx.Response:
+        key = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+
+        if key in self._in_flight:
+            self.stats.coalesced += 1
+            UPSTREAM_COALESCED.labels(self.host).inc()
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        self._ensure_dispatcher()
+        priority = _request_priority.get() if priority is None else priority
+        await self._queue.put((priority, next(self._sequence), time.monotonic(), url, params, headers, future, 0))
+
+        return await asyncio.shield(future)
+
+    async def _dispatch(self):
+        while True:
+            priority, sequence, enqueued_at, url, params, headers, future, attempt = await self._queue.get()
+            if future.done():
+                continue
+
+            await self.bucket.acquire()
+            wait = time.monotonic() - enqueued_at
+            self.stats.waits.append(wait)
+            UPSTREAM_QUEUE_WAIT.labels(self.host).observe(wait)
+
+            task = asyncio.create_task(self._send(priority, url, params, headers, future, attempt))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, priority: Priority, url: str, params: Optional[dict], headers: Optional[dict],
+                    future: asyncio.Future, attempt: int):
+        self.stats.requests += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(url, params=params, headers=headers)
+        except Exception as e:
+            self.stats.errors += 1
+            UPSTREAM_ERRORS.labels(self.host, type(e).__name__).inc()
+            if not future.done():
+                future.set_exception(e)
+            return
+        finally:
+            UPSTREAM_REQUEST_DURATION.labels(self.host).observe(time.perf_counter() - started)
+
+        UPSTREAM_REQUESTS.labels(self.host, str(response.status_code)).inc()
+        if response.status_code == 429 and attempt < self.max_retries:
+            self.stats.throttled += 1
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else 1 / self.bucket.rate
+            logger.warning(f"Rate limited by {self.host}, pausing {delay:.1f}s")
+            self.bucket.pause(delay)
+            await self._queue.put((priority, next(self._sequence), time.monotonic(), url, params, headers, future, attempt + 1))
+            return
+
+        if not future.done():
+            future.set_result(response)
+
+    def get_stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": len(self._in_flight),
+            "requests": self.stats.requests,
+            "coalesced": self.stats.coalesced,
+            "throttled": self.stats.throttled,
+            "errors": self.stats.errors,
+            "wait_p50_seconds": self.stats.wait_percentile(50),
+            "wait_p99_seconds": self.stats.wait_percentile(99),
+        }
+
+    async def close(self):
+        tasks = list(self._sending) + ([self._dispatcher] if self._dispatcher else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import List, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.utils.logger import logger
+
+###
+# Pre-validated binary snapshots of the static JSON catalogs in app/json_files.
+# Build them with `python -m app.utils.catalog_snapshot` (the Dockerfile does this).
+# A snapshot stores each model as a plain tuple of field values next to the sha256 of its
+# source JSON, so loading skips both JSON parsing and pydantic validation. Snapshots whose
+# checksum or field list no longer match are ignored and the caller falls back to the JSON.
+###
+
+SNAPSHOT_FORMAT = 1
+JSON_FILES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "json_files")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def snapshot_path(source_path: str) -> str:
+    return os.path.splitext(source_path)[0] + ".snapshot"
+
+
+def source_checksum(source_path: str) -> str:
+    with open(source_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def write_snapshot(source_path: str, models: List[BaseModel]):
+    if not models:
+        return
+
+    fields = list(type(models[0]).model_fields)
+    payload = {
+        "format": SNAPSHOT_FORMAT,
+        "checksum": source_checksum(source_path),
+        "fields": fields,
+        "rows": [tuple(getattr(model, field) for field in fields) for model in models]
+    }
+    with open(snapshot_path(source_path), "wb") as file:
+        pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_snapshot(source_path: str, model: Type[ModelT]) -> Optional[List[ModelT]]:
+    """Load the models from the snapshot next to source_path, or None if it is missing or stale."""
+    try:
+        with open(snapshot_path(source_path), "rb") as file:
+            payload = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Unreadable catalog snapshot for {source_path}: {e}")
+        return None
+
+    if (
+        payload.get("format") != SNAPSHOT_FORMAT
+        or payload.get("fields") != list(model.model_fields)
+        or payload.get("checksum") != source_checksum(source_path)
+    ):
+        logger.warning(f"Stale catalog snapshot for {source_path}, falling back to JSON")
+        return None
+
+    return _construct_all(model, payload["fields"], payload["rows"])
+
+
+def _construct_all(model: Type[ModelT], fields: List[str], rows: List[tuple]) -> List[ModelT]:
+    """Rebuild already validated models with model_construct, which skips validation."""
+    construct = model.model_construct
+    return [construct(**dict(zip(fields, row))) for row in rows]
+
+
+def build_snapshots():
+    from app.models.dota import Hero
+    from app.models.runescape import OsrsItem
+
+    items_path = os.path.join(JSON_FILES_DIR, "osrs_item_map.json")
+    with open(items_path, "r") as file:
+        write_snapshot(items_path, [OsrsItem(**item) for item in json.load(file)])
+
+    heroes_path = os.path.join(JSON_FILES_DIR, "heroes.json")
+    with open(heroes_path, "r") as file:
+        write_snapshot(heroes_path, [Hero(**hero) for hero in json.load(file).values()])
+
+    logger.info("Catalog snapshots built")
+
+
+if __name__ == "__main__":
+    build_snapshots()
@@ -1,4 +1,33 @@
 class DiscordBotNotInitializedError(Exception):
     def __init__(self, message: str = "Discord bot is not initialized"):
         self.message = message
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+class LlmOverloadedError(Exception):
+    def __init__(self, message: str = "LLM pipeline is at capacity, try again later"):
+        self.message = message
+        super().__init__(message)
+
+
+class LlmTimeoutError(Exception):
+    def __init__(self, message: str = "LLM request did not finish before its deadline"):
+        self.message = message
+        super().__init__(message)
+
+
+class DatabaseUnavailableError(Exception):
+    def __init__(self, message: str = "No database is configured"):
+        self.message = message
+        super().__init__(message)
+
+
+class InsufficientPositionError(Exception):
+    def __init__(self, message: str = "Not enough of this item held to sell"):
+        self.message = message
+        super().__init__(message)
+
+
+class ProfilerBusyError(Exception):
+    def __init__(self, message: str = "A profile is already running"):
+        self.message = message
+        super().__init__(message)
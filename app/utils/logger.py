@@ -1,6 +1,26 @@
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+###
+# Logging goes through a QueueHandler: the calling code (usually the event loop) only puts the record on a queue,
+# and a QueueListener thread formats it and writes it to the console and the rotating log file.
+# Configured from the environment rather than app.config, which itself logs while it loads:
+#   LOG_LEVEL            root level, default INFO
+#   LOG_FORMAT           text (default) or json, for both console and file
+#   LOG_FILE             default app.log, empty to disable the file
+#   LOG_FILE_MAX_BYTES   rotate the file at this size, default 10MB
+#   LOG_FILE_BACKUPS     rotated files kept, default 5
+#   LOG_DISCORD_EVENTS_PER_SECOND / LOG_DISCORD_EVENTS_BURST   rate limit of the per message and reaction logs
+###
 
 
 class CustomFormatter(logging.Formatter):
@@ -22,12 +42,27 @@ class CustomFormatter(logging.Formatter):
         'CRITICAL': '💥'
     }
 
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._timestamp = ""
+
+    def format_timestamp(self, created: float) -> str:
+        # Records arrive in bursts within the same second, so strftime runs once per second instead of per record
+        second = int(created)
+        if second != self._second:
+            self._second = second
+            self._timestamp = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+        return self._timestamp
+
     def format(self,record):
         if not record.exc_info:
             level = record.levelname
-            msg = record.msg
+            msg = record.getMessage()
+            if record.exc_text:
+                msg = f"{msg}\n{record.exc_text}"
 
-            timestamp = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = self.format_timestamp(record.created)
 
             file_info = f"{record.filename}:{record.lineno}"
 
@@ -40,29 +75,137 @@ class CustomFormatter(logging.Formatter):
 
         return super().format(record)
 
+class FileFormatter(logging.Formatter):
+    """The plain file format, with the timestamp cached per second like CustomFormatter."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        self._second = None
+        self._timestamp = ""
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._timestamp = time.strftime("%Y-%m-%d %H:%M:%S", self.converter(second))
+        return f"{self._timestamp},{int(record.msecs):03d}"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "file": f"{record.filename}:{record.lineno}",
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
 class ErrorFilter(logging.Filter):
     def filter(self, record):
         return record.levelname in {"ERROR","WARN", "DEBUG", "CRITICAL"}
 
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket for a high volume logger: lets `rate` records per second through, with bursts of up to `burst`.
+    Dropped records are counted and reported on the next record that gets through.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._dropped = 0
+        self._lock = threading.Lock()  # Discord events are logged from the loop, but logging may come from any thread
+
+    def filter(self, record):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                self._dropped += 1
+                return False
+            self._tokens -= 1
+            dropped, self._dropped = self._dropped, 0
+
+        if dropped:
+            record.msg = f"{record.msg} (+{dropped} similar records dropped by the rate limit)"
+        return True
+
+class LogQueueHandler(QueueHandler):
+    """
+    Renders the message on the calling thread, so mutable arguments are captured as they were when logged,
+    and leaves the formatting to the handlers on the listener thread.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def get_rate_limited_logger(name: str, rate: float, burst: int) -> logging.Logger:
+    """A child logger whose records are rate limited, for logs written on every Discord message or event."""
+    rate_limited_logger = logging.getLogger(name)
+    if not any(isinstance(log_filter, RateLimitFilter) for log_filter in rate_limited_logger.filters):
+        rate_limited_logger.addFilter(RateLimitFilter(rate, burst))
+    return rate_limited_logger
+
 
 def setup_logger():
 
     ## Setup
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    handlers = []
 
     ## Console Handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(CustomFormatter())
-    logger.addHandler(console_handler)
-
-    ## File Handler
-    file_handler = logging.FileHandler("app.log")
-    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-    file_handler.addFilter(ErrorFilter())
-    logger.addHandler(file_handler)
+    console_handler.setFormatter(JsonFormatter() if json_format else CustomFormatter())
+    handlers.append(console_handler)
+
+    ## File Handler, rotated so it can't fill the disk
+    log_file = os.getenv("LOG_FILE", "app.log")
+    if log_file:
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=int(os.getenv("LOG_FILE_MAX_BYTES", 10 * 1024 * 1024)),
+            backupCount=int(os.getenv("LOG_FILE_BACKUPS", 5)),
+            encoding="utf-8",
+            delay=True
+        )
+        file_handler.setFormatter(JsonFormatter() if json_format else FileFormatter())
+        file_handler.addFilter(ErrorFilter())
+        handlers.append(file_handler)
+
+    ## Queue, the only handler on the root logger
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    logger.addHandler(LogQueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)  # Flushes whatever is still queued on exit
 
     return logger
 
 logger = setup_logger()
-logger.info("Logger Setup Complete!")
\ No newline at end of file
+discord_event_logger = get_rate_limited_logger(
+    "discord_events",
+    rate=float(os.getenv("LOG_DISCORD_EVENTS_PER_SECOND", 5)),
+    burst=int(os.getenv("LOG_DISCORD_EVENTS_BURST", 20))
+)
+logger.info("Logger Setup Complete!")
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.utils.logger import logger
+
+###
+# Prometheus metrics, served by /metrics in main.py.
+# Routes are labelled with their path template (/osrs/items/{item_id}), never the raw path, to keep label cardinality bounded.
+###
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests handled", ["method", "route", "status"])
+HTTP_REQUEST_DURATION = Histogram("http_request_duration_seconds", "Time to handle an HTTP request, streaming bodies included", ["method", "route"])
+
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Requests sent to upstream APIs", ["host", "status"])
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Upstream requests that failed without a response", ["host", "error"])
+UPSTREAM_REQUEST_DURATION = Histogram("upstream_request_duration_seconds", "Upstream response time", ["host"])
+UPSTREAM_QUEUE_WAIT = Histogram("upstream_queue_wait_seconds", "Time a request waited for the host's rate limiter", ["host"])
+UPSTREAM_QUEUE_DEPTH = Gauge("upstream_queue_depth", "Requests waiting for the host's rate limiter", ["host"])
+UPSTREAM_COALESCED = Counter("upstream_coalesced_total", "Requests answered by an identical request already in flight", ["host"])
+
+WRITE_BEHIND_PENDING = Gauge("write_behind_pending_rows", "Rows queued for the database")
+WRITE_BEHIND_DROPPED = Counter(
+    "write_behind_dropped_rows_total", "Rows never written: rejected by the database or pushed out of a full queue", ["table", "reason"]
+)
+
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by tier that answered them", ["namespace", "result"])
+
+DISCORD_COMMANDS = Counter("discord_commands_total", "Discord commands invoked", ["command", "status"])
+DISCORD_COMMAND_DURATION = Histogram("discord_command_duration_seconds", "Time to run a Discord command", ["command"])
+
+EVENT_LOOP_LAG = Gauge("event_loop_lag_seconds", "How late the last event loop lag probe woke up")
+EVENT_LOOP_LAG_HISTOGRAM = Histogram(
+    "event_loop_lag_probe_seconds", "Event loop lag probes",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and status of every HTTP request.
+    Plain ASGI instead of BaseHTTPMiddleware, so streaming responses are not buffered.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope, unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(scope["method"], route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(scope["method"], route, str(status)).inc()
+
+
+def observe_command(command: Optional[str], status: str, started_at: Optional[float]):
+    command = command or "unknown"
+    DISCORD_COMMANDS.labels(command, status).inc()
+    if started_at is not None:
+        DISCORD_COMMAND_DURATION.labels(command).observe(time.perf_counter() - started_at)
+
+
+class EventLoopMonitor:
+    """Background probe that sleeps for a fixed interval and records how much later than asked it woke up."""
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def _run(cls):
+        loop = asyncio.get_running_loop()
+        interval = settings.METRICS_LOOP_LAG_INTERVAL.total_seconds()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - started - interval)
+            EVENT_LOOP_LAG.set(lag)
+            EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
+
+    @classmethod
+    async def start(cls):
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._run())
+            logger.info("Event loop lag monitor started")
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
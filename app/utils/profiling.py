@@ -0,0 +1,222 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter, deque
+from datetime import datetime
+from types import CodeType, FrameType
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from app.config import settings
+from app.utils.exceptions import ProfilerBusyError
+from app.utils.logger import logger
+
+###
+# Live diagnostics for the one event loop that serves both FastAPI and the Discord gateway, exposed under /debug.
+# Nothing here touches the loop while it is off: the profiler and the slow callback monitor are threads that only
+# exist while they run, which is also why asyncio's own debug mode (slow on every callback) is not used.
+###
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _short_path(path: str) -> str:
+    if path.startswith(PROJECT_ROOT):
+        return os.path.relpath(path, PROJECT_ROOT)
+    if "site-packages" in path:
+        return path.rsplit("site-packages" + os.sep, 1)[1]
+    return os.path.basename(path)
+
+
+def _frame_label(code: CodeType, labels: Dict[CodeType, str]) -> str:
+    label = labels.get(code)
+    if label is None:
+        label = labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def collapse_stack(frame: Optional[FrameType], labels: Dict[CodeType, str]) -> str:
+    """Root first and ';'-separated, the collapsed stack format that flamegraph.pl and speedscope read."""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code, labels))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SamplingProfiler:
+    """Samples thread stacks from a background thread, so the profiled code runs unmodified."""
+    _lock = threading.Lock()
+
+    @classmethod
+    def profile(cls, thread_id: Optional[int], duration: float, interval: float) -> Counter:
+        """
+        Blocking, run it off the loop. Samples the stack of `thread_id` (every thread when None, each rooted at its
+        thread name) every `interval` seconds for `duration` seconds and counts the samples per stack.
+        """
+        if not cls._lock.acquire(blocking=False):
+            raise ProfilerBusyError
+        try:
+            own_id = threading.get_ident()
+            labels: Dict[CodeType, str] = {}
+            names: Dict[int, str] = {}
+            stacks = Counter()
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_id or (thread_id is not None and ident != thread_id):
+                        continue
+                    stack = collapse_stack(frame, labels)
+                    if thread_id is None:
+                        if ident not in names:
+                            names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                        stack = f"{names.get(ident, ident)};{stack}"
+                    stacks[stack] += 1
+                time.sleep(interval)
+            return stacks
+        finally:
+            cls._lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class SlowCallbackEvent(NamedTuple):
+    detected_at: datetime
+    blocked_ms: float
+    task: Optional[str]  # The task whose step was running, None for plain callbacks
+    stack: str  # The loop thread's stack while it was blocked
+
+
+class SlowCallbackMonitor:
+    """
+    Watchdog for callbacks that hold the event loop. A task on the loop refreshes a heartbeat every quarter threshold
+    and a thread checks it at the same rate. When the heartbeat is late by more than the threshold, the thread captures
+    the loop thread's stack while the loop is still blocked, which points at the blocking call itself rather than at
+    the callback that made it.
+    """
+    _thread: Optional[threading.Thread] = None
+    _stop: Optional[threading.Event] = None
+    _heartbeat_task: Optional[asyncio.Task] = None
+    _heartbeat: float = 0.0
+    _threshold: float = 0.0
+    events: Deque[SlowCallbackEvent] = deque(maxlen=settings.DEBUG_SLOW_CALLBACK_HISTORY)
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._thread is not None
+
+    @classmethod
+    def get_threshold(cls) -> Optional[float]:
+        return cls._threshold if cls._thread is not None else None
+
+    @classmethod
+    async def _beat(cls, interval: float):
+        while True:
+            cls._heartbeat = time.monotonic()
+            await asyncio.sleep(interval)
+
+    @classmethod
+    def _watch(cls, loop: asyncio.AbstractEventLoop, loop_thread_id: int, threshold: float, stop: threading.Event):
+        interval = threshold / 4
+        stalled_beat, task, stack = None, None, ""
+
+        while not stop.wait(interval):
+            heartbeat = cls._heartbeat
+            if heartbeat == stalled_beat:
+                continue
+            if stalled_beat is not None:
+                # The loop came back, the next heartbeat was due one interval after the stalled one
+                blocked_ms = (heartbeat - stalled_beat - interval) * 1000
+                cls.events.append(SlowCallbackEvent(datetime.now(), round(blocked_ms, 1), task, stack))
+                logger.warning(f"Event loop was blocked for {blocked_ms:.0f}ms" + (f" in {task}" if task else ""))
+                stalled_beat = None
+
+            # The heartbeat is only due `interval` after it was last refreshed
+            if time.monotonic() - heartbeat - interval > threshold:
+                current = asyncio.current_task(loop)
+                task = f"{current.get_name()} ({current.get_coro().__qualname__})" if current is not None else None
+                frame = sys._current_frames().get(loop_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+                stalled_beat = heartbeat
+                logger.warning(
+                    f"Event loop blocked for over {threshold * 1000:.0f}ms" + (f" in {task}" if task else "") + f", at:\n{stack}"
+                )
+
+    @classmethod
+    async def start(cls, threshold: float):
+        await cls.stop()
+        cls._threshold = threshold
+        cls._heartbeat = time.monotonic()
+        cls._heartbeat_task = asyncio.create_task(cls._beat(threshold / 4))
+        cls._stop = threading.Event()
+        cls._thread = threading.Thread(
+            target=cls._watch, args=(asyncio.get_running_loop(), threading.get_ident(), threshold, cls._stop),
+            name="slow-callback-monitor", daemon=True
+        )
+        cls._thread.start()
+        logger.info(f"Slow callback monitor started, threshold {threshold * 1000:.0f}ms")
+
+    @classmethod
+    async def stop(cls):
+        if cls._thread is None:
+            return
+        cls._stop.set()
+        cls._heartbeat_task.cancel()
+        try:
+            await cls._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        cls._thread.join(timeout=1)
+        cls._thread, cls._stop, cls._heartbeat_task = None, None, None
+        logger.info("Slow callback monitor stopped")
+
+
+class TaskTracker:
+    """
+    Lists the tasks on the loop with what they are awaiting. Task ages come from a task factory, installed at startup
+    only when the debug endpoints are enabled, tasks created before it have no age.
+    """
+    _created: "weakref.WeakKeyDictionary[asyncio.Task, float]" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def install(cls, loop: asyncio.AbstractEventLoop):
+        inner = loop.get_task_factory()
+
+        def factory(loop: asyncio.AbstractEventLoop, coro, **kwargs) -> asyncio.Task:
+            task = inner(loop, coro, **kwargs) if inner is not None else asyncio.Task(coro, loop=loop, **kwargs)
+            cls._created[task] = time.monotonic()
+            return task
+
+        loop.set_task_factory(factory)
+
+    @staticmethod
+    def _awaiting(coro) -> Optional[str]:
+        """Innermost suspended frame of a coroutine chain, i.e. the line the task is waiting on."""
+        location = None
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is not None:
+                location = f"{frame.f_code.co_name} ({_short_path(frame.f_code.co_filename)}:{frame.f_lineno})"
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        return location
+
+    @classmethod
+    def snapshot(cls) -> List[dict]:
+        """Every unfinished task, oldest first and those without an age last."""
+        now = time.monotonic()
+        tasks = []
+        for task in asyncio.all_tasks():
+            created = cls._created.get(task)
+            coro = task.get_coro()
+            tasks.append({
+                "name": task.get_name(),
+                "coro": getattr(coro, "__qualname__", repr(coro)),
+                "age_seconds": round(now - created, 3) if created is not None else None,
+                "awaiting": cls._awaiting(coro),
+            })
+        return sorted(tasks, key=lambda task: -(task["age_seconds"] or 0.0))
@@ -0,0 +1,116 @@
+import asyncio
+import gzip
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import brotli
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.config import settings
+
+###
+# Responses for the large OSRS endpoints.
+# Full payloads are serialized with orjson and compressed with brotli and gzip once per data version,
+# then served as-is with an ETag. Filtered or projected requests are small and are encoded per request.
+###
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, None for an uncompressed body."""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+
+    for encoding in ("br", "gzip"):
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class EncodedBody:
+    """One payload serialized once, with its compressed variants built on first use."""
+    __slots__ = ("identity", "etag", "_encoded")
+
+    def __init__(self, identity: bytes, etag: str):
+        self.identity = identity
+        self.etag = etag
+        self._encoded: Dict[str, bytes] = {}
+
+    def is_encoded(self, encoding: Optional[str]) -> bool:
+        return encoding is None or encoding in self._encoded
+
+    def get(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.identity
+        body = self._encoded.get(encoding)
+        if body is None:
+            if encoding == "br":
+                body = brotli.compress(self.identity, quality=settings.RESPONSE_BROTLI_QUALITY)
+            else:
+                body = gzip.compress(self.identity, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+            self._encoded[encoding] = body
+        return body
+
+
+class EncodedResponseCache:
+    """The latest EncodedBody per endpoint, replaced when the endpoint's data version changes."""
+
+    def __init__(self):
+        self._bodies: Dict[str, Tuple[Hashable, EncodedBody]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def _get_body(self, key: str, version: Hashable, build: Callable[[], Any]) -> EncodedBody:
+        cached = self._bodies.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            cached = self._bodies.get(key)
+            if cached is None or cached[0] != version:
+                identity = await asyncio.to_thread(orjson.dumps, build())
+                cached = (version, EncodedBody(identity, f'W/"{key}-{version}"'))
+                self._bodies[key] = cached
+        return cached[1]
+
+    async def respond(self, request: Request, key: str, version: Hashable, build: Callable[[], Any]) -> Response:
+        """Serve the full payload for `version`, building and compressing it only once per version and encoding."""
+        body = await self._get_body(key, version, build)
+        headers = {"ETag": body.etag, "Vary": "Accept-Encoding"}
+
+        if request.headers.get("if-none-match") == body.etag:
+            return Response(status_code=304, headers=headers)
+
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        if not body.is_encoded(encoding):
+            # Compressing a full payload takes a few milliseconds, keep it off the event loop
+            await asyncio.to_thread(body.get, encoding)
+
+        return Response(content=body.get(encoding), media_type="application/json", headers=headers)
+
+
+def json_response(payload: Any) -> Response:
+    """An uncached orjson response, for filtered payloads."""
+    return Response(content=orjson.dumps(payload), media_type="application/json")
+
+
+def parse_ids(ids: Optional[str]) -> Optional[set]:
+    """Parse an `ids=` query parameter such as "2,4,6" into a set of item id strings."""
+    if not ids:
+        return None
+    return {part.strip() for part in ids.split(",") if part.strip().isdigit()}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    if not fields:
+        return None
+    return tuple(part.strip() for part in fields.split(",") if part.strip())
@@ -0,0 +1,14 @@
+import time
+from contextlib import contextmanager
+
+from app.utils.logger import logger
+
+
+@contextmanager
+def log_duration(phase: str):
+    """Log how long the wrapped block took, used to time the startup phases."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(f"{phase} took {(time.perf_counter() - start) * 1000:.1f}ms")
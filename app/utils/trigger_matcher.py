@@ -0,0 +1,78 @@
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class TriggerMatcher:
+    """
+    Aho-Corasick automaton over every trigger of a list of predefined responses, so a message is matched in one pass
+    whatever the number of triggers. Matching is case-insensitive. Entries look like
+    {"triggers": [...], "response": "...", "whole_word": false}, where whole_word only matches triggers between
+    word boundaries ("sup" then no longer matches "support"). When several entries match, the first one wins.
+    """
+
+    def __init__(self, entries: List[dict]):
+        self.responses: List[str] = [entry["response"] for entry in entries]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[Tuple[Tuple[int, int, bool], ...]] = [()]  # Per state: (trigger length, entry index, whole word)
+        self._fail: List[int] = [0]
+
+        for index, entry in enumerate(entries):
+            whole_word = bool(entry.get("whole_word", False))
+            for trigger in entry["triggers"]:
+                if trigger:
+                    self._add(trigger.lower(), index, whole_word)
+        self._link()
+
+    def _add(self, trigger: str, index: int, whole_word: bool):
+        state = 0
+        for char in trigger:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = self._goto[state][char] = len(self._goto)
+                self._goto.append({})
+                self._outputs.append(())
+                self._fail.append(0)
+            state = next_state
+        self._outputs[state] += ((len(trigger), index, whole_word),)
+
+    def _link(self):
+        """Breadth first failure links, each state also reporting the triggers that end at its failure state."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._outputs[child] += self._outputs[self._fail[child]]
+                queue.append(child)
+
+    def match(self, text: str) -> Optional[str]:
+        """The response of the first entry with a trigger in `text`, or None."""
+        text = text.lower()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        best = len(self.responses)
+        state = 0
+
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for length, index, whole_word in outputs[state]:
+                if index >= best:
+                    continue
+                if whole_word:
+                    start = end - length
+                    if (start > 0 and _is_word_char(text[start - 1])) or (end < len(text) and _is_word_char(text[end])):
+                        continue
+                best = index
+                if best == 0:
+                    return self.responses[0]
+
+        return self.responses[best] if best < len(self.responses) else None
@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import json
+from datetime import datetime
+
+from app.calculators.flipping_calculator import FlippingCalculator
+from app.constants import Constants, constants
+from app.dependencies import get_osrs_service
+from app.models.runescape import ItemVolumeResponse
+from app.services.osrs_price_poller import OsrsPricePoller, PriceSnapshot
+from app.services.osrs_service import OsrsService
+from app.services.osrs_volume_cache import OsrsVolumeCache
+from benchmarks.fixtures import load_fixture, load_fixture_bytes
+from benchmarks.runner import benchmark
+
+
+async def _install_fixtures():
+    """
+    Serve the fixture payloads from the price poller and volume cache, as they would be after their first refresh.
+    Awaited by async setups, which already run inside the runner's loop, and asyncio.run() by sync ones.
+    """
+    OsrsPricePoller._snapshot = PriceSnapshot(version=1, fetched_at=datetime.now(), data=load_fixture("latest")["data"])
+    if OsrsVolumeCache.get_snapshot() is None:
+        await _refresh_volumes()
+
+
+async def _fixture_volumes(self, etag=None):
+    return load_fixture("volumes"), None
+
+
+async def _refresh_volumes():
+    # Build the snapshot through the cache's own refresh, with the upstream fetch answered from the fixture
+    fetch_volumes, OsrsService.fetch_volumes = OsrsService.fetch_volumes, _fixture_volumes
+    try:
+        await OsrsVolumeCache.refresh()
+    finally:
+        OsrsService.fetch_volumes = fetch_volumes
+
+
+## OSRS flipping
+
+@benchmark("osrs.calculate", samples=200, inner=100)
+def calculate():
+    latest = load_fixture("latest")
+    calculator = FlippingCalculator()
+    items = [
+        item for item_id, item in constants.OSRSITEMLIST.items()
+        if latest["data"].get(str(item_id), {}).get("high") and latest["data"][str(item_id)].get("low")
+    ]
+    cycle = itertools.cycle(items)
+    return lambda: calculator.calculate(next(cycle), latest)
+
+
+@benchmark("osrs.calculate_batch", samples=200)
+def calculate_batch():
+    asyncio.run(_install_fixtures())
+    volumes = OsrsVolumeCache.get_snapshot().volumes
+    market = asyncio.run(get_osrs_service().get_market(volumes))
+    calculator = FlippingCalculator()
+    calculator.set_item_volumes(volumes)
+    return lambda: calculator.calculate_batch(market.high, market.low, market.limit, market.volume)
+
+
+@benchmark("osrs.get_market", samples=100, is_async=True)
+async def get_market():
+    await _install_fixtures()
+    osrs_service = get_osrs_service()
+    volumes = OsrsVolumeCache.get_snapshot().volumes
+    return lambda: osrs_service.get_market(volumes)
+
+
+## OSRS volumes
+
+@benchmark("osrs.volumes.parse", samples=100)
+def parse_volumes():
+    payload = load_fixture("volumes")
+    return lambda: ItemVolumeResponse(**dict(payload))
+
+
+@benchmark("osrs.volumes.get_scaled_volumes", samples=200)
+def get_scaled_volumes():
+    volumes = ItemVolumeResponse(**load_fixture("volumes"))
+
+    def operation():
+        volumes._scaled_volumes = None  # Time the computation, not the cached view
+        volumes.get_scaled_volumes()
+    return operation
+
+
+@benchmark("osrs.volumes.precompute", samples=100)
+def precompute_volumes():
+    volumes = ItemVolumeResponse(**load_fixture("volumes"))
+
+    def operation():
+        volumes._scaled_volumes = volumes._log_scaled_volumes = volumes._percentile_ranks = volumes._percentiles = None
+        volumes.precompute()
+    return operation
+
+
+@benchmark("osrs.service.get_volumes_scaled", samples=200, inner=100, is_async=True)
+async def get_volumes_scaled():
+    await _install_fixtures()
+    return get_osrs_service().get_volumes_scaled
+
+
+## OSRS item lookups
+
+@benchmark("osrs.item_by_name.exact", samples=200, inner=100)
+def item_by_name_exact():
+    osrs_service = get_osrs_service()
+    names = itertools.cycle([item.name for item in list(constants.OSRSITEMLIST.values())[:500]])
+    return lambda: osrs_service.get_osrs_item_by_name(next(names))
+
+
+@benchmark("osrs.item_by_name.alias", samples=200, inner=100)
+def item_by_name_alias():
+    osrs_service = get_osrs_service()
+    aliases = itertools.cycle(constants.OSRS_ITEM_ALIASES)
+    return lambda: osrs_service.get_osrs_item_by_name(next(aliases))
+
+
+@benchmark("osrs.item_by_name.fuzzy", samples=100, inner=10)
+def item_by_name_fuzzy():
+    osrs_service = get_osrs_service()
+    typos = itertools.cycle(["abysal whip", "dragon warhamer", "twisted bwo", "saradomin brw", "rune platbody"])
+    return lambda: osrs_service.get_osrs_item_by_name(next(typos))
+
+
+@benchmark("constants.load_osrs_item_map", samples=20)
+def load_osrs_item_map():
+    return lambda: Constants().load_osrs_item_map()
+
+
+## Upstream payload handling
+
+@benchmark("osrs.latest.decode", samples=50)
+def decode_latest():
+    body = load_fixture_bytes("latest")
+    return lambda: json.loads(body)
+
+
+@benchmark("dota.player.summary", samples=200, inner=100)
+def dota_player_summary():
+    body = load_fixture_bytes("dota_player")
+
+    def operation():
+        response = json.loads(body)
+        return f"{response['profile']['personaname']} is {constants.get_dota_rank_by_tier(response['rank_tier'])}"
+    return operation
+
+
+@benchmark("dota.match.summary", samples=200, inner=10)
+def dota_match_summary():
+    body = load_fixture_bytes("dota_match")
+    constants.load_dota_heroes_map()
+
+    def operation():
+        # Same work as the $match command: decode, then resolve each player's hero and rank
+        response = json.loads(body)
+        return [
+            (player.get("personaname", "Anonymous"), constants.DOTAHEROESLIST.get(player["hero_id"]).localized_name,
+             constants.get_dota_rank_by_tier(player.get("rank_tier")))
+            for player in response["players"]
+        ]
+    return operation
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import time
+from typing import Any, Dict
+
+from app.config import settings
+from app.utils.catalog_snapshot import JSON_FILES_DIR
+
+###
+# Upstream payloads the benchmarks run against, stored gzipped in benchmarks/fixtures.
+# `python -m benchmarks.fixtures capture` records them from the live APIs.
+# `python -m benchmarks.fixtures synthesize` builds payloads of the same shape and size from the
+# item and hero catalogs instead, deterministically, for machines without network access.
+###
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURE_NAMES = ("latest", "volumes", "dota_player", "dota_match", "dota_pros", "ssb_tables", "ssb_table")
+SAMPLE_DOTA_PLAYER_ID = 62590060
+SAMPLE_DOTA_MATCH_ID = 8000000000
+SAMPLE_SSB_TABLE_ID = 13760
+SYNTHETIC_TIMESTAMP = 1730000000  # Fixed, so synthesized fixtures are reproducible
+
+
+def fixture_path(name: str) -> str:
+    return os.path.join(FIXTURES_DIR, f"{name}.json.gz")
+
+
+def load_fixture(name: str) -> Any:
+    with gzip.open(fixture_path(name), "rb") as file:
+        return json.loads(file.read())
+
+
+def load_fixture_bytes(name: str) -> bytes:
+    """The raw JSON body, for benchmarks that include decoding."""
+    with gzip.open(fixture_path(name), "rb") as file:
+        return file.read()
+
+
+def write_fixture(name: str, payload: Any):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    # mtime=0 keeps regenerated fixtures byte for byte identical
+    with gzip.GzipFile(fixture_path(name), "wb", mtime=0) as file:
+        file.write(json.dumps(payload, separators=(",", ":")).encode())
+
+
+async def capture():
+    import httpx
+
+    async with httpx.AsyncClient(headers={"User-Agent": settings.HTTP_USER_AGENT}, timeout=30) as client:
+        requests = {
+            "latest": f"{settings.OSRS_BASE_URL}/latest",
+            "volumes": settings.OSRS_VOLUMES_URL,
+            "dota_player": f"{settings.OPENDOTA_BASE_URL}/players/{SAMPLE_DOTA_PLAYER_ID}",
+            "dota_match": f"{settings.OPENDOTA_BASE_URL}/matches/{SAMPLE_DOTA_MATCH_ID}",
+            "dota_pros": f"{settings.OPENDOTA_BASE_URL}/proPlayers",
+            "ssb_tables": f"{settings.SSB_BASE_URL}/table",
+            "ssb_table": f"{settings.SSB_BASE_URL}/table/{SAMPLE_SSB_TABLE_ID}",
+        }
+        for name, url in requests.items():
+            response = await client.get(url)
+            response.raise_for_status()
+            write_fixture(name, response.json())
+            print(f"Captured {name} from {url}")
+
+
+def synthesize(seed: int = 2024):
+    rng = random.Random(seed)
+    with open(os.path.join(JSON_FILES_DIR, "osrs_item_map.json"), "r") as file:
+        items = json.load(file)
+    with open(os.path.join(JSON_FILES_DIR, "heroes.json"), "r") as file:
+        hero_ids = [hero["id"] for hero in json.load(file).values()]
+
+    now = SYNTHETIC_TIMESTAMP
+    latest: Dict[str, dict] = {}
+    volumes: Dict[str, Any] = {"%LAST_UPDATE%": now, "%LAST_UPDATE_F%": time.strftime("%B %d %Y %H:%M:%S (UTC)", time.gmtime(now))}
+    for item in items:
+        # Roughly how /latest looks: prices around the item's value, a few items missing one side
+        low = max(1, int((item.get("value") or 1) * rng.lognormvariate(0, 0.5)))
+        high = max(1, int(low * (1 + rng.uniform(-0.01, 0.06))))
+        has_high, has_low = rng.random() > 0.03, rng.random() > 0.03
+        latest[str(item["id"])] = {
+            "high": high if has_high else None,
+            "highTime": now - rng.randint(0, 86400) if has_high else None,
+            "low": low if has_low else None,
+            "lowTime": now - rng.randint(0, 86400) if has_low else None,
+        }
+        if rng.random() > 0.05:
+            volumes[item["name"]] = int(rng.lognormvariate(7, 2.5))
+
+    write_fixture("latest", {"data": latest})
+    write_fixture("volumes", volumes)
+    write_fixture("dota_player", {
+        "profile": {
+            "account_id": SAMPLE_DOTA_PLAYER_ID, "personaname": "Thaffy", "name": None, "plus": True, "cheese": 0,
+            "steamid": str(76561197960265728 + SAMPLE_DOTA_PLAYER_ID), "avatar": "", "avatarmedium": "", "avatarfull": "",
+            "profileurl": "", "last_login": None, "loccountrycode": "NO", "is_contributor": False, "is_subscriber": False
+        },
+        "rank_tier": 54,
+        "leaderboard_rank": None,
+    })
+    write_fixture("dota_match", {
+        "match_id": SAMPLE_DOTA_MATCH_ID,
+        "duration": 2400,
+        "radiant_win": True,
+        "players": [
+            {
+                "account_id": rng.randint(1, 2 ** 31), "player_slot": slot if slot < 5 else 123 + slot,
+                "hero_id": hero_id, "personaname": f"player{slot}", "rank_tier": rng.randint(11, 80),
+                "win": 1 if slot < 5 else 0, "kills": rng.randint(0, 20), "deaths": rng.randint(0, 15),
+                "assists": rng.randint(0, 30), "gold_per_min": rng.randint(250, 800), "xp_per_min": rng.randint(300, 900),
+                "net_worth": rng.randint(5000, 40000), "item_0": rng.randint(0, 1000), "item_1": rng.randint(0, 1000),
+                "gold_t": [rng.randint(0, 40000) for _ in range(40)], "xp_t": [rng.randint(0, 40000) for _ in range(40)],
+            }
+            for slot, hero_id in enumerate(rng.sample(hero_ids, 10))
+        ],
+    })
+    write_fixture("dota_pros", [
+        {
+            "account_id": 100000 + index, "steamid": str(76561197960365728 + index), "avatar": "", "avatarmedium": "",
+            "avatarfull": "", "profileurl": "", "personaname": f"pro{index}", "last_login": None,
+            "full_history_time": "2024-10-01T00:00:00.000Z", "cheese": 0, "fh_unavailable": False, "loccountrycode": None,
+            "name": f"Pro {index}", "country_code": "", "fantasy_role": rng.randint(0, 2), "team_id": rng.randint(1, 9000000),
+            "team_name": f"Team {index % 300}", "team_tag": f"T{index % 300}", "is_locked": False, "is_pro": True,
+            "locked_until": None
+        }
+        for index in range(2000)
+    ])
+    write_fixture("ssb_tables", [
+        {"id": str(10000 + index), "text": f"Table {10000 + index}", "path": "/al/al03", "updated": "2024-10-01T06:00:00Z"}
+        for index in range(400)
+    ])
+    write_fixture("ssb_table", {
+        "title": "Arbeidsledige, etter kjønn, alder, statistikkvariabel og måned",
+        "variables": [
+            {"code": "Kjonn", "text": "kjønn", "values": ["0", "1", "2"], "valueTexts": ["Begge kjønn", "Menn", "Kvinner"]},
+            {"code": "Alder", "text": "alder", "values": ["15-74", "15-24", "25-74"], "valueTexts": ["15-74 år", "15-24 år", "25-74 år"]},
+            {"code": "Tid", "text": "måned", "values": [f"{year}M{month:02}" for year in range(2006, 2025) for month in range(1, 13)],
+             "valueTexts": [f"{year}M{month:02}" for year in range(2006, 2025) for month in range(1, 13)], "time": True},
+        ],
+    })
+    print(f"Synthesized {len(FIXTURE_NAMES)} fixtures in {FIXTURES_DIR}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or synthesize the benchmark fixtures")
+    parser.add_argument("mode", choices=("capture", "synthesize"))
+    args = parser.parse_args()
+
+    if args.mode == "capture":
+        asyncio.run(capture())
+    else:
+        synthesize()
@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+import numpy as np
+
+###
+# Open-loop load generator for the FastAPI app, usually pointed at the upstream simulator
+# (benchmarks/upstream_simulator.py) so no real upstream is hit.
+#
+#   python -m benchmarks.load_test --rps 200 --duration 30 --simulator http://127.0.0.1:9100
+#
+# Requests are started on a fixed schedule whatever the response times, and latency is measured from the
+# scheduled start, so a slow app shows up as latency instead of silently lowering the offered load.
+# With --sequential every route runs on its own, which makes the upstream call counts attributable per route.
+###
+
+DEFAULT_ROUTES = (
+    "/osrs/items@4",
+    "/osrs/items?ids=2,4,6@2",
+    "/osrs/items/volumes@1",
+    "/osrs/items/search?q=whip@2",
+    "/osrs/flips?limit=20@2",
+    "/dota/player/62590060@2",
+    "/dota/pros@1",
+    "/ssb/tables@1",
+)
+
+
+class RouteStats(NamedTuple):
+    requests: int
+    errors: int
+    throughput: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def parse_route(spec: str) -> Tuple[str, float]:
+    """`/path?query@weight`, the weight defaulting to 1."""
+    path, _, weight = spec.partition("@")
+    return path, float(weight) if weight else 1.0
+
+
+async def fetch_upstream_calls(client: httpx.AsyncClient, simulator: Optional[str]) -> Optional[Dict[str, int]]:
+    """Simulator request counts per upstream endpoint, summed over status codes. None without a simulator."""
+    if not simulator:
+        return None
+    response = await client.get(f"{simulator.rstrip('/')}/_simulator/stats")
+    response.raise_for_status()
+    return {
+        f"{upstream}/{endpoint}": sum(statuses.values())
+        for upstream, endpoints in response.json()["calls"].items()
+        for endpoint, statuses in endpoints.items()
+    }
+
+
+async def generate(client: httpx.AsyncClient, url: str, routes: List[Tuple[str, float]], rps: float, duration: float,
+                   max_in_flight: int, seed: int) -> Tuple[Dict[str, List[float]], Dict[str, int], int, float]:
+    """Offer `rps` requests per second for `duration` seconds. Returns latencies and errors per route, requests dropped, elapsed."""
+    rng = random.Random(seed)
+    paths, weights = [path for path, _ in routes], [weight for _, weight in routes]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    in_flight = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+    dropped = 0
+
+    async def send(path: str, scheduled: float):
+        try:
+            response = await client.get(url + path)
+            if response.status_code >= 400:
+                errors[path] += 1
+        except httpx.HTTPError:
+            errors[path] += 1
+        finally:
+            latencies[path].append((time.perf_counter() - scheduled) * 1000)
+            in_flight.release()
+
+    start = time.perf_counter()
+    total = int(rps * duration)
+    for index in range(total):
+        scheduled = start + index / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        path = rng.choices(paths, weights)[0]
+        if in_flight.locked():
+            # The app can't keep up and every connection is busy, count it instead of queueing without bound
+            dropped += 1
+            errors[path] += 1
+            continue
+        await in_flight.acquire()
+        task = asyncio.create_task(send(path, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    await asyncio.gather(*tasks)
+    return latencies, errors, dropped, time.perf_counter() - start
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, RouteStats]:
+    summary = {}
+    for path in sorted(set(latencies) | set(errors)):
+        values = np.array(latencies.get(path) or [0.0])
+        summary[path] = RouteStats(
+            requests=len(latencies.get(path, [])),
+            errors=errors.get(path, 0),
+            throughput=len(latencies.get(path, [])) / elapsed,
+            p50_ms=float(np.percentile(values, 50)),
+            p90_ms=float(np.percentile(values, 90)),
+            p99_ms=float(np.percentile(values, 99)),
+            max_ms=float(values.max())
+        )
+    return summary
+
+
+def print_report(title: str, summary: Dict[str, RouteStats], upstream_calls: Optional[Dict[str, int]], dropped: int):
+    print(f"\n{title}")
+    print(f"{'route':<36} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for path, stats in summary.items():
+        print(
+            f"{path[:36]:<36} {stats.requests:>9,} {stats.errors:>7,} {stats.throughput:>8.1f} "
+            f"{stats.p50_ms:>7.1f}ms {stats.p90_ms:>7.1f}ms {stats.p99_ms:>7.1f}ms {stats.max_ms:>7.1f}ms"
+        )
+    if dropped:
+        print(f"{dropped:,} requests not sent because every connection was busy (counted as errors)")
+    if upstream_calls is not None:
+        calls = [f"{name}={count:,}" for name, count in sorted(upstream_calls.items()) if count]
+        print("Upstream calls: " + (", ".join(calls) or "none"))
+
+
+async def run(args: argparse.Namespace):
+    routes = [parse_route(spec) for spec in (args.routes or DEFAULT_ROUTES)]
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        phases = [(path, [(path, 1.0)]) for path, _ in routes] if args.sequential else [("mixed", routes)]
+        for name, phase_routes in phases:
+            if args.warmup:
+                await generate(client, args.url, phase_routes, args.rps, args.warmup, args.max_in_flight, args.seed)
+
+            before = await fetch_upstream_calls(client, args.simulator)
+            latencies, errors, dropped, elapsed = await generate(
+                client, args.url, phase_routes, args.rps, args.duration, args.max_in_flight, args.seed
+            )
+            after = await fetch_upstream_calls(client, args.simulator)
+
+            upstream_calls = None if after is None else {key: count - before.get(key, 0) for key, count in after.items()}
+            print_report(f"{name}: {args.rps:g} req/s offered for {args.duration:g}s", summarize(latencies, errors, elapsed),
+                         upstream_calls, dropped)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive the app at a fixed request rate and report latency per route")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the running app")
+    parser.add_argument("--rps", type=float, default=50, help="Requests per second offered")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per phase")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of unmeasured load before each phase")
+    parser.add_argument("--route", dest="routes", action="append", metavar="PATH[@WEIGHT]",
+                        help="Route to request, repeatable. Defaults to a mix over /osrs, /dota and /ssb")
+    parser.add_argument("--sequential", action="store_true", help="Load one route at a time instead of the mix")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="Concurrent requests before requests are dropped")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--simulator", help="Any upstream simulator URL, e.g. http://127.0.0.1:9100, to report upstream calls")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
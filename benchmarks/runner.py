@@ -0,0 +1,245 @@
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+###
+# Micro benchmark runner for the hot paths in benchmarks/cases.py.
+# Each case is timed over many samples, reported as throughput and p50/p99 latency and compared
+# against benchmarks/baselines.json. A case whose p50 regressed by more than --threshold fails the run.
+# Shared machines are noisy, so every case runs --rounds times and keeps its fastest round,
+# is compared relative to a fixed calibration workload timed right before it (which absorbs the machine
+# being slower as a whole), and is measured again before a regression fails the run.
+# Sub-microsecond cases swing by more than the threshold on timer resolution alone, so a regression also has
+# to cost at least --min-delta-us in absolute terms.
+# The stored baselines are recorded on Python 3.9, the interpreter of the Pipfile and the Dockerfile.
+# Comparing on another interpreter (or machine) prints a note, the results are then only indicative.
+###
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_ROUNDS = 3
+DEFAULT_MIN_DELTA_US = 1.0
+
+Operation = Callable[[], Union[None, Awaitable[None]]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[], Union[Operation, Awaitable[Operation]]]  # Builds the state once and returns the operation to time, async cases may await in it
+    samples: int
+    inner: int  # Calls per sample, for operations too fast to time one by one
+    is_async: bool
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    samples: int
+    p50_us: float
+    p99_us: float
+    ops_per_sec: float
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, samples: int = 200, inner: int = 1, is_async: bool = False):
+    """
+    Register a case. The decorated function does the setup and returns the operation to time.
+    Setups of async cases may be coroutines, they run in the same loop as the operation.
+    """
+    def register(setup: Callable[[], Union[Operation, Awaitable[Operation]]]):
+        BENCHMARKS[name] = Benchmark(name, setup, samples, inner, is_async)
+        return setup
+    return register
+
+
+def _summarize(case: Benchmark, timings_ns: np.ndarray) -> BenchmarkResult:
+    per_call_us = timings_ns / case.inner / 1000
+    return BenchmarkResult(
+        name=case.name,
+        samples=case.samples,
+        p50_us=float(np.percentile(per_call_us, 50)),
+        p99_us=float(np.percentile(per_call_us, 99)),
+        ops_per_sec=float(1e6 / per_call_us.mean())
+    )
+
+
+def run_sync(case: Benchmark) -> BenchmarkResult:
+    operation = case.setup()
+    for _ in range(max(3, case.samples // 10)):
+        operation()
+
+    timings = np.empty(case.samples, dtype=np.int64)
+    inner = range(case.inner)
+    for sample in range(case.samples):
+        start = time.perf_counter_ns()
+        for _ in inner:
+            operation()
+        timings[sample] = time.perf_counter_ns() - start
+    return _summarize(case, timings)
+
+
+async def run_async(case: Benchmark) -> BenchmarkResult:
+    # Timed inside one running loop, so loop startup is not part of the measurement
+    operation = case.setup()
+    if inspect.isawaitable(operation):
+        operation = await operation
+    for _ in range(max(3, case.samples // 10)):
+        await operation()
+
+    timings = np.empty(case.samples, dtype=np.int64)
+    inner = range(case.inner)
+    for sample in range(case.samples):
+        start = time.perf_counter_ns()
+        for _ in inner:
+            await operation()
+        timings[sample] = time.perf_counter_ns() - start
+    return _summarize(case, timings)
+
+
+def run(case: Benchmark, rounds: int = 1) -> BenchmarkResult:
+    """The fastest of `rounds` runs, by p50."""
+    results = []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()  # Collections landing in random samples are what makes p99 noisy
+        try:
+            results.append(asyncio.run(run_async(case)) if case.is_async else run_sync(case))
+        finally:
+            gc.enable()
+    return min(results, key=lambda result: result.p50_us)
+
+
+def _calibration_workload():
+    # A little of what the cases do: dict and string work in the interpreter, plus a numpy pass
+    data = {str(i): i for i in range(2000)}
+    sum(value for key, value in data.items() if key.endswith("7"))
+    np.sort(np.arange(20000)[::-1])
+
+
+def calibrate() -> float:
+    """Median time of the calibration workload in microseconds, a measure of how fast the machine is right now."""
+    timings = []
+    for _ in range(30):
+        start = time.perf_counter_ns()
+        _calibration_workload()
+        timings.append(time.perf_counter_ns() - start)
+    return float(np.median(timings)) / 1000
+
+
+def machine() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor() or platform.machine()}
+
+
+def load_baselines() -> dict:
+    try:
+        with open(BASELINES_PATH, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"machine": None, "results": {}}
+
+
+def save_baselines(results: List[Tuple[BenchmarkResult, float]], baselines: dict):
+    baselines["machine"] = machine()
+    for result, calibration_us in results:
+        baselines["results"][result.name] = {
+            "p50_us": round(result.p50_us, 3), "p99_us": round(result.p99_us, 3), "ops_per_sec": round(result.ops_per_sec, 1),
+            "calibration_us": round(calibration_us, 3)
+        }
+    with open(BASELINES_PATH, "w") as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def change(result: BenchmarkResult, calibration_us: float, baseline: dict) -> float:
+    """Relative p50 change against the baseline, after scaling both to the speed of the machine when they ran."""
+    return (result.p50_us / calibration_us) / (baseline["p50_us"] / baseline["calibration_us"]) - 1
+
+
+def compare(result: BenchmarkResult, calibration_us: float, baseline: Optional[dict], threshold: float,
+            min_delta_us: float = DEFAULT_MIN_DELTA_US) -> str:
+    """
+    'ok', 'new', 'faster' or 'REGRESSED', judged on p50 since p99 is too noisy to gate on.
+    A regression must exceed both the relative threshold and `min_delta_us` over the baseline scaled to this machine.
+    """
+    if baseline is None:
+        return "new"
+    change_ = change(result, calibration_us, baseline)
+    expected_us = baseline["p50_us"] * calibration_us / baseline["calibration_us"]
+    if change_ > threshold and result.p50_us - expected_us > min_delta_us:
+        return "REGRESSED"
+    return "faster" if change_ < -threshold else "ok"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import benchmarks.cases  # noqa: F401, registers the cases
+    from app.utils.logger import logger
+
+    parser = argparse.ArgumentParser(description="Run the benchmarks and compare them against the stored baselines")
+    parser.add_argument("-k", "--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed p50 slowdown, 0.25 = 25%%")
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US,
+                        help="Smallest absolute p50 slowdown in microseconds that counts as a regression")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Runs per benchmark, the fastest one counts")
+    parser.add_argument("--update-baselines", action="store_true", help="Store these results as the new baselines")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    logger.setLevel(logging.WARNING)
+    baselines = load_baselines()
+    if baselines["machine"] is not None and baselines["machine"] != machine():
+        print(f"Note: baselines were recorded on {baselines['machine']}, comparisons across machines are only indicative")
+
+    results, regressions = [], []
+    print(f"{'benchmark':<36} {'p50':>12} {'p99':>12} {'ops/s':>14}  vs baseline")
+    for case in BENCHMARKS.values():
+        if args.filter not in case.name:
+            continue
+        calibration_us = calibrate()
+        result = run(case, args.rounds)
+        baseline = baselines["results"].get(case.name)
+        status = compare(result, calibration_us, baseline, args.threshold, args.min_delta_us)
+        if status == "REGRESSED":
+            # Confirm before failing, a burst of load from elsewhere on the machine looks exactly like a regression
+            retry_calibration_us = calibrate()
+            retry = run(case, args.rounds)
+            if change(retry, retry_calibration_us, baseline) < change(result, calibration_us, baseline):
+                result, calibration_us = retry, retry_calibration_us
+            status = compare(result, calibration_us, baseline, args.threshold, args.min_delta_us)
+        delta = f" ({change(result, calibration_us, baseline):+.0%})" if baseline else ""
+        print(f"{case.name:<36} {result.p50_us:>10.1f}us {result.p99_us:>10.1f}us {result.ops_per_sec:>14,.0f}  {status}{delta}")
+
+        results.append((result, calibration_us))
+        if status == "REGRESSED":
+            regressions.append(case.name)
+
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump({
+                "machine": machine(),
+                "results": [{**result._asdict(), "calibration_us": calibration_us} for result, calibration_us in results]
+            }, file, indent=2)
+
+    if args.update_baselines:
+        save_baselines(results, baselines)
+        print(f"Baselines updated in {BASELINES_PATH}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from benchmarks.fixtures import load_fixture
+
+###
+# Local stand-in for OpenDota, the prices wiki, the OSRS wiki (GE volumes) and SSB, serving the benchmark fixtures.
+# Each upstream listens on its own port, so the app keeps one connection pool and rate limiter per upstream
+# exactly as in production. Latency, jitter, 5xx errors and 429s are configurable per upstream.
+#
+#   python -m benchmarks.upstream_simulator --latency 80 --jitter 30 --error-rate 0.01 --throttle-rate 0.02
+#
+# prints the settings to start the app with. Request counts are served at /_simulator/stats on every port.
+###
+
+
+class UpstreamProfile(NamedTuple):
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0  # Standard deviation of the latency
+    error_rate: float = 0.0  # Share of requests answered with a 5xx
+    throttle_rate: float = 0.0  # Share of requests answered with a 429
+    rate_limit: Optional[int] = None  # Requests per minute before every further request gets a 429, like the real API
+
+
+class Upstream(NamedTuple):
+    name: str
+    port_offset: int
+    base_path: str  # What the app's base URL setting points at
+    setting: str
+    production_host: str  # Key of the production rate limit in settings.UPSTREAM_RATE_LIMITS
+
+
+UPSTREAMS = (
+    Upstream("opendota", 0, "/api", "OPENDOTA_BASE_URL", "api.opendota.com"),
+    Upstream("prices", 1, "/api/v1/osrs", "OSRS_BASE_URL", "prices.runescape.wiki"),
+    Upstream("wiki", 2, "/", "OSRS_VOLUMES_URL", "oldschool.runescape.wiki"),
+    Upstream("ssb", 3, "/api/v0/no", "SSB_BASE_URL", "data.ssb.no"),
+)
+
+
+class Simulator:
+    """Shared state of all upstream servers: fixtures, profiles and request counts."""
+
+    def __init__(self, profiles: Dict[str, UpstreamProfile], seed: int = 0):
+        self.profiles = profiles
+        self.random = random.Random(seed)
+        self.calls: Counter = Counter()  # (upstream, endpoint, status) -> count
+        self.windows: Dict[str, Tuple[float, int]] = {}  # upstream -> (window start, requests in window)
+        self.bodies: Dict[str, bytes] = {}
+
+        latest = load_fixture("latest")
+        self.latest = latest["data"]
+        self.bodies["latest"] = orjson.dumps(latest)
+        self.bodies["volumes"] = orjson.dumps(load_fixture("volumes"))
+        self.bodies["dota_pros"] = orjson.dumps(load_fixture("dota_pros"))
+        self.bodies["ssb_tables"] = orjson.dumps(load_fixture("ssb_tables"))
+        self.bodies["ssb_table"] = orjson.dumps(load_fixture("ssb_table"))
+        self.dota_player = load_fixture("dota_player")
+        self.dota_match = load_fixture("dota_match")
+
+    def _over_rate_limit(self, upstream: str, rate_limit: int) -> bool:
+        now = time.monotonic()
+        start, count = self.windows.get(upstream, (now, 0))
+        if now - start >= 60:
+            start, count = now, 0
+        self.windows[upstream] = (start, count + 1)
+        return count >= rate_limit
+
+    def endpoint(self, upstream: str, name: str, handler: Callable[[Request], bytes]):
+        """Wrap a fixture handler with the upstream's latency, error and throttling profile, and count its calls."""
+        async def respond(request: Request) -> Response:
+            profile = self.profiles[upstream]
+            await asyncio.sleep(max(0.0, self.random.gauss(profile.latency_ms, profile.jitter_ms)) / 1000)
+
+            roll = self.random.random()
+            if (profile.rate_limit is not None and self._over_rate_limit(upstream, profile.rate_limit)) or roll < profile.throttle_rate:
+                status, response = 429, Response(b'{"error":"rate limited"}', 429, {"Retry-After": "1"}, "application/json")
+            elif roll < profile.throttle_rate + profile.error_rate:
+                status = self.random.choice((500, 502, 503))
+                response = Response(b'{"error":"simulated"}', status, media_type="application/json")
+            else:
+                status, response = 200, Response(handler(request), media_type="application/json")
+
+            self.calls[(upstream, name, status)] += 1
+            return response
+        return respond
+
+    ## Fixture handlers
+
+    def player(self, request: Request) -> bytes:
+        account_id = int(request.path_params["account_id"])
+        return orjson.dumps({**self.dota_player, "profile": {**self.dota_player["profile"], "account_id": account_id}})
+
+    def match(self, request: Request) -> bytes:
+        return orjson.dumps({**self.dota_match, "match_id": int(request.path_params["match_id"])})
+
+    def averages(self, request: Request) -> bytes:
+        """/5m and /1h, derived from the /latest fixture."""
+        return orjson.dumps({
+            "timestamp": int(request.query_params.get("timestamp", 0)),
+            "data": {
+                item_id: {"avgHighPrice": entry["high"], "highPriceVolume": 100, "avgLowPrice": entry["low"], "lowPriceVolume": 100}
+                for item_id, entry in self.latest.items()
+            }
+        })
+
+    def timeseries(self, request: Request) -> bytes:
+        entry = self.latest.get(request.query_params.get("id", ""), {})
+        step = {"5m": 300, "1h": 3600, "6h": 21600, "24h": 86400}.get(request.query_params.get("timestep", "5m"), 300)
+        now = int(time.time()) // step * step
+        return orjson.dumps({"data": [
+            {"timestamp": now - step * index, "avgHighPrice": entry.get("high"), "avgLowPrice": entry.get("low"),
+             "highPriceVolume": 10, "lowPriceVolume": 10}
+            for index in range(365, 0, -1)
+        ]})
+
+    def stats(self, request: Request) -> Response:
+        calls: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for (upstream, name, status), count in self.calls.items():
+            calls.setdefault(upstream, {}).setdefault(name, {})[str(status)] = count
+        return Response(orjson.dumps({"calls": calls}), media_type="application/json")
+
+    def app(self, upstream: Upstream) -> Starlette:
+        fixed = lambda body: (lambda request: self.bodies[body])  # noqa: E731
+        handlers: Dict[str, List[Tuple[str, str, Callable[[Request], bytes]]]] = {
+            "opendota": [
+                ("/players/{account_id:int}", "players", self.player),
+                ("/matches/{match_id:int}", "matches", self.match),
+                ("/proPlayers", "proPlayers", fixed("dota_pros")),
+                ("/health", "health", lambda request: b'{"status":"ok"}'),
+            ],
+            "prices": [
+                ("/latest", "latest", fixed("latest")),
+                ("/5m", "5m", self.averages),
+                ("/1h", "1h", self.averages),
+                ("/timeseries", "timeseries", self.timeseries),
+            ],
+            "wiki": [("", "volumes", fixed("volumes"))],
+            "ssb": [
+                ("/table", "tables", fixed("ssb_tables")),
+                ("/table/{table_id:int}", "table", fixed("ssb_table")),
+            ],
+        }
+        base = upstream.base_path.rstrip("/")
+        routes = [Route(base + path or "/", self.endpoint(upstream.name, name, handler)) for path, name, handler in handlers[upstream.name]]
+        routes.append(Route("/_simulator/stats", self.stats))
+        return Starlette(routes=routes)
+
+
+def app_settings(host: str, port: int) -> Dict[str, str]:
+    """The environment that points the app at the simulator, rate limits carried over from production."""
+    from app.config import settings
+
+    env, rate_limits = {}, {}
+    for upstream in UPSTREAMS:
+        netloc = f"{host}:{port + upstream.port_offset}"
+        if upstream.setting == "OSRS_VOLUMES_URL":
+            env[upstream.setting] = f"http://{netloc}/?{settings.OSRS_VOLUMES_URL.split('?', 1)[1]}"
+        else:
+            env[upstream.setting] = f"http://{netloc}{upstream.base_path}"
+        rate_limits[netloc] = settings.UPSTREAM_RATE_LIMITS.get(upstream.production_host, settings.UPSTREAM_DEFAULT_RATE_LIMIT)
+    env["UPSTREAM_RATE_LIMITS"] = json.dumps(rate_limits)
+    return env
+
+
+def parse_overrides(base: UpstreamProfile, overrides: List[str]) -> Dict[str, UpstreamProfile]:
+    """Apply `--set opendota.latency_ms=200` style overrides on top of the shared profile."""
+    profiles = {upstream.name: base for upstream in UPSTREAMS}
+    for override in overrides:
+        key, _, value = override.partition("=")
+        name, _, field = key.partition(".")
+        if name not in profiles or field not in UpstreamProfile._fields:
+            raise SystemExit(f"Unknown override {override}, expected <{'|'.join(profiles)}>.<{'|'.join(UpstreamProfile._fields)}>=<value>")
+        profiles[name] = profiles[name]._replace(**{field: int(value) if field == "rate_limit" else float(value)})
+    return profiles
+
+
+async def serve(simulator: Simulator, host: str, port: int):
+    servers = [
+        uvicorn.Server(uvicorn.Config(simulator.app(upstream), host=host, port=port + upstream.port_offset, log_level="warning"))
+        for upstream in UPSTREAMS
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixtures in place of the real upstream APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100, help="First port, the upstreams listen on consecutive ports")
+    parser.add_argument("--latency", type=float, default=UpstreamProfile.latency_ms, help="Mean latency in ms")
+    parser.add_argument("--jitter", type=float, default=UpstreamProfile.jitter_ms, help="Latency standard deviation in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 5xx")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with a 429")
+    parser.add_argument("--rate-limit", type=int, default=None, help="Requests per minute per upstream before answering 429")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="UPSTREAM.FIELD=VALUE",
+                        help="Per upstream override, e.g. --set opendota.latency_ms=300 --set ssb.error_rate=0.1")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    base_profile = UpstreamProfile(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.rate_limit)
+    simulator = Simulator(parse_overrides(base_profile, args.overrides), args.seed)
+
+    print("Start the app with:")
+    for name, value in app_settings(args.host, args.port).items():
+        print(f"  {name}='{value}'")
+    asyncio.run(serve(simulator, args.host, args.port))